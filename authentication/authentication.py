@@ -0,0 +1,90 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from .cache import TTLCache
+
+SNAPSHOT_FIELDS = ('id', 'email', 'is_active', 'is_staff', 'is_superuser', 'is_verified')
+
+user_cache = TTLCache(
+    maxsize=getattr(settings, 'JWT_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'JWT_USER_CACHE_TTL', 60),
+)
+
+
+def _snapshot_fields(user_model):
+    # Só carrega o hash da senha quando a revogação por troca de senha está ligada
+    wanted = SNAPSHOT_FIELDS + ('password',) if api_settings.CHECK_REVOKE_TOKEN else SNAPSHOT_FIELDS
+    # Model.from_db espera os valores na ordem dos campos concretos
+    return tuple(field.attname for field in user_model._meta.concrete_fields if field.attname in wanted)
+
+
+def invalidate_cached_user(user_id):
+    user_cache.delete(str(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that serves the user from a process-local TTL/LRU cache.
+
+    Only the flags needed by the API (`is_active`, `is_staff`, `is_superuser`, `is_verified`) and
+    the email are cached. The returned `User` is built with every other field deferred, so it can
+    still be used as a foreign key or have other fields loaded on access. Entries are invalidated
+    when the user is saved or deleted in this process, and expire after `JWT_USER_CACHE_TTL`
+    seconds otherwise.
+    """
+
+    def get_user(self, validated_token):
+        user_id = self._get_user_id(validated_token)
+        values = user_cache.get(str(user_id))
+        if values is None:
+            values = self._cache_values(user_id, self._user_values(user_id).first())
+        return self._build_user(validated_token, values)
+
+    async def aauthenticate(self, request):
+        """Same as `authenticate`, but loads the user with the async ORM on a cache miss."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self._get_user_id(validated_token)
+        values = user_cache.get(str(user_id))
+        if values is None:
+            values = self._cache_values(user_id, await self._user_values(user_id).afirst())
+        return self._build_user(validated_token, values)
+
+    def _get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+    def _user_values(self, user_id):
+        fields = _snapshot_fields(self.user_model)
+        return self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values_list(*fields)
+
+    def _cache_values(self, user_id, values):
+        if values is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        user_cache.set(str(user_id), values)
+        return values
+
+    def _build_user(self, validated_token, values):
+        user = self.user_model.from_db(DEFAULT_DB_ALIAS, _snapshot_fields(self.user_model), values)
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return user
@@ -0,0 +1,113 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class BlacklistFilter:
+    """
+    Process-local set of the `jti` of every blacklisted refresh token that has not expired yet.
+
+    The set is loaded from `BlacklistedToken` on first use and then refreshed incrementally, at most
+    once every `refresh_interval` seconds, reading only the rows above the highest id already seen.
+    A token missing from the set is not blacklisted (as of the last refresh), so it is accepted
+    without a query; a token found in it is confirmed in the database.
+    """
+
+    # Ids alocados antes do high-water mark podem ser commitados depois dele
+    OVERLAP = 100
+
+    def __init__(self, refresh_interval):
+        self.refresh_interval = refresh_interval
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.expires_at = {}
+            self.high_water_mark = None
+            self.refreshed_at = None
+
+    def add(self, jti, expires_at):
+        with self.lock:
+            self.expires_at[jti] = expires_at
+
+    def might_contain(self, jti):
+        refreshed_at = self.refreshed_at
+        if refreshed_at is None or time.monotonic() - refreshed_at >= self.refresh_interval:
+            self.refresh()
+        return jti in self.expires_at
+
+    def refresh(self):
+        with self.lock:
+            if self.refreshed_at is not None and time.monotonic() - self.refreshed_at < self.refresh_interval:
+                return
+            started = time.monotonic()
+            rows = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+            if self.high_water_mark is None:
+                high_water_mark = BlacklistedToken.objects.aggregate(last=Max('id'))['last'] or 0
+            else:
+                high_water_mark = self.high_water_mark
+                rows = rows.filter(id__gt=high_water_mark - self.OVERLAP)
+
+            now = time.time()
+            expires_at = {jti: exp for jti, exp in self.expires_at.items() if exp > now}
+            for row_id, jti, expires in rows.values_list('id', 'token__jti', 'token__expires_at').iterator():
+                expires_at[jti] = expires.timestamp()
+                high_water_mark = max(high_water_mark, row_id)
+
+            self.expires_at = expires_at
+            self.high_water_mark = high_water_mark
+            self.refreshed_at = started
+
+    def __len__(self):
+        return len(self.expires_at)
+
+
+blacklist_filter = BlacklistFilter(refresh_interval=getattr(settings, 'TOKEN_BLACKLIST_REFRESH_INTERVAL', 5))
+
+
+class FilteredRefreshToken(RefreshToken):
+    """
+    `RefreshToken` that consults `blacklist_filter` before querying the blacklist table.
+
+    Tokens blacklisted in this process are added to the filter right away; tokens blacklisted by
+    other processes are seen after at most `TOKEN_BLACKLIST_REFRESH_INTERVAL` seconds.
+    """
+
+    def check_blacklist(self):
+        if blacklist_filter.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_filter.add(self.payload[api_settings.JTI_CLAIM], self.payload['exp'])
+        return result
+
+
+def iter_purge_expired_tokens(chunk_size=5000, pause=0):
+    """
+    Deletes expired `OutstandingToken` rows, and their `BlacklistedToken`, `chunk_size` at a time.
+
+    Each chunk is deleted in its own short transaction. Yields the number of tokens deleted per chunk.
+    """
+    cutoff = timezone.now()
+    while True:
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lte=cutoff)
+            .order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            deleted = OutstandingToken.objects.filter(id__in=ids).delete()[1].get(OutstandingToken._meta.label, 0)
+        yield deleted
+        if pause:
+            time.sleep(pause)
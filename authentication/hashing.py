@@ -0,0 +1,37 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_password_executor():
+    """
+    Returns the bounded thread pool used to hash and check passwords off the event loop.
+
+    PBKDF2 releases the GIL while hashing, so up to `PASSWORD_HASHING_WORKERS` logins are
+    hashed in parallel while the event loop keeps serving other requests.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASHING_WORKERS,
+                thread_name_prefix='password-hashing',
+            )
+    return _executor
+
+
+async def averify_password(password, encoded):
+    # Sem o setter do check_password: a atualização do hash exigiria acesso ao banco nesta thread
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_password_executor(), check_password, password, encoded)
+
+
+async def ahash_password(password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_password_executor(), make_password, password)
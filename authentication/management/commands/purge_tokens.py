@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from authentication.blacklist import iter_purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = 'Deletes expired outstanding and blacklisted refresh tokens in small chunks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Tokens deleted per transaction.')
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep after each chunk.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the tokens that would be deleted.')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            total = OutstandingToken.objects.filter(expires_at__lte=timezone.now()).count()
+            self.stdout.write(self.style.SUCCESS(f'{total} expired tokens would be deleted'))
+            return
+
+        total = 0
+        for deleted in iter_purge_expired_tokens(chunk_size=options['chunk_size'], pause=options['pause']):
+            total += deleted
+            self.stderr.write(f'{total} expired tokens deleted')
+        self.stdout.write(self.style.SUCCESS(f'{total} expired tokens deleted'))
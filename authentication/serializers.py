@@ -1,9 +1,11 @@
 from rest_framework import serializers
 from rest_framework.exceptions import AuthenticationFailed
-from rest_framework_simplejwt.tokens import RefreshToken, TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer as BaseTokenRefreshSerializer
+from rest_framework_simplejwt.tokens import TokenError
 from django.contrib import auth
 from django.db import IntegrityError
 from rest_framework.exceptions import ValidationError
+from .blacklist import FilteredRefreshToken
 from .models import User
 
 
@@ -35,15 +37,7 @@ class RegisterSerializer(serializers.ModelSerializer):
 class LoginSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(max_length=255, min_length=3)
     password = serializers.CharField(max_length=68, min_length=6, write_only=True)
-    tokens = serializers.SerializerMethodField()
-
-    def get_tokens(self, obj):
-        user = User.objects.get(email=obj['email'])
-
-        return {
-            'access': user.tokens()['access'],
-            'refresh': user.tokens()['refresh']
-        }
+    tokens = serializers.DictField(read_only=True)
 
     class Meta:
         model = User
@@ -64,10 +58,15 @@ class LoginSerializer(serializers.ModelSerializer):
         return {
             'id': user.id,
             'email': user.email,
-            'tokens': user.tokens
+            'tokens': user.tokens()
         }
 
 
+class LoginCredentialsSerializer(serializers.Serializer):
+    email = serializers.EmailField(max_length=255, min_length=3)
+    password = serializers.CharField(max_length=68, min_length=6, write_only=True)
+
+
 class LogoutSerializer(serializers.Serializer):
     refresh = serializers.CharField()
 
@@ -82,6 +81,10 @@ class LogoutSerializer(serializers.Serializer):
 
     def save(self, **kwargs):
         try:
-            RefreshToken(self.token).blacklist()
+            FilteredRefreshToken(self.token).blacklist()
         except TokenError:
             self.fail('bad_token')
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    token_class = FilteredRefreshToken
@@ -1,3 +1,205 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from authentication.authentication import user_cache
+from authentication.blacklist import blacklist_filter
+from authentication.models import User
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.url = '/api/clients/'
+
+    def _queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [q['sql'] for q in queries]
+
+    def test_user_is_loaded_once_then_served_from_cache(self):
+        first = self._queries()
+        second = self._queries()
+        self.assertEqual(len(first), len(second) + 1)
+        self.assertFalse(any('authentication_user' in sql for sql in second))
+        self.assertEqual(user_cache.hits, 1)
+
+    def test_cache_is_invalidated_when_user_changes(self):
+        self._queries()
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cached_user_can_load_deferred_fields(self):
+        self._queries()
+        response = self.client.get(self.url)
+        user = response.wsgi_request.user
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.date_joined, self.user.date_joined)
+
+    def test_unknown_user(self):
+        user_id = self.user.pk
+        self.user.delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIsNone(user_cache.get(str(user_id)))
+
+
+class TTLCacheTests(TestCase):
+    def test_lru_eviction_and_expiry(self):
+        from authentication.cache import TTLCache
+
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+
+        expired = TTLCache(maxsize=2, ttl=0)
+        expired.set('a', 1)
+        self.assertIsNone(expired.get('a'))
+
+
+class LoginTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        self.credentials = {'email': 'testuser@testuser.com', 'password': 'testpassword'}
+
+    def test_login_mints_a_single_token_pair(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/auth/login/', self.credentials, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['id'], self.user.id)
+        self.assertEqual(set(response.data['tokens']), {'access', 'refresh'})
+        self.assertEqual(OutstandingToken.objects.filter(user=self.user).count(), 1)
+        user_queries = [q for q in queries if 'FROM "authentication_user"' in q['sql']]
+        self.assertEqual(len(user_queries), 1)
+
+    def test_login_with_wrong_password(self):
+        response = self.client.post('/auth/login/', {**self.credentials, 'password': 'wrongpassword'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_register_mints_a_single_token_pair(self):
+        response = self.client.post('/auth/register/', {'email': 'new@example.com', 'password': 'newpassword'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        user = User.objects.get(email='new@example.com')
+        self.assertEqual(OutstandingToken.objects.filter(user=user).count(), 1)
+
+    def test_register_responses_use_data_and_errors_envelopes(self):
+        response = self.client.post('/auth/register/', {'email': 'new@example.com', 'password': 'newpassword'}, format='json')
+        self.assertEqual(set(response.json()['data']['tokens']), {'access', 'refresh'})
+
+        response = self.client.post('/auth/register/', {'email': 'invalid', 'password': '1'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.json()['errors']), {'email', 'password', 'status_code'})
+
+
+class AsyncLoginTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        self.url = '/auth/login/async/'
+
+    async def _post(self, data):
+        return await AsyncClient().post(self.url, data, content_type='application/json')
+
+    async def test_async_login(self):
+        response = await self._post({'email': 'testuser@testuser.com', 'password': 'testpassword'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.json()
+        self.assertEqual(body['id'], self.user.id)
+        self.assertEqual(set(body['tokens']), {'access', 'refresh'})
+        self.assertEqual(await OutstandingToken.objects.filter(user_id=self.user.id).acount(), 1)
+
+    async def test_async_login_invalid_credentials(self):
+        response = await self._post({'email': 'testuser@testuser.com', 'password': 'wrongpassword'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = await self._post({'email': 'nobody@testuser.com', 'password': 'testpassword'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_async_login_validates_payload(self):
+        response = await self._post({'email': 'not-an-email', 'password': '123'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.json())
+        self.assertIn('password', response.json())
+
+
+class TokenBlacklistFilterTests(APITestCase):
+    def setUp(self):
+        # Os ids do SQLite voltam atrás no rollback de cada teste
+        blacklist_filter.reset()
+        self.user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        self.refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}')
+
+    def _refresh(self, token):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/auth/token/refresh/', {'refresh': str(token)}, format='json')
+        return response, [q['sql'] for q in queries]
+
+    def test_refresh_skips_the_blacklist_table(self):
+        response, _ = self._refresh(self.refresh)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('access', response.data)
+
+        response, queries = self._refresh(self.refresh)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, [])
+
+    def test_logout_blacklists_token_in_the_filter(self):
+        self._refresh(self.refresh)
+        response = self.client.post('/auth/logout/', {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        response, queries = self._refresh(self.refresh)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(len(queries), 1)
+
+    def test_tokens_blacklisted_elsewhere_are_loaded_incrementally(self):
+        self._refresh(self.refresh)
+        # Simula a revogação feita por outro processo
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=self.refresh['jti']))
+
+        blacklist_filter.refresh_interval, interval = 0, blacklist_filter.refresh_interval
+        try:
+            response, _ = self._refresh(self.refresh)
+        finally:
+            blacklist_filter.refresh_interval = interval
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(blacklist_filter.high_water_mark, BlacklistedToken.objects.get().id)
+
+
+class PurgeTokensCommandTests(TestCase):
+    def test_purges_only_expired_tokens(self):
+        user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        RefreshToken.for_user(user)
+        expired = [RefreshToken.for_user(user) for _ in range(3)]
+        OutstandingToken.objects.filter(jti__in=[token['jti'] for token in expired]).update(
+            expires_at=timezone.now() - timedelta(seconds=1))
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=expired[0]['jti']))
+
+        out = StringIO()
+        call_command('purge_tokens', '--dry-run', stdout=out)
+        self.assertIn('3 expired tokens would be deleted', out.getvalue())
+        self.assertEqual(OutstandingToken.objects.count(), 4)
+
+        call_command('purge_tokens', '--chunk-size', '2', stdout=out, stderr=StringIO())
+        self.assertIn('3 expired tokens deleted', out.getvalue())
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+        self.assertFalse(BlacklistedToken.objects.exists())
@@ -1,13 +1,16 @@
 from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
 from .views import (
     RegisterView,
     LoginAPIView,
+    AsyncLoginAPIView,
     LogoutAPIView)
 from rest_framework_simplejwt.views import TokenRefreshView
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name="register"),
     path('login/', LoginAPIView.as_view(), name="login-pf"),
+    path('login/async/', csrf_exempt(AsyncLoginAPIView.as_view()), name="login-async"),
     path('logout/', LogoutAPIView.as_view(), name="logout"),
     path('token/refresh/', TokenRefreshView.as_view(), name="token-refresh"),
 ]
@@ -1,10 +1,18 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views import View
 from rest_framework import generics, status
 from rest_framework import permissions
 from rest_framework.response import Response
 from utils.renderers import UserRender
+from .hashing import ahash_password, averify_password
+from .models import User
 from .serializers import (
     RegisterSerializer,
     LoginSerializer,
+    LoginCredentialsSerializer,
     LogoutSerializer,
 )
 
@@ -20,10 +28,7 @@ class RegisterView(generics.GenericAPIView):
         data = serializer.save()
 
         return Response({
-            'tokens': {
-                'access': data.tokens()['access'],
-                'refresh': data.tokens()['refresh']
-            },
+            'tokens': data.tokens(),
         }, status=status.HTTP_201_CREATED)
 
 
@@ -36,6 +41,43 @@ class LoginAPIView(generics.GenericAPIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class AsyncLoginAPIView(View):
+    """
+    Async version of `LoginAPIView`, meant to be served by `core.asgi`.
+
+    Password hashing runs on a bounded thread pool (`PASSWORD_HASHING_WORKERS`) instead of
+    blocking the event loop, and the token pair is minted once per login.
+    """
+
+    async def post(self, request):
+        try:
+            payload = json.loads(request.body or b'{}')
+        except ValueError:
+            return self._error({'detail': 'JSON parse error'}, status.HTTP_400_BAD_REQUEST)
+
+        serializer = LoginCredentialsSerializer(data=payload)
+        if not serializer.is_valid():
+            return self._error(serializer.errors, status.HTTP_400_BAD_REQUEST)
+        email = serializer.validated_data['email']
+        password = serializer.validated_data['password']
+
+        user = await User.objects.filter(email=email).afirst()
+        if user is None:
+            # Mesmo custo de hash de um usuário existente, para não revelar quais emails existem
+            await ahash_password(password)
+            return self._error({'detail': 'Invalid credentials, try again!'}, status.HTTP_401_UNAUTHORIZED)
+        if not await averify_password(password, user.password) or not user.is_active:
+            return self._error({'detail': 'Invalid credentials, try again!'}, status.HTTP_401_UNAUTHORIZED)
+        if not user.is_verified:
+            return self._error({'detail': 'Email is not verified!'}, status.HTTP_401_UNAUTHORIZED)
+
+        tokens = await sync_to_async(user.tokens)()
+        return JsonResponse({'id': user.id, 'email': user.email, 'tokens': tokens}, status=status.HTTP_200_OK)
+
+    def _error(self, data, status_code):
+        return JsonResponse({**data, 'status_code': status_code}, status=status_code)
+
+
 class LogoutAPIView(generics.GenericAPIView):
     serializer_class = LogoutSerializer
     permission_classes = (permissions.IsAuthenticated, )
@@ -0,0 +1,127 @@
+import asyncio
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import test_database
+from asgiref.testing import ApplicationCommunicator
+from django.db import connections
+from rest_framework_simplejwt.tokens import RefreshToken
+from authentication.models import User
+from core.asgi import application as asgi_application
+from core.wsgi import application as wsgi_application
+from favoritehub.models import Client, Favorite, Product
+
+
+def seed(products=200, clients=50, favorites_per_client=20):
+    Product.objects.bulk_create(
+        Product(title=f'Product {i}', image=f'https://example.com/{i}.png', price=i) for i in range(products))
+    product_ids = list(Product.objects.values_list('id', flat=True))
+    Client.objects.bulk_create(Client(email=f'client{i}@example.com', name=f'Client {i}') for i in range(clients))
+    Favorite.objects.bulk_create(Favorite(client=client) for client in Client.objects.all())
+    through = Favorite.products.through
+    through.objects.bulk_create(
+        through(favorite_id=favorite_id, product_id=product_ids[(i + j) % len(product_ids)])
+        for i, favorite_id in enumerate(Favorite.objects.values_list('id', flat=True))
+        for j in range(favorites_per_client)
+    )
+    user = User.objects.create_user(email='bench@example.com', password='benchpassword')
+    paths = [f'/api/favorites/{favorite_id}/products/' for favorite_id in Favorite.objects.values_list('id', flat=True)]
+    paths += [f'/api/clients/{client_id}/' for client_id in Client.objects.values_list('id', flat=True)]
+    paths += ['/api/products/?page_size=20']
+    return f'Bearer {RefreshToken.for_user(user).access_token}', paths
+
+
+def wsgi_request(path, authorization):
+    path, _, query = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80', 'HTTP_AUTHORIZATION': authorization, 'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+    }
+    statuses = []
+    body = b''.join(wsgi_application(environ, lambda status, headers: statuses.append(status)))
+    assert statuses[0].startswith('200'), (path, statuses[0], body[:200])
+
+
+async def asgi_request(path, authorization):
+    path, _, query = path.partition('?')
+    communicator = ApplicationCommunicator(asgi_application, {
+        'type': 'http', 'method': 'GET', 'path': path, 'query_string': query.encode(),
+        'headers': [(b'authorization', authorization.encode())], 'server': ('testserver', 80),
+    })
+    await communicator.send_input({'type': 'http.request'})
+    start = await communicator.receive_output(10)
+    while (await communicator.receive_output(10)).get('more_body'):
+        pass
+    await communicator.wait(10)
+    assert start['status'] == 200, (path, start['status'])
+
+
+def run_wsgi(paths, authorization, requests, concurrency):
+    """Simulates a threaded WSGI server: `concurrency` worker threads, one request each at a time."""
+    def worker(offset):
+        latencies = []
+        for i in range(offset, requests, concurrency):
+            started = time.perf_counter()
+            wsgi_request(paths[i % len(paths)], authorization)
+            latencies.append(time.perf_counter() - started)
+        connections.close_all()
+        return latencies
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = [latency for part in executor.map(worker, range(concurrency)) for latency in part]
+    return latencies, time.perf_counter() - started
+
+
+def run_asgi(paths, authorization, requests, concurrency):
+    """Drives `core.asgi.application` on one event loop with `concurrency` requests in flight."""
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one(path):
+            async with semaphore:
+                started = time.perf_counter()
+                await asgi_request(path, authorization)
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(paths[i % len(paths)]) for i in range(requests)))
+        return latencies, time.perf_counter() - started
+
+    return asyncio.run(main())
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def run(requests=500, concurrency_levels=(1, 8, 32)):
+    """
+    Sends the same mix of authenticated GETs (favorite products, client detail, product list)
+    through the WSGI and the ASGI applications at each concurrency level and prints throughput
+    and p50/p99 latency.
+    """
+    with test_database():
+        authorization, paths = seed()
+        print(f'{requests} requests per run, {len(paths)} distinct URLs')
+        print(f'{"mode":<6} {"concurrency":>11} {"req/s":>9} {"p50 ms":>8} {"p99 ms":>8}')
+        for concurrency in concurrency_levels:
+            for mode, runner in (('wsgi', run_wsgi), ('asgi', run_asgi)):
+                latencies, elapsed = runner(paths, authorization, requests, concurrency)
+                print(f'{mode:<6} {concurrency:>11} {requests / elapsed:>9.1f} '
+                      f'{percentile(latencies, 0.5) * 1000:>8.2f} {percentile(latencies, 0.99) * 1000:>8.2f}')
+
+
+if __name__ == '__main__':
+    run(
+        requests=int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        concurrency_levels=tuple(int(c) for c in sys.argv[2].split(',')) if len(sys.argv) > 2 else (1, 8, 32),
+    )
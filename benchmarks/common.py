@@ -0,0 +1,40 @@
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from django.db import connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment
+
+
+@contextmanager
+def test_database():
+    """
+    Runs the benchmark against a throwaway test database, so it is safe to execute next to real data.
+    """
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    try:
+        yield
+    finally:
+        runner.teardown_databases(old_config)
+
+
+def use_file_database():
+    """
+    On SQLite, makes the test database a file instead of the shared in-memory one, with transactions
+    that wait for the write lock instead of failing with "database is locked" under concurrent writes.
+    Call it before `test_database()`.
+    """
+    database = connections['default'].settings_dict
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        database['TEST']['NAME'] = database['TEST'].get('NAME') or os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite3')
+        database['OPTIONS'] = {'transaction_mode': 'IMMEDIATE', 'timeout': 30, **database.get('OPTIONS', {})}
@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import test_database
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.module_loading import import_string
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import RefreshToken
+from authentication.authentication import user_cache
+from authentication.models import User
+
+AUTHENTICATION_CLASSES = {
+    'JWTAuthentication': 'rest_framework_simplejwt.authentication.JWTAuthentication',
+    'CachedJWTAuthentication': 'authentication.authentication.CachedJWTAuthentication',
+}
+
+
+def measure(client, url, requests):
+    """
+    Sends `requests` authenticated GETs and returns `(queries_per_request, requests_per_second)`.
+    """
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        for _ in range(requests):
+            client.get(url)
+        elapsed = time.perf_counter() - started
+    return len(queries) / requests, requests / elapsed
+
+
+def run(requests=500, url='/api/clients/'):
+    """
+    Compares the stock `JWTAuthentication` with `CachedJWTAuthentication` on the same endpoint.
+    """
+    with test_database():
+        user = User.objects.create_user(email='bench@example.com', password='benchpassword')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+        print(f'{requests} x GET {url}')
+        for name, path in AUTHENTICATION_CLASSES.items():
+            user_cache.clear()
+            # As views leem DEFAULT_AUTHENTICATION_CLASSES na importação, então a troca é feita na classe
+            with mock.patch.object(APIView, 'authentication_classes', [import_string(path)]):
+                client.get(url)
+                queries, throughput = measure(client, url, requests)
+            print(f'{name:<25} {queries:5.2f} queries/request {throughput:9.1f} requests/s')
+
+
+if __name__ == '__main__':
+    run(requests=int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,59 @@
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import test_database
+from django.conf import settings
+from django.test import AsyncClient
+from rest_framework.test import APIClient
+from authentication.models import User
+
+CREDENTIALS = {'email': 'bench@example.com', 'password': 'benchpassword'}
+
+
+def sync_logins(logins):
+    client = APIClient()
+    started = time.perf_counter()
+    for _ in range(logins):
+        response = client.post('/auth/login/', CREDENTIALS, format='json')
+        assert response.status_code == 200, response.content
+    return logins / (time.perf_counter() - started)
+
+
+async def async_logins(logins, concurrency):
+    client = AsyncClient()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            response = await client.post('/auth/login/async/', CREDENTIALS, content_type='application/json')
+            assert response.status_code == 200, response.content
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    return logins / (time.perf_counter() - started)
+
+
+def run(logins=50, concurrency=8):
+    """
+    Measures logins per second on the sync `/auth/login/` endpoint (one login at a time) and on the
+    async `/auth/login/async/` endpoint with `concurrency` logins in flight, using the configured
+    password hasher.
+    """
+    with test_database():
+        User.objects.create_user(**CREDENTIALS)
+        print(f'{logins} logins, hasher {settings.PASSWORD_HASHERS[0].rsplit(".", 1)[-1]}, '
+              f'{settings.PASSWORD_HASHING_WORKERS} hashing workers')
+        print(f'{"sync /auth/login/":<32} {sync_logins(logins):8.1f} logins/s')
+        throughput = asyncio.run(async_logins(logins, concurrency))
+        print(f'{f"async /auth/login/async/ (x{concurrency})":<32} {throughput:8.1f} logins/s')
+
+
+if __name__ == '__main__':
+    run(
+        logins=int(sys.argv[1]) if len(sys.argv) > 1 else 50,
+        concurrency=int(sys.argv[2]) if len(sys.argv) > 2 else 8,
+    )
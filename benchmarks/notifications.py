@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+from decimal import Decimal
+from itertools import islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import test_database, use_file_database
+from django.db import transaction
+from favoritehub.models import Client, Favorite, Notification, NotificationJob, Product
+from favoritehub.notifications import NotificationWorkerPool, enqueue_price_changes
+
+
+def _bulk_create(model, objects, batch_size=20000):
+    objects = iter(objects)
+    while batch := list(islice(objects, batch_size)):
+        model.objects.bulk_create(batch)
+
+
+def seed(clients, products):
+    """`products` products, each in the favorite list of every one of the `clients` clients."""
+    _bulk_create(Product, (
+        Product(title=f'Popular {i}', image=f'https://example.com/{i}.png', price=100, favorites_count=clients)
+        for i in range(products)
+    ))
+    _bulk_create(Client, (Client(email=f'client{i}@example.com', name=f'Client {i}') for i in range(clients)))
+    _bulk_create(Favorite, (
+        Favorite(client_id=client_id, favorites_size=products)
+        for client_id in Client.objects.order_by('id').values_list('id', flat=True)
+    ))
+    product_ids = list(Product.objects.order_by('id').values_list('id', flat=True))
+    through = Favorite.products.through
+    _bulk_create(through, (
+        through(favorite_id=favorite_id, product_id=product_id)
+        for favorite_id in Favorite.objects.order_by('id').values_list('id', flat=True).iterator()
+        for product_id in product_ids
+    ))
+    return product_ids
+
+
+def run(clients=100_000, products=4, workers=(1, 2, 4), batch_size=1000):
+    """
+    Seeds `products` popular products favorited by `clients` clients, then for each worker count
+    queues one price change per product and times the pool until every notification is written.
+    """
+    use_file_database()
+    with test_database():
+        started = time.perf_counter()
+        product_ids = seed(clients, products)
+        print(f'seeded {clients} clients x {products} products in {time.perf_counter() - started:.1f}s')
+        print(f'{"workers":>7} {"jobs":>5} {"notifications":>13} {"seconds":>8} {"notifications/s":>16}')
+        for count in workers:
+            Notification.objects.all().delete()
+            NotificationJob.objects.all().delete()
+            with transaction.atomic():
+                enqueue_price_changes((product_id, Decimal(100), Decimal(count)) for product_id in product_ids)
+            stats = NotificationWorkerPool(workers=count, batch_size=batch_size, poll_interval=0.05).run()
+            assert stats['notifications'] == clients * products, stats
+            print(f'{count:>7} {stats["jobs"]:>5} {stats["notifications"]:>13} {stats["elapsed"]:>8.2f} '
+                  f'{stats["notifications_per_second"]:>16.0f}')
+
+
+if __name__ == '__main__':
+    run(
+        clients=int(sys.argv[1]) if len(sys.argv) > 1 else 100_000,
+        products=int(sys.argv[2]) if len(sys.argv) > 2 else 4,
+        workers=[int(n) for n in sys.argv[3].split(',')] if len(sys.argv) > 3 else (1, 2, 4),
+    )
@@ -0,0 +1,84 @@
+import os
+import random
+import statistics
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import test_database
+from rest_framework.test import APIClient
+from authentication.models import User
+from favoritehub.models import Product
+from favoritehub.search import search_backend
+from utils.response_cache import get_cache
+
+ADJECTIVES = ['red', 'blue', 'green', 'black', 'white', 'light', 'heavy', 'smart', 'classic', 'vintage',
+              'compact', 'wireless', 'portable', 'premium', 'organic', 'leather', 'steel', 'wooden']
+NOUNS = ['shoes', 'shirt', 'phone', 'charger', 'lamp', 'chair', 'table', 'watch', 'backpack', 'bottle',
+         'speaker', 'headphones', 'camera', 'jacket', 'keyboard', 'mouse', 'monitor', 'kettle']
+
+QUERIES = [
+    ('list, ordered by id', {}),
+    ('price range, ordered by price', {'min_price': 100, 'max_price': 120, 'ordering': 'price'}),
+    ('search, one common word', {'search': 'wireless'}),
+    ('search, two words', {'search': 'vintage lamp'}),
+    ('search, rare word', {'search': 'quantum'}),
+    ('search + price range', {'search': 'steel bottle', 'min_price': 10, 'max_price': 50}),
+    ('search, ranked by relevance', {'search': 'leather jacket', 'ordering': 'relevance'}),
+]
+
+
+def seed(products, batch_size=20000):
+    rng = random.Random(42)
+    rare = set(rng.sample(range(products), max(products // 100000, 1)))
+    for start in range(0, products, batch_size):
+        Product.objects.bulk_create(
+            Product(
+                title=' '.join([rng.choice(ADJECTIVES), rng.choice(ADJECTIVES), rng.choice(NOUNS),
+                                'quantum' if i in rare else str(i)]),
+                image=f'https://example.com/{i}.png',
+                price=Decimal(rng.randrange(100, 100000)) / 100,
+            )
+            for i in range(start, min(start + batch_size, products))
+        )
+
+
+def measure(client, params, repeat):
+    timings = []
+    for _ in range(repeat):
+        # Cada requisição vai ao banco: o cache de respostas é limpo antes
+        get_cache().clear()
+        started = time.perf_counter()
+        response = client.get('/api/products/', {'page_size': 20, **params})
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.content[:200]
+    timings.sort()
+    return statistics.median(timings), timings[max(int(len(timings) * 0.95) - 1, 0)], len(response.data['results'])
+
+
+def run(products=1_000_000, repeat=20):
+    """
+    Seeds `products` products and times each search/filter query through the API (p50 and p95
+    over `repeat` uncached requests).
+    """
+    with test_database():
+        started = time.perf_counter()
+        seed(products)
+        print(f'seeded {products} products in {time.perf_counter() - started:.1f}s '
+              f'(search backend: {search_backend("default")})')
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(email='bench@example.com', password='benchpassword'))
+        print(f'{"query":<32} {"p50 ms":>8} {"p95 ms":>8} {"rows":>5}')
+        for name, params in QUERIES:
+            p50, p95, rows = measure(client, params, repeat)
+            print(f'{name:<32} {p50:>8.1f} {p95:>8.1f} {rows:>5}')
+
+
+if __name__ == '__main__':
+    run(
+        products=int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+        repeat=int(sys.argv[2]) if len(sys.argv) > 2 else 20,
+    )
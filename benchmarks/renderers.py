@@ -0,0 +1,69 @@
+import json
+import os
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmarks.common  # noqa: F401
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from favoritehub.models import Product
+from favoritehub.serializers import ProductSerializer
+from utils.renderers import FastJSONRenderer, UserRender
+
+
+def legacy_user_render(data):
+    # Implementação anterior do UserRender, mantida aqui só para comparação
+    if 'ErrorDetail' in str(data):
+        return json.dumps({'errors': data})
+    return json.dumps({'data': data})
+
+
+def build_payload(rows):
+    products = [
+        Product(id=i, title=f'Product {i}', image=f'https://example.com/{i}.png', price=Decimal(i) / 4,
+                rating_average=i % 5 + 0.25)
+        for i in range(1, rows + 1)
+    ]
+    return {'next': None, 'previous': None, 'results': ProductSerializer(products, many=True).data}
+
+
+def measure(render, repeat):
+    size = len(render())
+    started = time.perf_counter()
+    for _ in range(repeat):
+        render()
+    elapsed = time.perf_counter() - started
+    return size, size * repeat / elapsed
+
+
+def run(rows=5000, repeat=20):
+    """
+    Renders a `rows`-product list response `repeat` times with each renderer and prints the
+    output size and the encoding throughput in MB/s.
+    """
+    payload = build_payload(rows)
+    with override_settings(JSON_RENDERER_BACKEND='json'):
+        candidates = [
+            ('legacy UserRender (str + json)', lambda: legacy_user_render(payload)),
+            ('DRF JSONRenderer', lambda: JSONRenderer().render(payload)),
+        ]
+        results = [(name, *measure(render, repeat)) for name, render in candidates]
+        results.append(('FastJSONRenderer (json)', *measure(lambda: FastJSONRenderer().render(payload), repeat)))
+    results.append(('FastJSONRenderer (orjson)', *measure(lambda: FastJSONRenderer().render(payload), repeat)))
+    context = {'response': Response(status=200)}
+    results.append(('UserRender (orjson)', *measure(lambda: UserRender().render(payload, None, context), repeat)))
+
+    print(f'{rows} products x {repeat} renders')
+    for name, size, throughput in results:
+        print(f'{name:<32} {size / 1024:>8.0f} KiB {throughput / 1024 / 1024:>8.1f} MB/s')
+
+
+if __name__ == '__main__':
+    run(
+        rows=int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+        repeat=int(sys.argv[2]) if len(sys.argv) > 2 else 20,
+    )
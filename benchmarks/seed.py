@@ -0,0 +1,116 @@
+import random
+import time
+from decimal import Decimal
+from itertools import islice
+
+from rest_framework_simplejwt.tokens import RefreshToken
+from authentication.models import User
+from benchmarks.product_search import ADJECTIVES, NOUNS
+from favoritehub.models import Client, Favorite, Product
+
+CREDENTIALS = {'email': 'bench@example.com', 'password': 'benchpassword'}
+
+
+class Dataset:
+    """
+    Ids of the seeded rows. Favorite list `i` belongs to client `i` and holds the products at
+    positions `starts[i]` to `starts[i] + favorites_per_client - 1` (wrapping around), so the
+    products in and out of each list are known without querying.
+    """
+
+    def __init__(self, product_ids, client_ids, favorite_ids, starts, favorites_per_client, authorization):
+        self.product_ids = product_ids
+        self.client_ids = client_ids
+        self.favorite_ids = favorite_ids
+        self.starts = starts
+        self.favorites_per_client = favorites_per_client
+        self.authorization = authorization
+        # Quantos produtos de fora já foram adicionados / de dentro removidos em cada lista
+        self.added = [0] * len(favorite_ids)
+        self.removed = [0] * len(favorite_ids)
+
+    def product_at(self, position):
+        return self.product_ids[position % len(self.product_ids)]
+
+    def products_in(self, index):
+        start = self.starts[index]
+        return [self.product_at(start + offset) for offset in range(self.favorites_per_client)]
+
+    def next_missing_product(self, index):
+        """A product that is not in list `index` yet (and is not handed out twice)."""
+        self.added[index] += 1
+        return self.product_at(self.starts[index] + self.favorites_per_client + self.added[index] - 1)
+
+    def next_present_product(self, index):
+        """A product of the seeded list `index` that has not been removed yet."""
+        self.removed[index] += 1
+        return self.product_at(self.starts[index] + self.removed[index] - 1)
+
+
+def _bulk_create(model, objects, batch_size):
+    objects = iter(objects)
+    while batch := list(islice(objects, batch_size)):
+        model.objects.bulk_create(batch)
+    return list(model.objects.order_by('id').values_list('id', flat=True))
+
+
+def seed(products=100_000, clients=10_000, favorites_per_client=100, seed=42, batch_size=20_000, verbose=True):
+    """
+    Fills an empty database with `products` products, `clients` clients with one favorite list
+    each and `favorites_per_client` products per list, using bulk inserts only.
+
+    The same arguments always produce the same rows. The favorite counters are computed up front,
+    so they are consistent without running the signals. Returns a `Dataset`.
+    """
+    if favorites_per_client >= products:
+        raise ValueError('favorites_per_client must be smaller than products')
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    starts = [rng.randrange(products) for _ in range(clients)]
+
+    # Cada lista cobre uma janela contínua de produtos: soma de prefixos das bordas das janelas
+    deltas = [0] * (products + 1)
+    for start in starts:
+        end = start + favorites_per_client
+        deltas[start] += 1
+        deltas[min(end, products)] -= 1
+        if end > products:
+            deltas[0] += 1
+            deltas[end - products] -= 1
+    counts, running = [], 0
+    for delta in deltas[:products]:
+        running += delta
+        counts.append(running)
+
+    product_ids = _bulk_create(Product, (
+        Product(
+            title=f'{rng.choice(ADJECTIVES)} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}',
+            image=f'https://example.com/{i}.png',
+            price=Decimal(rng.randrange(100, 100000)) / 100,
+            favorites_count=counts[i],
+        )
+        for i in range(products)
+    ), batch_size)
+    client_ids = _bulk_create(Client, (
+        Client(email=f'client{i}@example.com', name=f'Client {i}') for i in range(clients)
+    ), batch_size)
+    favorite_ids = _bulk_create(Favorite, (
+        Favorite(client_id=client_id, favorites_size=favorites_per_client) for client_id in client_ids
+    ), batch_size)
+
+    dataset = Dataset(product_ids, client_ids, favorite_ids, starts, favorites_per_client, authorization=None)
+    through = Favorite.products.through
+    links = (
+        through(favorite_id=favorite_id, product_id=product_id)
+        for index, favorite_id in enumerate(favorite_ids)
+        for product_id in dataset.products_in(index)
+    )
+    while batch := list(islice(links, batch_size)):
+        through.objects.bulk_create(batch)
+
+    user = User.objects.create_user(**CREDENTIALS)
+    dataset.authorization = f'Bearer {RefreshToken.for_user(user).access_token}'
+    if verbose:
+        print(f'seeded {products} products, {clients} clients, {clients * favorites_per_client} favorites '
+              f'in {time.perf_counter() - started:.1f}s')
+    return dataset
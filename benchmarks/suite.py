@@ -0,0 +1,354 @@
+import argparse
+import http.client
+import io
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import test_database, use_file_database
+import django
+from django.core.servers.basehttp import ThreadedWSGIServer
+from django.db import connections
+from django.test.testcases import QuietWSGIRequestHandler
+from django.test.utils import override_settings
+from benchmarks.product_search import ADJECTIVES, NOUNS
+from benchmarks.seed import CREDENTIALS, seed
+from core.wsgi import application as wsgi_application
+
+_QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+
+def _favorite(dataset, rng):
+    return rng.randrange(len(dataset.favorite_ids))
+
+
+def products_list(dataset, rng):
+    return 'GET', '/api/products/?page_size=20', None
+
+
+def products_search(dataset, rng):
+    return 'GET', f'/api/products/?page_size=20&search={rng.choice(ADJECTIVES)}+{rng.choice(NOUNS)}', None
+
+
+def products_top(dataset, rng):
+    return 'GET', '/api/products/top/?limit=20', None
+
+
+def client_detail(dataset, rng):
+    return 'GET', f'/api/clients/{rng.choice(dataset.client_ids)}/', None
+
+
+def favorite_products(dataset, rng):
+    return 'GET', f'/api/favorites/{rng.choice(dataset.favorite_ids)}/products/?page_size=20', None
+
+
+def favorite_membership(dataset, rng):
+    # Uma grade de 50 produtos, em parte na lista do cliente
+    index = _favorite(dataset, rng)
+    in_list = rng.sample(dataset.products_in(index), min(10, dataset.favorites_per_client))
+    product_ids = in_list + rng.sample(dataset.product_ids, 50 - len(in_list))
+    rng.shuffle(product_ids)
+    return ('GET', f'/api/favorites/membership/?client={dataset.client_ids[index]}'
+                   f'&product_ids={",".join(map(str, product_ids))}', None)
+
+
+def add_product(dataset, rng):
+    index = _favorite(dataset, rng)
+    return ('POST', f'/api/favorites/{dataset.favorite_ids[index]}/add_product/',
+            {'product_id': dataset.next_missing_product(index)})
+
+
+def remove_product(dataset, rng):
+    index = _favorite(dataset, rng)
+    return ('POST', f'/api/favorites/{dataset.favorite_ids[index]}/remove_product/',
+            {'product_id': dataset.next_present_product(index)})
+
+
+def login(dataset, rng):
+    return 'POST', '/auth/login/', CREDENTIALS
+
+
+DRIVERS = ('in-process', 'live')
+
+# Leituras primeiro: as escritas alteram os dados vistos pelas demais
+SCENARIOS = {
+    'products-list': products_list,
+    'products-search': products_search,
+    'products-top': products_top,
+    'client-detail': client_detail,
+    'favorite-products': favorite_products,
+    'favorite-membership': favorite_membership,
+    'add-product': add_product,
+    'remove-product': remove_product,
+    'login': login,
+}
+
+
+def _encode(body):
+    return json.dumps(body).encode() if body is not None else b''
+
+
+def in_process_request(method, path, body, authorization):
+    """Sends one request through `core.wsgi.application`, with every middleware, without a socket."""
+    path, _, query = path.partition('?')
+    content = _encode(body)
+    environ = {
+        'REQUEST_METHOD': method, 'PATH_INFO': path, 'QUERY_STRING': query, 'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80', 'HTTP_AUTHORIZATION': authorization, 'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(content)), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(content),
+        'wsgi.errors': sys.stderr,
+    }
+    start = {}
+
+    def start_response(status, headers):
+        start.update(status=int(status.split()[0]), headers=dict(headers))
+
+    b''.join(wsgi_application(environ, start_response))
+    return start['status'], start['headers'].get('Server-Timing', '')
+
+
+class LiveSession:
+    """One keep-alive HTTP connection per worker thread to the local server."""
+
+    def __init__(self, port):
+        self.port = port
+        self.connection = None
+
+    def request(self, method, path, body, authorization):
+        headers = {'Authorization': authorization, 'Content-Type': 'application/json'}
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+            try:
+                self.connection.request(method, path, _encode(body) if body is not None else None, headers)
+                response = self.connection.getresponse()
+                response.read()
+                return response.status, response.getheader('Server-Timing', '')
+            except (ConnectionError, http.client.HTTPException):
+                # O servidor pode fechar a conexão entre requisições; tenta de novo em uma nova
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+class RequestHandler(QuietWSGIRequestHandler):
+    # Cabeçalhos e corpo da resposta saem em escritas separadas; sem isso cada resposta espera o ACK atrasado
+    disable_nagle_algorithm = True
+
+
+@contextmanager
+def local_server():
+    """Serves `core.wsgi.application` over HTTP on a free local port, in a background thread."""
+    server = ThreadedWSGIServer(('127.0.0.1', 0), RequestHandler, allow_reuse_address=False)
+    server.set_app(wsgi_application)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_address[1]
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def run_requests(requests, authorization, concurrency, port=None):
+    """
+    Sends `requests` from `concurrency` threads, in-process or to the local server on `port`, and
+    returns `(samples, elapsed)`, one `(latency, status, queries)` sample per request.
+    """
+    def worker(offset):
+        session = LiveSession(port) if port is not None else None
+        samples = []
+        for method, path, body in requests[offset::concurrency]:
+            started = time.perf_counter()
+            if session is not None:
+                status, timing = session.request(method, path, body, authorization)
+            else:
+                status, timing = in_process_request(method, path, body, authorization)
+            latency = time.perf_counter() - started
+            match = _QUERIES_RE.search(timing)
+            samples.append((latency, status, int(match.group(1)) if match else None))
+        if session is not None:
+            session.close()
+        connections.close_all()
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = [sample for part in executor.map(worker, range(concurrency)) for sample in part]
+    return samples, time.perf_counter() - started
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def summarize(samples, elapsed):
+    latencies = [latency for latency, _, _ in samples]
+    queries = [count for _, _, count in samples if count is not None]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for _, status, _ in samples if status >= 400),
+        'throughput': len(samples) / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'queries_per_request': sum(queries) / len(queries) if queries else None,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _row(result):
+    queries = result['queries_per_request']
+    return (f'{result["scenario"]:<20} {result["driver"]:<10} {result["concurrency"]:>4} '
+            f'{result["throughput"]:>9.1f} {result["p50_ms"]:>8.2f} {result["p95_ms"]:>8.2f} '
+            f'{result["p99_ms"]:>8.2f} {"-" if queries is None else f"{queries:.1f}":>8} {result["errors"]:>6}')
+
+
+def run(scenarios, drivers, concurrency_levels, requests=200, warmup=10, products=100_000, clients=10_000,
+        favorites_per_client=100, random_seed=42, response_cache=True):
+    """
+    Seeds a throwaway database and sends `requests` requests per scenario, driver and concurrency
+    level, after `warmup` unmeasured ones. Returns the results as a JSON-serializable dict.
+
+    Drivers: `in-process` calls the WSGI application directly from worker threads; `live` sends
+    real HTTP requests to a threaded server running in the same process. Queries per request come
+    from the `Server-Timing` header (see `utils.metrics`), so every request is sampled.
+    """
+    use_file_database()
+
+    results = []
+    overrides = {'REQUEST_METRICS_SAMPLE_RATE': 1.0, 'REQUEST_METRICS_N_PLUS_ONE_THRESHOLD': 10 ** 9}
+    if not response_cache:
+        overrides['RESPONSE_CACHE_TIMEOUT'] = 0
+    with test_database(), override_settings(**overrides), local_server() as port:
+        dataset = seed(products, clients, favorites_per_client, seed=random_seed)
+        rng = random.Random(random_seed)
+        print(f'{"scenario":<20} {"driver":<10} {"conc":>4} {"req/s":>9} {"p50 ms":>8} {"p95 ms":>8} '
+              f'{"p99 ms":>8} {"queries":>8} {"errors":>6}')
+        for scenario in scenarios:
+            for driver in drivers:
+                for concurrency in concurrency_levels:
+                    # As requisições são geradas antes, em ordem, para serem as mesmas a cada execução
+                    batch = [SCENARIOS[scenario](dataset, rng) for _ in range(warmup + requests)]
+                    driver_port = port if driver == 'live' else None
+                    run_requests(batch[:warmup], dataset.authorization, concurrency, driver_port)
+                    samples, elapsed = run_requests(batch[warmup:], dataset.authorization, concurrency, driver_port)
+                    result = {'scenario': scenario, 'driver': driver, 'concurrency': concurrency,
+                              **summarize(samples, elapsed)}
+                    results.append(result)
+                    print(_row(result))
+        vendor = connections['default'].vendor
+
+    return {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'commit': _git_commit(),
+        'environment': {'python': platform.python_version(), 'django': django.get_version(), 'database': vendor},
+        'parameters': {'products': products, 'clients': clients, 'favorites_per_client': favorites_per_client,
+                       'seed': random_seed, 'requests': requests, 'warmup': warmup,
+                       'response_cache': response_cache},
+        'results': results,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """
+    Prints the change of each result against the same scenario/driver/concurrency of `baseline`
+    and returns how many regressed: p95 latency up or throughput down by more than `tolerance`.
+    """
+    previous = {(r['scenario'], r['driver'], r['concurrency']): r for r in baseline['results']}
+    regressions = 0
+    print(f'\ncompared with {baseline.get("commit") or "baseline"} ({baseline["created_at"]})')
+    if baseline['parameters'] != current['parameters'] or baseline['environment'] != current['environment']:
+        print('warning: the runs used different parameters or environments')
+    print(f'{"scenario":<20} {"driver":<10} {"conc":>4} {"req/s":>9} {"p95":>9} {"queries":>9}')
+    for result in current['results']:
+        before = previous.get((result['scenario'], result['driver'], result['concurrency']))
+        if before is None:
+            continue
+        throughput = result['throughput'] / before['throughput'] - 1
+        p95 = result['p95_ms'] / before['p95_ms'] - 1
+        queries = ('-' if result['queries_per_request'] is None or before['queries_per_request'] is None
+                   else f'{result["queries_per_request"] - before["queries_per_request"]:+.1f}')
+        regressed = throughput < -tolerance or p95 > tolerance
+        regressions += regressed
+        print(f'{result["scenario"]:<20} {result["driver"]:<10} {result["concurrency"]:>4} '
+              f'{throughput:>+9.0%} {p95:>+9.0%} {queries:>9}{"  REGRESSION" if regressed else ""}')
+    return regressions
+
+
+def _csv(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def _drivers(value):
+    drivers = _csv(value)
+    # `both` é atalho para os dois drivers
+    return list(dict.fromkeys(driver for name in drivers for driver in (DRIVERS if name == 'both' else [name])))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load and latency benchmark of the API routes.')
+    parser.add_argument('--scenarios', type=_csv, default=list(SCENARIOS),
+                        help=f'Comma-separated, any of: {", ".join(SCENARIOS)}.')
+    parser.add_argument('--drivers', type=_drivers, default=list(DRIVERS),
+                        help='Comma-separated, any of: in-process, live, or both.')
+    parser.add_argument('--concurrency', type=lambda value: [int(c) for c in _csv(value)], default=[1, 8])
+    parser.add_argument('--requests', type=int, default=200, help='Measured requests per run.')
+    parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests before each run.')
+    parser.add_argument('--products', type=int, default=100_000)
+    parser.add_argument('--clients', type=int, default=10_000)
+    parser.add_argument('--favorites-per-client', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-response-cache', action='store_true', help='Disable the GET response cache.')
+    parser.add_argument('--output', help='Write the results to this JSON file.')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare with.')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Relative change in p95 or throughput reported as a regression.')
+    options = parser.parse_args(argv)
+
+    unknown = set(options.scenarios) - set(SCENARIOS) | set(options.drivers) - set(DRIVERS)
+    if unknown:
+        parser.error(f'unknown scenarios/drivers: {", ".join(sorted(unknown))}')
+
+    current = run(
+        options.scenarios, options.drivers, options.concurrency, requests=options.requests,
+        warmup=options.warmup, products=options.products, clients=options.clients,
+        favorites_per_client=options.favorites_per_client, random_seed=options.seed,
+        response_cache=not options.no_response_cache,
+    )
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(current, output, indent=2)
+    if options.compare:
+        with open(options.compare) as baseline:
+            return 1 if compare(current, json.load(baseline), options.tolerance) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,8 +9,20 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.core.handlers.asgi import ASGIHandler, ASGIRequest
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = get_asgi_application()
+
+class AsyncAPIRequest(ASGIRequest):
+    # Sob ASGI as rotas da API são resolvidas para as views assíncronas
+    urlconf = 'core.asgi_urls'
+
+
+class AsyncAPIHandler(ASGIHandler):
+    request_class = AsyncAPIRequest
+
+
+django.setup(set_prefix=False)
+application = AsyncAPIHandler()
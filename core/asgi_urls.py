@@ -0,0 +1,10 @@
+"""
+URLconf used by `core.asgi`: the API routes that have an async view resolve to it, everything
+else (auth, admin, docs, product import) falls through to `core.urls`.
+"""
+from django.urls import path, include
+from .urls import urlpatterns as wsgi_urlpatterns, handler404, handler500  # noqa: F401
+
+urlpatterns = [
+    path('api/', include('favoritehub.async_urls')),
+] + wsgi_urlpatterns
@@ -1,3 +1,4 @@
+import os
 from datetime import timedelta
 from pathlib import Path
 from decouple import config, Csv
@@ -28,6 +29,7 @@ INSTALLED_APPS = [
     'authentication',
     'favoritehub',
     'simple_history',
+    'utils',
 ]
 
 SWAGGER_SETTINGS = {
@@ -41,6 +43,7 @@ SWAGGER_SETTINGS = {
 }
 
 MIDDLEWARE = [
+    'utils.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -50,6 +53,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'simple_history.middleware.HistoryRequestMiddleware',
+    'utils.db_routing.ReadReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -72,32 +76,123 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'core.wsgi.application'
 
+DATABASE_ENGINE = config('DATABASE_ENGINE', default='django.db.backends.postgresql')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': DATABASE_ENGINE,
         'NAME': config('POSTGRES_DB', 'mydatabase'),
         'USER': config('POSTGRES_USER', 'myuser'),
         'PASSWORD': config('POSTGRES_PASSWORD', 'mypassword'),
         'HOST': config('DATABASE_HOST', 'localhost'),
         'PORT': config('DATABASE_PORT', '5432'),
+        # Conexões persistentes por thread, verificadas antes de serem reaproveitadas em cada requisição
+        'CONN_MAX_AGE': config('DATABASE_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Réplicas de leitura: host ou host:porta no PostgreSQL, caminho do arquivo no SQLite.
+# Ex.: DATABASE_REPLICAS=replica1.internal,replica2.internal:5433
+READ_REPLICAS = []
+for index, replica in enumerate(config('DATABASE_REPLICAS', default='', cast=Csv()), start=1):
+    alias = f'replica{index}'
+    if DATABASE_ENGINE == 'django.db.backends.sqlite3':
+        location = {'NAME': replica}
+    else:
+        host, _, port = replica.partition(':')
+        location = {'HOST': host, 'PORT': port or DATABASES['default']['PORT']}
+    # Nos testes a réplica aponta para o banco de teste do default
+    DATABASES[alias] = {**DATABASES['default'], **location, 'TEST': {'MIRROR': 'default'}}
+    READ_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['utils.db_routing.ReadReplicaRouter']
+
+# Apps cujas views GET/HEAD leem das réplicas (ver utils/db_routing.py)
+READ_REPLICA_APPS = ['favoritehub']
+# Depois de uma escrita, as leituras da mesma sessão ficam no primário por este tempo (segundos)
+READ_REPLICA_PIN_SECONDS = config('READ_REPLICA_PIN_SECONDS', default=5, cast=int)
+# Tempo (segundos) que uma réplica fora do ar deixa de ser usada antes de uma nova tentativa
+READ_REPLICA_RETRY_SECONDS = config('READ_REPLICA_RETRY_SECONDS', default=30, cast=int)
+
+# Fração das requisições instrumentadas (queries, tempo de banco, Server-Timing e /metrics); 0 desliga
+REQUEST_METRICS_SAMPLE_RATE = config('REQUEST_METRICS_SAMPLE_RATE', default=0.0, cast=float)
+# SELECTs que só diferem nos parâmetros e se repetem este número de vezes na requisição são registrados como N+1
+REQUEST_METRICS_N_PLUS_ONE_THRESHOLD = config('REQUEST_METRICS_N_PLUS_ONE_THRESHOLD', default=5, cast=int)
+# O /metrics exige o header Authorization: Bearer <token>; sem token definido ele responde 404
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Índice em memória dos produtos de cada lista de favoritos (ver favoritehub/favorites_index.py).
+# Máximo de IDs de produto guardados no processo (8 bytes cada); 0 desliga
+FAVORITES_INDEX_MAX_PRODUCTS = config('FAVORITES_INDEX_MAX_PRODUCTS', default=0, cast=int)
+# Idade máxima (segundos) de uma lista no índice; limita o atraso para ver escritas de outros processos
+FAVORITES_INDEX_TTL = config('FAVORITES_INDEX_TTL', default=30, cast=int)
+
+# Avisos de mudança de preço aos clientes que favoritaram o produto (ver favoritehub/notifications.py).
+# Threads do pool iniciado no próprio processo ao enfileirar um job; 0 deixa os jobs para o comando run_notification_workers
+NOTIFICATION_WORKERS = config('NOTIFICATION_WORKERS', default=0, cast=int)
+# Listas de favoritos lidas e notificações gravadas por transação
+NOTIFICATION_BATCH_SIZE = config('NOTIFICATION_BATCH_SIZE', default=1000, cast=int)
+# Intervalo (segundos) em que um worker ocioso procura jobs novos
+NOTIFICATION_POLL_INTERVAL = config('NOTIFICATION_POLL_INTERVAL', default=1.0, cast=float)
+# Um job em execução sem progresso por este tempo (segundos) é retomado por outro worker
+NOTIFICATION_JOB_TIMEOUT = config('NOTIFICATION_JOB_TIMEOUT', default=300, cast=int)
+
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'utils.pagination.KeysetPagination',
     'PAGE_SIZE': 5,
     'NON_FIELD_ERRORS_KEY': 'error',
     'EXCEPTION_HANDLER': 'utils.exceptionhandler.custom_exception_handler',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'authentication.authentication.CachedJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'utils.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
+# 'orjson' usa o orjson (se instalado) para gerar o JSON das respostas; 'json' usa o encoder padrão do DRF
+JSON_RENDERER_BACKEND = config('JSON_RENDERER_BACKEND', default='orjson')
+
+# Cache das respostas GET de produtos, clientes e favoritos (ver utils/response_cache.py).
+# Com mais de um processo use um backend compartilhado, ex.: django.core.cache.backends.filebased.FileBasedCache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': config('RESPONSE_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('RESPONSE_CACHE_LOCATION', default='responses'),
+    },
+}
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=300, cast=int)
+
+# Cache em memória do usuário autenticado por JWT (ver authentication/authentication.py)
+JWT_USER_CACHE_TTL = config('JWT_USER_CACHE_TTL', default=60, cast=int)
+JWT_USER_CACHE_SIZE = config('JWT_USER_CACHE_SIZE', default=10000, cast=int)
+
+# '' grava o histórico a cada save; 'transaction' agrupa por transação e grava no commit;
+# 'queue' entrega os registros a uma thread em background que grava em lotes
+SIMPLE_HISTORY_BUFFER = config('SIMPLE_HISTORY_BUFFER', default='')
+SIMPLE_HISTORY_BUFFER_BATCH_SIZE = config('SIMPLE_HISTORY_BUFFER_BATCH_SIZE', default=500, cast=int)
+
+# Política de retenção usada pelo comando prune_history, por modelo ou 'default', ex.:
+# {'favoritehub.Product': {'keep_versions': 50, 'max_age_days': 365}}
+SIMPLE_HISTORY_RETENTION = {}
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=8),
-    'REFRESH_TOKEN_LIFETIME': timedelta(days=1)
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    'TOKEN_REFRESH_SERIALIZER': 'authentication.serializers.TokenRefreshSerializer',
 }
 
+# Intervalo máximo (segundos) para o filtro em memória ver tokens revogados por outros processos
+TOKEN_BLACKLIST_REFRESH_INTERVAL = config('TOKEN_BLACKLIST_REFRESH_INTERVAL', default=5, cast=float)
+
+# Threads usadas pelo login assíncrono para calcular o hash das senhas
+PASSWORD_HASHING_WORKERS = config('PASSWORD_HASHING_WORKERS', default=os.cpu_count() or 1, cast=int)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import Client, Product, Favorite
+from .models import Client, Product, Review, Favorite
 
 admin.site.register(Client)
 admin.site.register(Product)
+admin.site.register(Review)
 admin.site.register(Favorite)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class FavoritehubConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'favoritehub'
+
+    def ready(self):
+        from . import signals  # noqa: F401
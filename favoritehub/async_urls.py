@@ -0,0 +1,35 @@
+from django.urls import path, re_path
+from .async_views import (
+    AsyncClientListCreateAPIView,
+    AsyncClientDetailAPIView,
+    AsyncProductListCreateAPIView,
+    AsyncFavoriteListCreateAPIView,
+    AsyncFavoriteDetailAPIView,
+    AsyncFavoriteExportAPIView,
+    AsyncFavoriteMembershipAPIView,
+    AsyncFavoriteAddProductAPIView,
+    AsyncFavoriteRemoveProductAPIView,
+    AsyncFavoriteBulkProductsAPIView,
+    AsyncFavoriteProductsAPIView,
+    AsyncFavoritePriceDropsAPIView)
+
+# Mesmas rotas (e nomes) geradas pelo router em urls.py
+urlpatterns = [
+    path('clients/', AsyncClientListCreateAPIView.as_view(), name='client-list'),
+    re_path(r'^clients/(?P<pk>\d+)/$', AsyncClientDetailAPIView.as_view(), name='client-detail'),
+    path('favorites/', AsyncFavoriteListCreateAPIView.as_view(), name='favorite-list'),
+    path('favorites/export/', AsyncFavoriteExportAPIView.as_view(), name='favorite-export'),
+    path('favorites/membership/', AsyncFavoriteMembershipAPIView.as_view(), name='favorite-membership'),
+    re_path(r'^favorites/(?P<pk>\d+)/$', AsyncFavoriteDetailAPIView.as_view(), name='favorite-detail'),
+    re_path(r'^favorites/(?P<pk>\d+)/add_product/$', AsyncFavoriteAddProductAPIView.as_view(),
+            name='favorite-add-product'),
+    re_path(r'^favorites/(?P<pk>\d+)/remove_product/$', AsyncFavoriteRemoveProductAPIView.as_view(),
+            name='favorite-remove-product'),
+    re_path(r'^favorites/(?P<pk>\d+)/bulk_products/$', AsyncFavoriteBulkProductsAPIView.as_view(),
+            name='favorite-bulk-products'),
+    re_path(r'^favorites/(?P<pk>\d+)/products/$', AsyncFavoriteProductsAPIView.as_view(),
+            name='favorite-products'),
+    re_path(r'^favorites/(?P<pk>\d+)/price_drops/$', AsyncFavoritePriceDropsAPIView.as_view(),
+            name='favorite-price-drops'),
+    path('products/', AsyncProductListCreateAPIView.as_view(), name='product-list-create'),
+]
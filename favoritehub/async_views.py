@@ -0,0 +1,209 @@
+"""
+Async versions of the client, product and favorite endpoints, served under ASGI (see `core/asgi_urls.py`).
+
+They keep the URLs, authentication, permissions, serializers and responses of the views in
+`views.py`; only the request cycle and the queries run on the event loop.
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from utils.async_views import (
+    AsyncCreateModelMixin,
+    AsyncDestroyModelMixin,
+    AsyncGenericAPIView,
+    AsyncListCreateAPIView,
+    AsyncListModelMixin,
+    AsyncRetrieveModelMixin,
+    AsyncRetrieveUpdateDestroyAPIView,
+)
+from utils.response_cache import cache_response
+from .exporters import EXPORTERS, aiter_in_batches, iter_favorite_rows
+from .favorites_index import afavorited_product_ids, ahas_product
+from .filters import ProductOrderingFilter, ProductSearchFilter
+from .models import Client, Product, Favorite, PriceChange
+from .price_changes import price_drops
+from .serializers import (
+    ClientSerializer, ProductSerializer, FavoriteSerializer, FavoriteBulkProductsSerializer, PriceDropSerializer)
+from .views import (
+    export_response, get_export_options, get_membership_query, get_price_drop_window, membership_response,
+    PriceDropPagination)
+
+
+class AsyncClientListCreateAPIView(AsyncListCreateAPIView):
+    permission_classes = (IsAuthenticated,)
+    queryset = Client.objects.all().order_by('id')
+    serializer_class = ClientSerializer
+
+    @cache_response(Client)
+    async def list(self, request, *args, **kwargs):
+        return await super().list(request, *args, **kwargs)
+
+
+class AsyncClientDetailAPIView(AsyncRetrieveUpdateDestroyAPIView):
+    permission_classes = (IsAuthenticated,)
+    queryset = Client.objects.all().order_by('id')
+    serializer_class = ClientSerializer
+
+    @cache_response(Client)
+    async def retrieve(self, request, *args, **kwargs):
+        return await super().retrieve(request, *args, **kwargs)
+
+
+class AsyncProductListCreateAPIView(AsyncListCreateAPIView):
+    permission_classes = (IsAuthenticated,)
+    queryset = Product.objects.all().order_by('id')
+    serializer_class = ProductSerializer
+    filter_backends = (ProductSearchFilter, ProductOrderingFilter)
+    ordering_fields = ('id', 'price')
+    ordering = ('id',)
+
+    @cache_response(Product)
+    async def list(self, request, *args, **kwargs):
+        return await super().list(request, *args, **kwargs)
+
+
+class AsyncFavoriteListCreateAPIView(AsyncListModelMixin, AsyncCreateModelMixin, AsyncGenericAPIView):
+    permission_classes = (IsAuthenticated,)
+    queryset = Favorite.objects.all().order_by('id')
+    serializer_class = FavoriteSerializer
+
+    @cache_response(Favorite)
+    async def get(self, request, *args, **kwargs):
+        return await self.list(request, *args, **kwargs)
+
+    async def post(self, request, *args, **kwargs):
+        data = request.data.copy()
+        data['products'] = []
+        serializer = self.get_serializer(data=data)
+        await self.asave_serializer(serializer)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+
+class AsyncFavoriteDetailAPIView(AsyncRetrieveModelMixin, AsyncDestroyModelMixin, AsyncGenericAPIView):
+    permission_classes = (IsAuthenticated,)
+    queryset = Favorite.objects.all().order_by('id')
+    serializer_class = FavoriteSerializer
+
+    @cache_response(Favorite)
+    async def get(self, request, *args, **kwargs):
+        return await self.retrieve(request, *args, **kwargs)
+
+    async def delete(self, request, *args, **kwargs):
+        return await self.destroy(request, *args, **kwargs)
+
+
+class AsyncFavoriteExportAPIView(AsyncGenericAPIView):
+    permission_classes = (IsAuthenticated,)
+    queryset = Favorite.objects.all().order_by('id')
+
+    async def get(self, request):
+        output, since = get_export_options(request.query_params)
+        exporter = EXPORTERS[output][0]
+        # O cursor é consumido em lotes em uma thread, sem bloquear o event loop nem bufferizar a exportação
+        return export_response(aiter_in_batches(exporter(iter_favorite_rows(since=since))), output)
+
+
+class AsyncFavoriteMembershipAPIView(AsyncGenericAPIView):
+    permission_classes = (IsAuthenticated,)
+
+    async def get(self, request):
+        query = get_membership_query(request.query_params)
+        favorited = await afavorited_product_ids(
+            query['product_ids'], favorite_id=query.get('favorite'), client_id=query.get('client'))
+        return membership_response(query['product_ids'], favorited)
+
+
+class AsyncFavoriteAddProductAPIView(AsyncGenericAPIView):
+    permission_classes = (IsAuthenticated,)
+    queryset = Favorite.objects.all().order_by('id')
+    serializer_class = FavoriteSerializer
+
+    async def post(self, request, pk=None):
+        favorite_list = await self.aget_object()
+        product_id = request.data.get('product_id')
+        try:
+            product = await Product.objects.aget(id=product_id)
+        except Product.DoesNotExist:
+            return Response({'error': 'Product does not exist'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if await ahas_product(favorite_list, product.id):
+            return Response({'error': 'Product already in the favorite list'}, status=status.HTTP_400_BAD_REQUEST)
+
+        await favorite_list.aadd_product(product)
+        return Response({'status': 'product added'})
+
+
+class AsyncFavoriteRemoveProductAPIView(AsyncGenericAPIView):
+    permission_classes = (IsAuthenticated,)
+    queryset = Favorite.objects.all().order_by('id')
+    serializer_class = FavoriteSerializer
+
+    async def post(self, request, pk=None):
+        favorite_list = await self.aget_object()
+        product_id = request.data.get('product_id')
+        try:
+            product = await Product.objects.aget(id=product_id)
+        except Product.DoesNotExist:
+            return Response({'error': 'Product does not exist'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not await ahas_product(favorite_list, product.id):
+            return Response({'error': 'Product not in the favorite list.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        await favorite_list.aremove_product(product)
+        return Response({'status': 'product removed'})
+
+
+class AsyncFavoriteBulkProductsAPIView(AsyncGenericAPIView):
+    permission_classes = (IsAuthenticated,)
+    queryset = Favorite.objects.all().order_by('id')
+    serializer_class = FavoriteBulkProductsSerializer
+
+    async def post(self, request, pk=None):
+        favorite_list = await self.aget_object()
+        serializer = FavoriteBulkProductsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # Validação e escrita acontecem em uma única transação, que precisa rodar em uma só thread
+        results = await sync_to_async(favorite_list.bulk_update_products)(
+            add_ids=serializer.validated_data['add'],
+            remove_ids=serializer.validated_data['remove'],
+        )
+        return Response({'results': [{'product_id': product_id, 'status': result} for product_id, result in results]})
+
+
+class AsyncFavoriteProductsAPIView(AsyncGenericAPIView):
+    permission_classes = (IsAuthenticated,)
+    serializer_class = ProductSerializer
+
+    def get_queryset(self):
+        return (
+            Product.objects.filter(favorite_clients__id=self.kwargs['pk'])
+            .only('id', 'title', 'image', 'price', 'rating_average')
+            .order_by('id')
+        )
+
+    @cache_response(Product, Favorite)
+    async def get(self, request, pk=None):
+        page = await self.apaginate_queryset(self.get_queryset())
+        if not page and not await Favorite.objects.filter(pk=pk).aexists():
+            raise Http404
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class AsyncFavoritePriceDropsAPIView(AsyncGenericAPIView):
+    permission_classes = (IsAuthenticated,)
+    serializer_class = PriceDropSerializer
+    pagination_class = PriceDropPagination
+
+    @cache_response(PriceChange, Product, Favorite)
+    async def get(self, request, pk=None):
+        since, until = get_price_drop_window(request.query_params)
+        page = await self.apaginate_queryset(price_drops(pk, since, until))
+        if not page and not await Favorite.objects.filter(pk=pk).aexists():
+            raise Http404
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
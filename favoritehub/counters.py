@@ -0,0 +1,43 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from .models import Favorite, Product
+
+COUNTERS = (
+    (Product, 'favorites_count', 'product_id'),
+    (Favorite, 'favorites_size', 'favorite_id'),
+)
+
+
+def _actual_count(column):
+    through = Favorite.products.through
+    counts = through.objects.filter(**{column: OuterRef('pk')}).order_by().values(column).annotate(n=Count('*'))
+    return Coalesce(Subquery(counts.values('n')), 0)
+
+
+def iter_reconcile_favorite_counters(chunk_size=2000, dry_run=False):
+    """
+    Recounts `Product.favorites_count` and `Favorite.favorites_size` from the through table, one
+    id range of `chunk_size` rows per transaction, and fixes the rows that drifted.
+
+    Yields `(model, drifted)` after each chunk, where `drifted` is the number of rows whose stored
+    counter did not match (and, unless `dry_run`, was overwritten with the real count).
+    """
+    for model, field, column in COUNTERS:
+        actual = _actual_count(column)
+        last_pk = 0
+        while True:
+            ids = list(model.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size])
+            if not ids:
+                break
+            last_pk = ids[-1]
+            with transaction.atomic():
+                drifted = list(
+                    model.objects.filter(pk__gte=ids[0], pk__lte=last_pk)
+                    .annotate(actual=actual).exclude(**{field: F('actual')})
+                    .values_list('pk', flat=True)
+                )
+                if drifted and not dry_run:
+                    # Recontado no próprio UPDATE, sobre o estado atual de cada linha
+                    model.objects.filter(pk__in=drifted).update(**{field: actual})
+            yield model, len(drifted)
@@ -0,0 +1,127 @@
+import csv
+import io
+import json
+from datetime import datetime, time
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .history_diff import get_history_model
+from .models import Client, Favorite, Product
+
+ROW_FIELDS = {
+    'favorite_id': 'id',
+    'client_id': 'client__id',
+    'client_name': 'client__name',
+    'client_email': 'client__email',
+    'product_id': 'products__id',
+    'product_title': 'products__title',
+    'product_image': 'products__image',
+    'product_price': 'products__price',
+}
+
+
+def parse_since(value):
+    """Parses an ISO 8601 date or date-time; naive values are in the current time zone."""
+    since = parse_datetime(value)
+    if since is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid date/time: {value!r}')
+        since = datetime.combine(day, time.min)
+    return timezone.make_aware(since) if timezone.is_naive(since) else since
+
+
+def changed_since(since):
+    """
+    Condition matching the favorite lists with a historical version at or after `since`: the list
+    itself (including its products, see `signals.record_favorite_products_change`), its client or
+    one of its products.
+    """
+    through = Favorite.products.through
+    changed_products = get_history_model(Product).objects.filter(history_date__gte=since).values('id')
+    return (
+        Exists(get_history_model(Favorite).objects.filter(id=OuterRef('pk'), history_date__gte=since))
+        | Exists(get_history_model(Client).objects.filter(id=OuterRef('client_id'), history_date__gte=since))
+        | Exists(through.objects.filter(favorite_id=OuterRef('pk'), product_id__in=changed_products))
+    )
+
+
+def iter_favorite_rows(since=None, chunk_size=2000):
+    """
+    Yields one dict per (favorite list, product) pair, ordered by favorite and product id.
+
+    Everything is read with a single query that joins clients and products through the
+    `Favorite.products` table (a list without products yields one row with empty product
+    columns), streamed with `.iterator()`, so memory does not grow with the number of rows.
+    """
+    queryset = Favorite.objects.all()
+    if since is not None:
+        queryset = queryset.filter(changed_since(since))
+    queryset = queryset.order_by('id', 'products__id').values(*ROW_FIELDS.values())
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield {name: row[lookup] for name, lookup in ROW_FIELDS.items()}
+
+
+def iter_favorite_records(rows):
+    """Groups consecutive rows of the same favorite list into `{client, favorite, products}` records."""
+    record = None
+    for row in rows:
+        if record is None or record['favorite']['id'] != row['favorite_id']:
+            if record is not None:
+                yield record
+            record = {
+                'client': {'id': row['client_id'], 'name': row['client_name'], 'email': row['client_email']},
+                'favorite': {'id': row['favorite_id']},
+                'products': [],
+            }
+        if row['product_id'] is not None:
+            record['products'].append({
+                'id': row['product_id'],
+                'title': row['product_title'],
+                'image': row['product_image'],
+                'price': row['product_price'],
+            })
+    if record is not None:
+        yield record
+
+
+def iter_ndjson(rows):
+    for record in iter_favorite_records(rows):
+        yield json.dumps(record, cls=DjangoJSONEncoder) + '\n'
+
+
+def iter_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(ROW_FIELDS))
+    writer.writeheader()
+    for row in rows:
+        # Entrega cada linha assim que é escrita, sem acumular o arquivo em memória
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+    yield buffer.getvalue()
+
+
+async def aiter_in_batches(iterable, batch_size=1000):
+    """
+    Consumes a sync iterable that reads from the database from async code, `batch_size` items per
+    thread hop. All batches run on the same thread, which keeps the server-side cursor usable.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = await sync_to_async(lambda: list(islice(iterator, batch_size)))()
+        if not batch:
+            return
+        for item in batch:
+            yield item
+
+
+EXPORTERS = {
+    'ndjson': (iter_ndjson, 'application/x-ndjson'),
+    'csv': (iter_csv, 'text/csv'),
+}
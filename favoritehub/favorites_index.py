@@ -0,0 +1,256 @@
+"""
+Process-local index of the products in each favorite list, for membership checks without a query.
+
+Each cached list is a sorted `array('q')` of product ids (8 bytes per product, no per-item
+objects), found by favorite id or client id and searched with `bisect`. The index holds at most
+`FAVORITES_INDEX_MAX_PRODUCTS` product ids in total, evicting the least recently used lists, and
+a setting of 0 (the default) turns it off.
+
+The `m2m_changed`, save and delete signals of this process invalidate the affected lists right
+away and again on commit (see `favoritehub/signals.py`); a list changed by an open transaction is
+not cached until it commits, so a rollback never leaves uncommitted products behind. Writes made
+by other processes, or that bypass the signals (`QuerySet.update`, raw bulk inserts), are only
+seen once an entry is older than `FAVORITES_INDEX_TTL` seconds.
+"""
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from utils.metrics import register_collector
+from .models import Favorite
+
+
+def contains(products, product_id):
+    index = bisect_left(products, product_id)
+    return index < len(products) and products[index] == product_id
+
+
+class _Entry:
+    __slots__ = ('favorite_id', 'client_id', 'products', 'expires')
+
+    def __init__(self, favorite_id, client_id, products, expires):
+        self.favorite_id = favorite_id
+        self.client_id = client_id
+        self.products = products
+        self.expires = expires
+
+    @property
+    def cost(self):
+        # Listas vazias também ocupam memória
+        return len(self.products) + 1
+
+
+class _PendingInvalidation:
+    def __init__(self, index):
+        self.index = index
+        self.favorite_ids = set()
+        self.everything = False
+
+    def add(self, favorite_ids):
+        if favorite_ids is None:
+            self.everything = True
+        else:
+            self.favorite_ids |= favorite_ids
+
+    def flush(self):
+        self.index._discard(None if self.everything else self.favorite_ids)
+
+
+class FavoritesIndex:
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.by_client = {}
+        self.lock = threading.Lock()
+        self.size = 0
+        # Incrementado a cada invalidação: uma leitura feita antes dela não é guardada
+        self.version = 0
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    @property
+    def max_products(self):
+        return settings.FAVORITES_INDEX_MAX_PRODUCTS
+
+    @property
+    def enabled(self):
+        return self.max_products > 0
+
+    def _lookup(self, favorite_id, client_id):
+        now = time.monotonic()
+        with self.lock:
+            key = favorite_id if favorite_id is not None else self.by_client.get(client_id)
+            entry = self.entries.get(key)
+            if entry is not None and entry.expires > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry.products, self.version
+            if entry is not None:
+                self._remove(entry)
+            self.misses += 1
+            return None, self.version
+
+    @staticmethod
+    def _query(favorite_id, client_id):
+        lookup = {'pk': favorite_id} if favorite_id is not None else {'client_id': client_id}
+        # LEFT JOIN: uma lista vazia ainda devolve uma linha, com o produto nulo
+        return Favorite.objects.filter(**lookup).order_by('products__id').values_list('id', 'client_id', 'products__id')
+
+    def _store(self, rows, version):
+        if not rows:
+            return None
+        favorite_id, client_id = rows[0][0], rows[0][1]
+        products = array('q', (product_id for _, _, product_id in rows if product_id is not None))
+        with self.lock:
+            if version != self.version or not self._cacheable(favorite_id):
+                return products
+            previous = self.entries.get(favorite_id)
+            if previous is not None:
+                self._remove(previous)
+            entry = _Entry(favorite_id, client_id, products, time.monotonic() + settings.FAVORITES_INDEX_TTL)
+            if entry.cost > self.max_products:
+                return products
+            self.entries[favorite_id] = entry
+            self.by_client[client_id] = favorite_id
+            self.size += entry.cost
+            while self.size > self.max_products:
+                self._remove(next(iter(self.entries.values())))
+                self.evictions += 1
+        return products
+
+    def _remove(self, entry):
+        del self.entries[entry.favorite_id]
+        if self.by_client.get(entry.client_id) == entry.favorite_id:
+            del self.by_client[entry.client_id]
+        self.size -= entry.cost
+
+    def _cacheable(self, favorite_id):
+        pending = self._pending()
+        return pending is None or not (pending.everything or favorite_id in pending.favorite_ids)
+
+    def get(self, favorite_id=None, client_id=None):
+        """
+        Sorted product ids of the favorite list `favorite_id` (or of client `client_id`), loaded
+        with one query on a miss; None if the list does not exist.
+        """
+        products, version = self._lookup(favorite_id, client_id)
+        if products is None:
+            products = self._store(list(self._query(favorite_id, client_id)), version)
+        return products
+
+    async def aget(self, favorite_id=None, client_id=None):
+        products, version = self._lookup(favorite_id, client_id)
+        if products is None:
+            products = self._store([row async for row in self._query(favorite_id, client_id)], version)
+        return products
+
+    def _discard(self, favorite_ids):
+        with self.lock:
+            self.version += 1
+            if favorite_ids is None:
+                self.entries.clear()
+                self.by_client.clear()
+                self.size = 0
+                return
+            for favorite_id in favorite_ids:
+                entry = self.entries.get(favorite_id)
+                if entry is not None:
+                    self._remove(entry)
+
+    @staticmethod
+    def _pending(using=None):
+        """The lists changed by the transaction open on this thread, if any."""
+        connection = transaction.get_connection(using)
+        pending = getattr(connection, 'pending_favorites_index', None)
+        # Sem o callback na fila, a transação que o registrou já terminou (commit ou rollback)
+        if pending is None or not any(func == pending.flush for _, func, _ in connection.run_on_commit):
+            return None
+        return pending
+
+    def invalidate(self, favorite_ids=None, using=None):
+        """
+        Drops the given lists (all of them with None) now and again when the current transaction
+        commits. Until then, the lists are not cached by this thread, which sees the uncommitted
+        rows, nor kept from reads of the old rows by other threads.
+        """
+        if not self.enabled and not self.entries:
+            return
+        favorite_ids = None if favorite_ids is None else set(favorite_ids)
+        self.invalidations += 1
+        self._discard(favorite_ids)
+        connection = transaction.get_connection(using)
+        if not connection.in_atomic_block:
+            return
+        pending = self._pending(using)
+        if pending is None:
+            pending = connection.pending_favorites_index = _PendingInvalidation(self)
+            transaction.on_commit(pending.flush, using=using)
+        pending.add(favorite_ids)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.by_client.clear()
+            self.size = 0
+            self.version += 1
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'lists': len(self.entries),
+                'products': self.size - len(self.entries),
+                'bytes': sum(entry.products.itemsize * len(entry.products) for entry in self.entries.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+favorites_index = FavoritesIndex()
+
+
+def favorited_product_ids(product_ids, favorite_id=None, client_id=None):
+    """Same as `Favorite.favorited_product_ids`, answered from the index when it is enabled."""
+    if not favorites_index.enabled:
+        return Favorite.favorited_product_ids(product_ids, favorite_id=favorite_id, client_id=client_id)
+    products = favorites_index.get(favorite_id=favorite_id, client_id=client_id)
+    return {product_id for product_id in product_ids if products is not None and contains(products, product_id)}
+
+
+async def afavorited_product_ids(product_ids, favorite_id=None, client_id=None):
+    if not favorites_index.enabled:
+        return await Favorite.afavorited_product_ids(product_ids, favorite_id=favorite_id, client_id=client_id)
+    products = await favorites_index.aget(favorite_id=favorite_id, client_id=client_id)
+    return {product_id for product_id in product_ids if products is not None and contains(products, product_id)}
+
+
+def has_product(favorite_list, product_id):
+    """Whether `product_id` is in `favorite_list`, from the index when it is enabled."""
+    if not favorites_index.enabled:
+        return favorite_list.products.filter(id=product_id).exists()
+    products = favorites_index.get(favorite_id=favorite_list.pk)
+    return products is not None and contains(products, product_id)
+
+
+async def ahas_product(favorite_list, product_id):
+    if not favorites_index.enabled:
+        return await favorite_list.products.filter(id=product_id).aexists()
+    products = await favorites_index.aget(favorite_id=favorite_list.pk)
+    return products is not None and contains(products, product_id)
+
+
+@register_collector
+def collect_favorites_index_stats():
+    stats = favorites_index.stats()
+    yield 'favorites_index_hits_total', 'counter', 'Index lookups answered from memory.', stats['hits']
+    yield 'favorites_index_misses_total', 'counter', 'Index lookups that queried the database.', stats['misses']
+    yield 'favorites_index_evictions_total', 'counter', 'Favorite lists evicted from the index.', stats['evictions']
+    yield 'favorites_index_lists', 'gauge', 'Favorite lists held by the index.', stats['lists']
+    yield 'favorites_index_bytes', 'gauge', 'Bytes of product ids held by the index.', stats['bytes']
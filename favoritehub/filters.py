@@ -0,0 +1,61 @@
+from decimal import Decimal, InvalidOperation
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+from .search import search_products
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """
+    `?search=` matches every word against the product title (see `favoritehub.search`) and
+    `?min_price=` / `?max_price=` restrict the price range, served by the `(price, id)` index.
+    """
+    search_param = 'search'
+    price_params = (('min_price', 'price__gte'), ('max_price', 'price__lte'))
+
+    def filter_queryset(self, request, queryset, view):
+        for param, lookup in self.price_params:
+            value = request.query_params.get(param)
+            if value:
+                try:
+                    value = Decimal(value)
+                except InvalidOperation:
+                    raise ValidationError({param: 'A valid number is required.'})
+                if not value.is_finite():
+                    raise ValidationError({param: 'A valid number is required.'})
+                queryset = queryset.filter(**{lookup: value})
+
+        query = request.query_params.get(self.search_param, '').strip()
+        if query:
+            queryset = search_products(
+                queryset, query, rank=ProductOrderingFilter.wants_relevance(request))
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {'name': self.search_param, 'required': False, 'in': 'query',
+             'description': 'Words that must all appear in the title.', 'schema': {'type': 'string'}},
+            *({'name': param, 'required': False, 'in': 'query', 'schema': {'type': 'number'}}
+              for param, _ in self.price_params),
+        ]
+
+
+class ProductOrderingFilter(OrderingFilter):
+    """
+    Orders by the view's `ordering_fields`, always ending with `id` so the cursor paginator gets
+    a unique ordering. `?ordering=relevance` together with `?search=` puts the best matches first.
+    """
+    relevance = 'relevance'
+
+    @classmethod
+    def wants_relevance(cls, request):
+        return (request.query_params.get(cls.ordering_param) == cls.relevance
+                and bool(request.query_params.get(ProductSearchFilter.search_param, '').strip()))
+
+    def get_ordering(self, request, queryset, view):
+        if self.wants_relevance(request) and 'search_rank' in queryset.query.annotations:
+            return ['-search_rank', 'id']
+        ordering = list(super().get_ordering(request, queryset, view) or ['id'])
+        if not {'id', '-id'} & set(ordering):
+            ordering.append('id')
+        return ordering
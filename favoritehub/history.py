@@ -0,0 +1,212 @@
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections, models, transaction, DEFAULT_DB_ALIAS, OperationalError
+from django.utils import timezone
+from simple_history.models import HistoricalRecords
+from simple_history.signals import pre_create_historical_record, post_create_historical_record
+
+logger = logging.getLogger(__name__)
+
+BUFFER_TRANSACTION = 'transaction'
+BUFFER_QUEUE = 'queue'
+
+
+class _TransactionBuffer:
+    """
+    Historical rows created under the same set of savepoints of one transaction.
+
+    The buffer is flushed by an `on_commit` callback, so if its savepoint is rolled back Django
+    drops the callback and the rows are discarded together with the changes they describe.
+    """
+
+    def __init__(self, using):
+        self.using = using
+        self.entries = []
+        self.alive = True
+
+    def flush(self):
+        self.alive = False
+        _write_entries(self.entries, self.using)
+
+
+def _write_entries(entries, using):
+    if not entries:
+        return
+    if getattr(settings, 'SIMPLE_HISTORY_BUFFER', '') == BUFFER_QUEUE:
+        _queue_writer.put(entries, using)
+        return
+    _bulk_insert(entries, using)
+
+
+def _bulk_insert(entries, using):
+    by_model = {}
+    for entry in entries:
+        by_model.setdefault(type(entry[1]), []).append(entry)
+    for history_model, model_entries in by_model.items():
+        history_model.objects.using(using).bulk_create([history_instance for _, history_instance in model_entries])
+        for instance, history_instance in model_entries:
+            post_create_historical_record.send(
+                sender=history_model,
+                instance=instance,
+                history_instance=history_instance,
+                history_date=history_instance.history_date,
+                history_user=history_instance.history_user,
+                history_change_reason=history_instance.history_change_reason,
+                using=using,
+            )
+
+
+class _QueueWriter:
+    """
+    Background thread that drains committed historical rows in batches, in commit order.
+    """
+
+    MAX_ATTEMPTS = 5
+    RETRY_DELAY = 0.05
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def put(self, entries, using):
+        self._ensure_started()
+        self.queue.put((entries, using))
+
+    def _ensure_started(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        batch_size = getattr(settings, 'SIMPLE_HISTORY_BUFFER_BATCH_SIZE', 500)
+        while True:
+            entries, using = self.queue.get()
+            pending = [(entries, using)]
+            count = len(entries)
+            while count < batch_size:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                pending.append(item)
+                count += len(item[0])
+            try:
+                for alias in dict.fromkeys(using for _, using in pending):
+                    self._write_with_retry([e for entries, using in pending if using == alias for e in entries], alias)
+            except Exception:
+                logger.exception('Failed to write %s buffered historical records', count)
+            finally:
+                for _ in pending:
+                    self.queue.task_done()
+
+    def _write_with_retry(self, entries, using):
+        for attempt in range(self.MAX_ATTEMPTS):
+            try:
+                with transaction.atomic(using=using):
+                    _bulk_insert(entries, using)
+                return
+            except OperationalError:
+                if attempt == self.MAX_ATTEMPTS - 1:
+                    raise
+                connections[using].close_if_unusable_or_obsolete()
+                time.sleep(self.RETRY_DELAY * 2 ** attempt)
+
+    def join(self):
+        """Blocks until every queued historical row has been written."""
+        self.queue.join()
+
+
+_queue_writer = _QueueWriter()
+_local = threading.local()
+
+
+def flush_history_queue():
+    _queue_writer.join()
+
+
+class BufferedHistoricalRecords(HistoricalRecords):
+    """
+    `HistoricalRecords` that can defer the historical INSERTs until the transaction commits.
+
+    Controlled by the `SIMPLE_HISTORY_BUFFER` setting:
+    - empty (default): every save writes its historical row immediately, as usual.
+    - `transaction`: rows created inside an atomic block are written with one `bulk_create` on commit.
+    - `queue`: committed rows are handed to a background thread that writes them in batches.
+
+    The history user, date and change reason are resolved when the change happens, so attribution
+    and ordering by `history_date` are the same as in the unbuffered mode.
+    """
+
+    def get_meta_options(self, model):
+        # Índice composto para as consultas por objeto ordenadas por data (diff, retenção)
+        meta_options = super().get_meta_options(model)
+        meta_options['indexes'] = [models.Index(fields=[model._meta.pk.attname, 'history_date'])]
+        return meta_options
+
+    def create_historical_record(self, instance, history_type, using=None):
+        mode = getattr(settings, 'SIMPLE_HISTORY_BUFFER', '')
+        if mode not in (BUFFER_TRANSACTION, BUFFER_QUEUE) or self.m2m_fields:
+            return super().create_historical_record(instance, history_type, using=using)
+
+        using = using if self.use_base_model_db else None
+        alias = using or DEFAULT_DB_ALIAS
+        history_instance = self._build_historical_record(instance, history_type, using)
+
+        connection = connections[alias]
+        if not connection.in_atomic_block:
+            _write_entries([(instance, history_instance)], using=alias)
+            return
+        self._get_buffer(connection).entries.append((instance, history_instance))
+
+    def _build_historical_record(self, instance, history_type, using):
+        history_date = getattr(instance, '_history_date', timezone.now())
+        history_user = self.get_history_user(instance)
+        history_change_reason = self.get_change_reason_for_object(instance, history_type, using)
+        manager = getattr(instance, self.manager_name)
+
+        attrs = {field.attname: getattr(instance, field.attname) for field in self.fields_included(instance)}
+        if getattr(manager.model, 'history_relation', None) is not None:
+            attrs['history_relation'] = instance
+
+        history_instance = manager.model(
+            history_date=history_date,
+            history_type=history_type,
+            history_user=history_user,
+            history_change_reason=history_change_reason,
+            **attrs,
+        )
+        pre_create_historical_record.send(
+            sender=manager.model,
+            instance=instance,
+            history_date=history_date,
+            history_user=history_user,
+            history_change_reason=history_change_reason,
+            history_instance=history_instance,
+            using=using,
+        )
+        return history_instance
+
+    @staticmethod
+    def _get_buffer(connection):
+        buffers = getattr(_local, 'buffers', None)
+        if buffers is None:
+            buffers = _local.buffers = {}
+        key = (connection.alias, tuple(connection.savepoint_ids))
+        buffer = buffers.get(key)
+        if buffer is None or not _is_pending(connection, buffer):
+            # Buffers whose callback is gone were flushed or rolled back
+            for stale_key in [k for k, b in buffers.items() if k[0] == connection.alias and not _is_pending(connection, b)]:
+                del buffers[stale_key]
+            buffer = buffers[key] = _TransactionBuffer(connection.alias)
+            transaction.on_commit(buffer.flush, using=connection.alias)
+        return buffer
+
+
+def _is_pending(connection, buffer):
+    return buffer.alive and any(func == buffer.flush for _, func, _ in connection.run_on_commit)
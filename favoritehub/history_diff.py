@@ -0,0 +1,176 @@
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+from django.apps import apps
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import DecimalField, F, Max, Min, Window
+from django.db.models.functions import Lag
+
+PREVIOUS_PREFIX = 'previous__'
+
+
+def history_tracked_models():
+    """Returns every model registered with `django-simple-history`."""
+    return [model for model in apps.get_models() if hasattr(model._meta, 'simple_history_manager_attribute')]
+
+
+def get_history_model(model):
+    return getattr(model, model._meta.simple_history_manager_attribute).model
+
+
+def _compared_fields(model):
+    history_model = get_history_model(model)
+    pk_name = model._meta.pk.attname
+    return [field for field in history_model.tracked_fields if field.attname != pk_name]
+
+
+def _normalizer(field):
+    # Alguns bancos (SQLite) não aplicam a escala do DecimalField ao resultado do LAG()
+    if isinstance(field, DecimalField):
+        exponent = Decimal(1).scaleb(-field.decimal_places)
+        return lambda value: value if value is None else Decimal(value).quantize(exponent)
+    return None
+
+
+def iter_field_changes(model, ids=None, id_range=None, chunk_size=2000):
+    """
+    Yields one dict per historical version that changed at least one field of the previous version.
+
+    The previous value of every tracked field is computed in the database with a `LAG()` window
+    partitioned by the object's primary key, and rows are streamed with a server-side cursor, so
+    memory usage does not depend on the size of the history table.
+
+    Parameters:
+    model: A model with history tracking (e.g. `Product`).
+    ids (iterable, optional): Restricts the diff to these object ids.
+    id_range (tuple, optional): Restricts the diff to objects with `start <= id <= end`.
+    chunk_size (int): Rows fetched per round trip.
+    """
+    history_model = get_history_model(model)
+    pk_name = model._meta.pk.attname
+    compared = _compared_fields(model)
+    fields = [field.attname for field in compared]
+    normalizers = {field.attname: _normalizer(field) for field in compared if _normalizer(field)}
+
+    def previous(expression):
+        return Window(
+            Lag(expression),
+            partition_by=[F(pk_name)],
+            order_by=[F('history_date').asc(), F('history_id').asc()],
+        )
+
+    queryset = history_model.objects.all()
+    if ids is not None:
+        queryset = queryset.filter(**{f'{pk_name}__in': list(ids)})
+    if id_range is not None:
+        queryset = queryset.filter(**{f'{pk_name}__range': id_range})
+
+    annotations = {f'{PREVIOUS_PREFIX}{name}': previous(name) for name in fields}
+    annotations[f'{PREVIOUS_PREFIX}history_id'] = previous('history_id')
+    queryset = (
+        queryset.annotate(**annotations)
+        .order_by(pk_name, 'history_date', 'history_id')
+        .values(pk_name, 'history_id', 'history_date', 'history_type', 'history_user_id', *fields, *annotations)
+    )
+
+    label = model._meta.label_lower
+    for row in queryset.iterator(chunk_size=chunk_size):
+        if row[f'{PREVIOUS_PREFIX}history_id'] is None:
+            continue
+        for name, normalize in normalizers.items():
+            row[name] = normalize(row[name])
+            row[f'{PREVIOUS_PREFIX}{name}'] = normalize(row[f'{PREVIOUS_PREFIX}{name}'])
+        changes = {
+            name: [row[f'{PREVIOUS_PREFIX}{name}'], row[name]]
+            for name in fields
+            if row[f'{PREVIOUS_PREFIX}{name}'] != row[name]
+        }
+        if changes:
+            yield {
+                'model': label,
+                'id': row[pk_name],
+                'history_id': row['history_id'],
+                'previous_history_id': row[f'{PREVIOUS_PREFIX}history_id'],
+                'history_date': row['history_date'],
+                'history_type': row['history_type'],
+                'history_user_id': row['history_user_id'],
+                'changes': changes,
+            }
+
+
+def write_field_changes(model, out, **kwargs):
+    """Writes the changes yielded by `iter_field_changes` to `out` as JSONL and returns how many were written."""
+    count = 0
+    for change in iter_field_changes(model, **kwargs):
+        out.write(json.dumps(change, cls=DjangoJSONEncoder) + '\n')
+        count += 1
+    return count
+
+
+def split_id_ranges(model, parts):
+    """
+    Splits the primary keys found in the model's history table into `parts` contiguous ranges.
+
+    Every version of one object falls in the same range, so ranges can be diffed independently.
+    """
+    pk_name = model._meta.pk.attname
+    bounds = get_history_model(model).objects.aggregate(low=Min(pk_name), high=Max(pk_name))
+    low, high = bounds['low'], bounds['high']
+    if low is None:
+        return []
+    step = max((high - low + 1) // parts, 1)
+    ranges = []
+    start = low
+    while start <= high:
+        end = high if len(ranges) == parts - 1 else min(start + step - 1, high)
+        ranges.append((start, end))
+        start = end + 1
+    return ranges
+
+
+def _write_range(model_label, id_range, directory, chunk_size):
+    model = apps.get_model(model_label)
+    path = os.path.join(directory, f'{model._meta.label_lower}-{id_range[0]}-{id_range[1]}.jsonl')
+    with open(path, 'w', encoding='utf-8') as out:
+        count = write_field_changes(model, out, id_range=id_range, chunk_size=chunk_size)
+    connections.close_all()
+    return path, count
+
+
+def write_field_changes_parallel(model, out, workers, chunk_size=2000):
+    """
+    Diffs the model's history in `workers` processes, one primary-key range each.
+
+    Each process writes its own part file and the parts are concatenated into `out` in id order,
+    so the output is the same as a single-process run.
+    """
+    ranges = split_id_ranges(model, workers)
+    if len(ranges) <= 1:
+        return write_field_changes(model, out, chunk_size=chunk_size)
+
+    # As conexões não podem ser herdadas pelos processos filhos
+    connections.close_all()
+    directory = tempfile.mkdtemp(prefix='history-diff-')
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(
+                _write_range,
+                [model._meta.label] * len(ranges),
+                ranges,
+                [directory] * len(ranges),
+                [chunk_size] * len(ranges),
+            ))
+        total = 0
+        for path, count in parts:
+            with open(path, encoding='utf-8') as part:
+                for line in part:
+                    out.write(line)
+            total += count
+        return total
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,155 @@
+"""
+Monthly range partitioning of the `Historical*` tables by `history_date` (PostgreSQL only).
+
+Once a table is partitioned, old months are removed with `DROP TABLE` on the partition, which takes
+constant time and leaves no dead tuples to vacuum, instead of a large `DELETE`.
+"""
+import re
+from datetime import date
+
+from django.db import connection, transaction
+from django.utils import timezone
+from .history_diff import get_history_model
+
+PARTITION_SUFFIX = re.compile(r'_p(\d{4})(\d{2})$')
+
+
+class PartitioningNotSupported(Exception):
+    pass
+
+
+def _check_backend():
+    if connection.vendor != 'postgresql':
+        raise PartitioningNotSupported('History partitioning requires PostgreSQL.')
+
+
+def _add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def is_partitioned(model):
+    _check_backend()
+    table = get_history_model(model)._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [table])
+        row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def list_partitions(model):
+    """Returns `(partition_name, first_day_of_month)` for each monthly partition, oldest first."""
+    _check_backend()
+    table = get_history_model(model)._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass(%s)",
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = []
+    for name in names:
+        match = PARTITION_SUFFIX.search(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def ensure_partitions(model, start=None, months_ahead=3):
+    """
+    Creates the monthly partitions from `start` (default: this month) up to `months_ahead` months
+    ahead, plus a default partition that catches rows outside every range.
+    """
+    _check_backend()
+    table = get_history_model(model)._meta.db_table
+    today = timezone.localdate()
+    month = date((start or today).year, (start or today).month, 1)
+    last = _add_months(date(today.year, today.month, 1), months_ahead)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {_quote(table + "_default")} PARTITION OF {_quote(table)} DEFAULT')
+        while month <= last:
+            following = _add_months(month, 1)
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {_quote(f"{table}_p{month:%Y%m}")} PARTITION OF {_quote(table)} '
+                f'FOR VALUES FROM (%s) TO (%s)',
+                [month, following],
+            )
+            month = following
+
+
+def drop_partitions_before(model, cutoff):
+    """Detaches and drops every monthly partition that only holds rows older than `cutoff`."""
+    _check_backend()
+    table = get_history_model(model)._meta.db_table
+    dropped = []
+    for name, month in list_partitions(model):
+        if _add_months(month, 1) > cutoff:
+            break
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {_quote(table)} DETACH PARTITION {_quote(name)}')
+            cursor.execute(f'DROP TABLE {_quote(name)}')
+        dropped.append(name)
+    return dropped
+
+
+def convert_to_partitioned(model, months_ahead=3):
+    """
+    Rebuilds the model's history table as a table partitioned by month of `history_date`.
+
+    The existing rows are copied into the new table inside one transaction, holding an exclusive
+    lock on the table, so this is a one-off maintenance operation. The primary key becomes
+    `(history_id, history_date)` because PostgreSQL requires the partition key in it. The other
+    indexes and foreign keys are recreated with their original names.
+    """
+    _check_backend()
+    table = get_history_model(model)._meta.db_table
+    legacy = f'{table}_legacy'
+    if is_partitioned(model):
+        return False
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {_quote(table)} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname NOT IN ("
+            "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p')",
+            [table, table],
+        )
+        index_definitions = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+            [table],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f'SELECT MIN(history_date) FROM {_quote(table)}')
+        oldest = cursor.fetchone()[0]
+
+        cursor.execute(f'ALTER TABLE {_quote(table)} RENAME TO {_quote(legacy)}')
+        cursor.execute(
+            f'CREATE TABLE {_quote(table)} (LIKE {_quote(legacy)} INCLUDING DEFAULTS INCLUDING IDENTITY) '
+            f'PARTITION BY RANGE (history_date)'
+        )
+        cursor.execute(f'ALTER TABLE {_quote(table)} ADD PRIMARY KEY (history_id, history_date)')
+        ensure_partitions(model, start=timezone.localtime(oldest).date() if oldest else None, months_ahead=months_ahead)
+
+        cursor.execute(f'INSERT INTO {_quote(table)} SELECT * FROM {_quote(legacy)}')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'history_id'), COALESCE(MAX(history_id), 0) + 1, false) "
+            f"FROM {_quote(table)}",
+            [table],
+        )
+        cursor.execute(f'DROP TABLE {_quote(legacy)}')
+
+        for definition in index_definitions:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {_quote(table)} ADD CONSTRAINT {_quote(name)} {definition}')
+    return True
@@ -0,0 +1,84 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from .history_diff import get_history_model
+
+
+def get_retention_policy(model):
+    """
+    Returns the `{'keep_versions': ..., 'max_age_days': ...}` policy configured for the model.
+
+    Policies come from `SIMPLE_HISTORY_RETENTION`, keyed by model label (e.g. `favoritehub.Product`),
+    with an optional `default` entry used by models without their own policy.
+    """
+    policies = getattr(settings, 'SIMPLE_HISTORY_RETENTION', {})
+    policy = policies.get(model._meta.label, policies.get('default', {}))
+    return {
+        'keep_versions': policy.get('keep_versions'),
+        'max_age_days': policy.get('max_age_days'),
+    }
+
+
+def iter_prune_history(model, keep_versions=None, max_age_days=None, chunk_size=500,
+                       delete_batch_size=5000, start_after=None, pause=0, dry_run=False):
+    """
+    Deletes historical versions beyond the retention policy, a few objects at a time.
+
+    A version is pruned when it is older than the `keep_versions` most recent versions of its
+    object, or when its `history_date` is older than `max_age_days`. The most recent version of
+    every object is always kept.
+
+    Objects are walked in primary-key order, `chunk_size` objects per step, and each delete runs in
+    its own short transaction, so no lock is held for long. After every step this yields
+    `(last_object_id, deleted)`; passing the last id back as `start_after` resumes the prune.
+    """
+    if keep_versions is None and max_age_days is None:
+        return
+    keep_versions = max(keep_versions, 1) if keep_versions is not None else None
+
+    history_model = get_history_model(model)
+    pk_name = model._meta.pk.attname
+    cutoff = timezone.now() - timedelta(days=max_age_days) if max_age_days is not None else None
+    version = Window(
+        RowNumber(),
+        partition_by=[F(pk_name)],
+        order_by=[F('history_date').desc(), F('history_id').desc()],
+    )
+
+    last_id = start_after
+    while True:
+        object_ids = history_model.objects.order_by(pk_name).values_list(pk_name, flat=True).distinct()
+        if last_id is not None:
+            object_ids = object_ids.filter(**{f'{pk_name}__gt': last_id})
+        object_ids = list(object_ids[:chunk_size])
+        if not object_ids:
+            return
+
+        versions = history_model.objects.filter(
+            **{f'{pk_name}__range': (object_ids[0], object_ids[-1])}).annotate(version=version)
+        history_ids = set()
+        if keep_versions is not None:
+            history_ids.update(versions.filter(version__gt=keep_versions).values_list('history_id', flat=True))
+        if cutoff is not None:
+            history_ids.update(
+                versions.filter(version__gt=1, history_date__lt=cutoff).values_list('history_id', flat=True))
+
+        deleted = 0
+        history_ids = sorted(history_ids)
+        for i in range(0, len(history_ids), delete_batch_size):
+            batch = history_ids[i:i + delete_batch_size]
+            if dry_run:
+                deleted += len(batch)
+                continue
+            with transaction.atomic():
+                deleted += history_model.objects.filter(history_id__in=batch).delete()[0]
+            if pause:
+                time.sleep(pause)
+
+        last_id = object_ids[-1]
+        yield last_id, deleted
@@ -0,0 +1,298 @@
+import csv
+import json
+import time
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from rest_framework import serializers
+from utils.response_cache import bump_generation
+from .models import Client, Favorite, Product
+from .notifications import enqueue_price_changes
+from .serializers import ClientImportSerializer, ProductImportSerializer
+
+
+def iter_jsonl(lines):
+    """
+    Yields `(line_number, row)` for each non-empty line of a JSONL stream.
+
+    Lines that are not valid UTF-8 or not a JSON object are yielded as `(line_number, error_message)`
+    strings so the importer can reject them without aborting the whole file.
+    """
+    for line_number, line in enumerate(lines, start=1):
+        try:
+            line = _decode(line)
+        except UnicodeDecodeError as e:
+            yield line_number, f'Invalid UTF-8: {e}'
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(row, dict):
+            yield line_number, 'Each line must be a JSON object.'
+            continue
+        yield line_number, row
+
+
+def iter_csv(lines):
+    """
+    Yields `(line_number, row)` for each record of a CSV stream with a header line.
+
+    Lines that are not valid UTF-8 are yielded as `(line_number, error_message)` strings, like
+    `iter_jsonl` does.
+    """
+    errors = {}
+
+    def decoded():
+        for line_number, line in enumerate(lines, start=1):
+            try:
+                yield _decode(line)
+            except UnicodeDecodeError as e:
+                errors[line_number] = f'Invalid UTF-8: {e}'
+                # Uma linha em branco, que o DictReader ignora, mantém a numeração das seguintes
+                yield '\n'
+
+    def pending_errors(upto=None):
+        for line_number in sorted(errors):
+            if upto is None or line_number <= upto:
+                yield line_number, errors.pop(line_number)
+
+    reader = csv.DictReader(decoded())
+    for row in reader:
+        yield from pending_errors(reader.line_num)
+        yield reader.line_num, {key: value for key, value in row.items() if value not in (None, '')}
+    yield from pending_errors()
+
+
+def _decode(line):
+    return line.decode('utf-8') if isinstance(line, bytes) else line
+
+
+PARSERS = {
+    'jsonl': iter_jsonl,
+    'csv': iter_csv,
+}
+
+
+class BatchImporter:
+    """
+    Shared bookkeeping of the batch importers: row validation, rejections and the run summary.
+    """
+    validator_class = None
+    MAX_REPORTED_REJECTIONS = 100
+
+    def __init__(self, batch_size=1000, history_user=None):
+        self.batch_size = batch_size
+        self.history_user = history_user
+        self.validator = self.validator_class()
+
+        self.created = 0
+        self.updated = 0
+        self.rejected = 0
+        self.rejections = []
+        self.elapsed = 0.0
+
+    def summary(self):
+        processed = self.created + self.updated
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'rejected': self.rejected,
+            'rejections': self.rejections,
+            'seconds': round(self.elapsed, 3),
+            'rows_per_second': round(processed / self.elapsed, 1) if self.elapsed else None,
+        }
+
+    def _validate(self, line_number, row):
+        if isinstance(row, str):
+            self._reject(line_number, {'detail': [row]})
+            return None
+        try:
+            return self.validator.run_validation(row)
+        except serializers.ValidationError as e:
+            self._reject(line_number, e.detail)
+            return None
+
+    def _reject(self, line_number, errors):
+        self.rejected += 1
+        if len(self.rejections) < self.MAX_REPORTED_REJECTIONS:
+            self.rejections.append({'line': line_number, 'errors': errors})
+
+
+class ProductImporter(BatchImporter):
+    """
+    Upserts products from an iterable of parsed rows in fixed-size batches.
+
+    Rows with an `id` update the matching product (or create it with that id), rows without one
+    are inserted. Each batch is written with one `bulk_create(update_conflicts=True)` plus one
+    bulk insert per history type, so memory stays constant regardless of the input size.
+    """
+    validator_class = ProductImportSerializer
+    UPDATE_FIELDS = ['title', 'image', 'price']
+
+    def run(self, rows):
+        started = time.monotonic()
+        with_id, without_id = {}, []
+
+        for line_number, row in rows:
+            data = self._validate(line_number, row)
+            if data is None:
+                continue
+            product = Product(**data)
+            if product.id is None:
+                without_id.append(product)
+            else:
+                # Se o mesmo id aparecer duas vezes no lote, a última linha vence
+                with_id[product.id] = product
+            if len(with_id) + len(without_id) >= self.batch_size:
+                self._flush(list(with_id.values()), without_id)
+                with_id, without_id = {}, []
+
+        if with_id or without_id:
+            self._flush(list(with_id.values()), without_id)
+        if self.created or self.updated:
+            # bulk_create não dispara post_save
+            bump_generation(Product)
+
+        self.elapsed = time.monotonic() - started
+        return self.summary()
+
+    def _flush(self, with_id, without_id):
+        with transaction.atomic():
+            existing_prices = dict(
+                Product.objects.filter(id__in=[p.id for p in with_id]).values_list('id', 'price')
+            ) if with_id else {}
+            created = [p for p in with_id if p.id not in existing_prices] + without_id
+            updated = [p for p in with_id if p.id in existing_prices]
+
+            if with_id:
+                Product.objects.bulk_create(
+                    with_id, update_conflicts=True, unique_fields=['id'], update_fields=self.UPDATE_FIELDS)
+                if len(with_id) > len(updated):
+                    # Antes dos inserts sem id, que tirariam da sequence ids recém-gravados
+                    self._reset_id_sequence()
+            if without_id:
+                Product.objects.bulk_create(without_id)
+
+            if created:
+                Product.history.bulk_history_create(created, default_user=self.history_user)
+            if updated:
+                Product.history.bulk_history_create(updated, update=True, default_user=self.history_user)
+                # Os upserts não disparam os signals de Product
+                enqueue_price_changes((p.id, existing_prices[p.id], p.price) for p in updated)
+
+        self.created += len(created)
+        self.updated += len(updated)
+
+    def _reset_id_sequence(self):
+        # Inserts com id explícito não avançam a sequence do PostgreSQL
+        statements = connection.ops.sequence_reset_sql(no_style(), [Product])
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+
+class ClientImporter(BatchImporter):
+    """
+    Upserts clients keyed on their unique `email` in fixed-size batches and, with
+    `create_favorites=True`, makes sure every imported client has a favorite list.
+
+    Each batch costs a constant number of queries: one lookup of the existing clients, one
+    `bulk_create(update_conflicts=True)` on `email` for the new and renamed ones, and for the
+    favorite lists one `bulk_create(ignore_conflicts=True)` (`ON CONFLICT DO NOTHING` on the
+    `client` unique key). History is inserted in bulk. Rows identical to what is stored are
+    counted as `unchanged` and not written, so re-running the same file is a no-op.
+    """
+    validator_class = ClientImportSerializer
+    UPDATE_FIELDS = ['name']
+
+    def __init__(self, batch_size=1000, history_user=None, create_favorites=False):
+        super().__init__(batch_size, history_user)
+        self.create_favorites = create_favorites
+        self.unchanged = 0
+        self.favorites_created = 0
+
+    def run(self, rows):
+        started = time.monotonic()
+        batch = {}
+
+        for line_number, row in rows:
+            data = self._validate(line_number, row)
+            if data is None:
+                continue
+            # Se o mesmo email aparecer duas vezes no lote, a última linha vence
+            batch[data['email']] = Client(**data)
+            if len(batch) >= self.batch_size:
+                self._flush(list(batch.values()))
+                batch = {}
+
+        if batch:
+            self._flush(list(batch.values()))
+        if self.created or self.updated or self.favorites_created:
+            # bulk_create não dispara post_save
+            bump_generation(Client, Favorite)
+
+        self.elapsed = time.monotonic() - started
+        return self.summary()
+
+    def summary(self):
+        summary = super().summary()
+        summary['unchanged'] = self.unchanged
+        if self.create_favorites:
+            summary['favorites_created'] = self.favorites_created
+        return summary
+
+    def _flush(self, clients):
+        with transaction.atomic():
+            stored = {
+                email: (client_id, name)
+                for email, client_id, name in Client.objects.filter(
+                    email__in=[c.email for c in clients]).values_list('email', 'id', 'name')
+            }
+            created = [c for c in clients if c.email not in stored]
+            updated = [c for c in clients if c.email in stored and stored[c.email][1] != c.name]
+            unchanged = [c for c in clients if c.email in stored and stored[c.email][1] == c.name]
+            for client in updated + unchanged:
+                client.pk = stored[client.email][0]
+
+            if created or updated:
+                Client.objects.bulk_create(
+                    created + updated, update_conflicts=True, unique_fields=['email'],
+                    update_fields=self.UPDATE_FIELDS)
+                if any(c.pk is None for c in created):
+                    # Bancos sem RETURNING no upsert não preenchem o id
+                    ids = dict(Client.objects.filter(
+                        email__in=[c.email for c in created]).values_list('email', 'id'))
+                    for client in created:
+                        client.pk = ids[client.email]
+            if created:
+                Client.history.bulk_history_create(created, default_user=self.history_user)
+            if updated:
+                Client.history.bulk_history_create(updated, update=True, default_user=self.history_user)
+
+            if self.create_favorites:
+                self._create_favorites(created, updated + unchanged)
+
+        self.created += len(created)
+        self.updated += len(updated)
+        self.unchanged += len(unchanged)
+
+    def _create_favorites(self, new_clients, existing_clients):
+        with_list = set(Favorite.objects.filter(
+            client_id__in=[c.pk for c in existing_clients]).values_list('client_id', flat=True)
+        ) if existing_clients else set()
+        client_ids = [c.pk for c in new_clients] + [c.pk for c in existing_clients if c.pk not in with_list]
+        if not client_ids:
+            return
+        # Listas criadas em paralelo por outra escrita são ignoradas pelo ON CONFLICT DO NOTHING
+        Favorite.objects.bulk_create(
+            [Favorite(client_id=client_id) for client_id in client_ids], ignore_conflicts=True)
+        # ignore_conflicts não devolve os ids gerados
+        created = list(Favorite.objects.filter(client_id__in=client_ids))
+        Favorite.history.bulk_history_create(created, default_user=self.history_user)
+        self.favorites_created += len(created)
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from favoritehub.exporters import EXPORTERS, iter_favorite_rows, parse_since
+
+
+class Command(BaseCommand):
+    help = 'Streams every favorite list with its client and products as NDJSON or CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(EXPORTERS), default='ndjson')
+        parser.add_argument(
+            '--since',
+            help='ISO 8601 date or date-time; only export lists whose list, client or products changed since.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--output', help='File to write the export to (default: stdout).')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = parse_since(options['since'])
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        exporter = EXPORTERS[options['format']][0]
+        rows = iter_favorite_rows(since=since, chunk_size=options['chunk_size'])
+        out = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else self.stdout
+        started = time.monotonic()
+        try:
+            for chunk in exporter(rows):
+                out.write(chunk)
+        finally:
+            if out is not self.stdout:
+                out.close()
+        self.stderr.write(f'Exported in {time.monotonic() - started:.2f}s')
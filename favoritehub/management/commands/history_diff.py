@@ -0,0 +1,52 @@
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from favoritehub.history_diff import (
+    history_tracked_models,
+    write_field_changes,
+    write_field_changes_parallel,
+)
+
+
+class Command(BaseCommand):
+    help = 'Streams field-level changes between consecutive historical versions as JSONL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models', nargs='*',
+            help='Models to audit, e.g. favoritehub.Product (default: every model with history).')
+        parser.add_argument('--ids', nargs='+', type=int, help='Only diff these object ids (single model only).')
+        parser.add_argument('--workers', type=int, default=1, help='Processes to split each model by id range.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--output', help='File to write the JSONL to (default: stdout).')
+
+    def handle(self, *args, **options):
+        tracked = history_tracked_models()
+        if options['models']:
+            try:
+                models = [apps.get_model(label) for label in options['models']]
+            except (LookupError, ValueError) as e:
+                raise CommandError(str(e))
+            untracked = [model._meta.label for model in models if model not in tracked]
+            if untracked:
+                raise CommandError(f'Models without history: {", ".join(untracked)}')
+        else:
+            models = tracked
+
+        if options['ids'] and len(models) != 1:
+            raise CommandError('--ids requires exactly one model.')
+
+        out = open(options['output'], 'w', encoding='utf-8') if options['output'] else self.stdout
+        try:
+            for model in models:
+                started = time.monotonic()
+                if options['ids'] or options['workers'] <= 1:
+                    count = write_field_changes(model, out, ids=options['ids'], chunk_size=options['chunk_size'])
+                else:
+                    count = write_field_changes_parallel(
+                        model, out, workers=options['workers'], chunk_size=options['chunk_size'])
+                self.stderr.write(f'{model._meta.label}: {count} changes in {time.monotonic() - started:.2f}s')
+        finally:
+            if out is not self.stdout:
+                out.close()
@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from favoritehub.history_diff import history_tracked_models
+from favoritehub.history_partitions import (
+    PartitioningNotSupported,
+    convert_to_partitioned,
+    drop_partitions_before,
+    ensure_partitions,
+    is_partitioned,
+)
+
+
+class Command(BaseCommand):
+    help = 'Manages monthly partitions of the historical tables (PostgreSQL only).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['convert', 'extend', 'drop'], help=(
+            'convert: rebuild the tables as partitioned by history_date; '
+            'extend: create the upcoming monthly partitions; '
+            'drop: drop the partitions older than --older-than-days.'))
+        parser.add_argument(
+            'models', nargs='*',
+            help='Models whose history is managed, e.g. favoritehub.Product (default: every model with history).')
+        parser.add_argument('--months-ahead', type=int, default=3)
+        parser.add_argument('--older-than-days', type=int)
+
+    def handle(self, *args, **options):
+        tracked = history_tracked_models()
+        try:
+            models = [apps.get_model(label) for label in options['models']] or tracked
+        except (LookupError, ValueError) as e:
+            raise CommandError(str(e))
+        if any(model not in tracked for model in models):
+            raise CommandError('Only models with history can be partitioned.')
+        if options['action'] == 'drop' and options['older_than_days'] is None:
+            raise CommandError('drop requires --older-than-days.')
+
+        try:
+            for model in models:
+                label = model._meta.label
+                if options['action'] == 'convert':
+                    converted = convert_to_partitioned(model, months_ahead=options['months_ahead'])
+                    self.stdout.write(f'{label}: {"converted" if converted else "already partitioned"}')
+                    continue
+
+                if not is_partitioned(model):
+                    self.stderr.write(f'{label}: not partitioned, run "convert" first')
+                    continue
+                if options['action'] == 'extend':
+                    ensure_partitions(model, months_ahead=options['months_ahead'])
+                    self.stdout.write(f'{label}: partitions created up to {options["months_ahead"]} months ahead')
+                else:
+                    cutoff = timezone.localdate() - timedelta(days=options['older_than_days'])
+                    dropped = drop_partitions_before(model, cutoff)
+                    self.stdout.write(f'{label}: dropped {", ".join(dropped) or "nothing"}')
+        except PartitioningNotSupported as e:
+            raise CommandError(str(e))
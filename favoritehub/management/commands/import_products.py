@@ -0,0 +1,45 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from authentication.models import User
+from favoritehub.importers import PARSERS, ProductImporter
+
+
+class Command(BaseCommand):
+    help = 'Streams products from a JSONL or CSV file and upserts them in batches, writing history in bulk.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, or "-" to read from stdin.')
+        parser.add_argument('--format', choices=sorted(PARSERS), help='Input format (default: guessed from the file extension).')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--user', help='Email of the user recorded as history_user.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+
+        history_user = None
+        if options['user']:
+            try:
+                history_user = User.objects.get(email=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'User {options["user"]} does not exist.')
+
+        importer = ProductImporter(batch_size=options['batch_size'], history_user=history_user)
+        if path == '-':
+            # Bytes: os parsers decodificam cada linha e rejeitam só as que não são UTF-8
+            summary = importer.run(PARSERS[input_format](sys.stdin.buffer))
+        else:
+            try:
+                with open(path, 'rb') as f:
+                    summary = importer.run(PARSERS[input_format](f))
+            except OSError as e:
+                raise CommandError(str(e))
+
+        for rejection in summary['rejections']:
+            self.stderr.write(f'Line {rejection["line"]} rejected: {json.dumps(rejection["errors"])}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{summary["created"]} created, {summary["updated"]} updated, {summary["rejected"]} rejected '
+            f'in {summary["seconds"]}s ({summary["rows_per_second"] or 0} rows/s)'
+        ))
@@ -0,0 +1,55 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from favoritehub.history_diff import history_tracked_models
+from favoritehub.history_retention import get_retention_policy, iter_prune_history
+
+
+class Command(BaseCommand):
+    help = 'Deletes historical versions beyond the retention policy in small, resumable chunks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models', nargs='*',
+            help='Models to prune, e.g. favoritehub.Product (default: every model with history).')
+        parser.add_argument('--keep-versions', type=int, help='Overrides the policy: versions kept per object.')
+        parser.add_argument('--max-age-days', type=int, help='Overrides the policy: age after which versions are pruned.')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Objects examined per step.')
+        parser.add_argument('--start-after', type=int, help='Resume after this object id (single model only).')
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep after each delete.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the versions that would be deleted.')
+
+    def handle(self, *args, **options):
+        tracked = history_tracked_models()
+        if options['models']:
+            try:
+                models = [apps.get_model(label) for label in options['models']]
+            except (LookupError, ValueError) as e:
+                raise CommandError(str(e))
+            untracked = [model._meta.label for model in models if model not in tracked]
+            if untracked:
+                raise CommandError(f'Models without history: {", ".join(untracked)}')
+        else:
+            models = tracked
+
+        if options['start_after'] is not None and len(models) != 1:
+            raise CommandError('--start-after requires exactly one model.')
+
+        for model in models:
+            policy = get_retention_policy(model)
+            if options['keep_versions'] is not None:
+                policy['keep_versions'] = options['keep_versions']
+            if options['max_age_days'] is not None:
+                policy['max_age_days'] = options['max_age_days']
+            if policy['keep_versions'] is None and policy['max_age_days'] is None:
+                self.stderr.write(f'{model._meta.label}: no retention policy, skipped')
+                continue
+
+            total = 0
+            for last_id, deleted in iter_prune_history(
+                    model, chunk_size=options['chunk_size'], start_after=options['start_after'],
+                    pause=options['pause'], dry_run=options['dry_run'], **policy):
+                total += deleted
+                self.stderr.write(f'{model._meta.label}: up to id {last_id}, {total} versions pruned')
+
+            verb = 'would be pruned' if options['dry_run'] else 'pruned'
+            self.stdout.write(self.style.SUCCESS(f'{model._meta.label}: {total} versions {verb}'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from favoritehub.counters import COUNTERS, iter_reconcile_favorite_counters
+
+
+class Command(BaseCommand):
+    help = 'Recounts Product.favorites_count and Favorite.favorites_size and repairs the rows that drifted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows checked per transaction.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that drifted.')
+
+    def handle(self, *args, **options):
+        totals = {model: 0 for model, _, _ in COUNTERS}
+        for model, drifted in iter_reconcile_favorite_counters(options['chunk_size'], options['dry_run']):
+            totals[model] += drifted
+        verb = 'would be fixed' if options['dry_run'] else 'fixed'
+        for model, field, _ in COUNTERS:
+            self.stdout.write(self.style.SUCCESS(f'{model._meta.label}.{field}: {totals[model]} rows {verb}'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from favoritehub.price_changes import iter_refresh_price_changes
+
+
+class Command(BaseCommand):
+    help = 'Records the Product price changes found in the history rows written since the last run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='History rows scanned per transaction.')
+        parser.add_argument('--rebuild', action='store_true', help='Empty the table and scan the whole history again.')
+
+    def handle(self, *args, **options):
+        total, last_history_id = 0, None
+        for last_history_id, created in iter_refresh_price_changes(options['chunk_size'], options['rebuild']):
+            total += created
+            if options['verbosity'] > 1:
+                self.stdout.write(f'history_id <= {last_history_id}: {created} changes')
+        scanned = f'up to history_id {last_history_id}' if last_history_id is not None else 'nothing new'
+        self.stdout.write(self.style.SUCCESS(f'{total} price changes recorded ({scanned})'))
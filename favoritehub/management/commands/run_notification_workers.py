@@ -0,0 +1,36 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from favoritehub.notifications import NotificationWorkerPool
+
+
+class Command(BaseCommand):
+    help = 'Runs the price change notification jobs with a pool of worker threads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=max(settings.NOTIFICATION_WORKERS, 1),
+                            help='Worker threads.')
+        parser.add_argument('--batch-size', type=int, default=settings.NOTIFICATION_BATCH_SIZE,
+                            help='Notifications written per transaction.')
+        parser.add_argument('--drain', action='store_true',
+                            help='Exit once the queued jobs are done instead of waiting for new ones.')
+
+    def handle(self, *args, **options):
+        pool = NotificationWorkerPool(workers=options['workers'], batch_size=options['batch_size'])
+        if options['drain']:
+            stats = pool.run()
+        else:
+            # SIGTERM/Ctrl+C: os workers terminam o lote atual e param
+            signal.signal(signal.SIGTERM, lambda *_: pool.stop())
+            pool.start()
+            try:
+                while any(thread.is_alive() for thread in pool.threads):
+                    pool.join(timeout=1)
+            except KeyboardInterrupt:
+                pool.stop()
+            stats = pool.stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['jobs']} jobs, {stats['notifications']} notifications, {stats['failures']} failures "
+            f"in {stats['elapsed']:.1f}s ({stats['notifications_per_second']:.0f} notifications/s)"
+        ))
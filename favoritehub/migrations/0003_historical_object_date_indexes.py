@@ -0,0 +1,31 @@
+# Generated by Django 5.1.1 on 2026-10-18 10:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('favoritehub', '0002_product_rating_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='historicalclient',
+            index=models.Index(fields=['id', 'history_date'], name='favoritehub_id_30d399_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historicalfavorite',
+            index=models.Index(fields=['id', 'history_date'], name='favoritehub_id_7ae559_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historicalproduct',
+            index=models.Index(fields=['id', 'history_date'], name='favoritehub_id_95bd23_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historicalreview',
+            index=models.Index(fields=['id', 'history_date'], name='favoritehub_id_54fc3c_idx'),
+        ),
+    ]
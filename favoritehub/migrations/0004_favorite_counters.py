@@ -0,0 +1,39 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:15
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Favorite = apps.get_model('favoritehub', 'Favorite')
+    Product = apps.get_model('favoritehub', 'Product')
+    through = Favorite.products.through
+    for model, column, field in ((Product, 'product_id', 'favorites_count'), (Favorite, 'favorite_id', 'favorites_size')):
+        counts = through.objects.filter(**{column: OuterRef('pk')}).order_by().values(column).annotate(n=Count('*'))
+        model.objects.update(**{field: Coalesce(Subquery(counts.values('n')), 0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('favoritehub', '0003_historical_object_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorite',
+            name='favorites_size',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-favorites_count', 'id'], name='product_favorites_rank_idx'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:32
+
+from django.db import OperationalError, migrations, models
+
+FTS_TABLE = 'favoritehub_product_fts'
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        # Mesma expressão que o Django gera para title__icontains
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS product_title_trgm_idx ON favoritehub_product '
+            'USING gin ((UPPER(title::text)) gin_trgm_ops)'
+        )
+    elif vendor == 'sqlite':
+        # Índice de prefixos de 2 e 3 letras para as buscas por início de palavra
+        try:
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                f"title, content='favoritehub_product', content_rowid='id', prefix='2 3')"
+            )
+        except OperationalError:
+            # SQLite compilado sem FTS5: a busca usa LIKE
+            return
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON favoritehub_product BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, title) VALUES (new.id, new.title); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON favoritehub_product BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title) VALUES ('delete', old.id, old.title); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF title ON favoritehub_product BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title) VALUES ('delete', old.id, old.title); "
+            f"INSERT INTO {FTS_TABLE}(rowid, title) VALUES (new.id, new.title); END"
+        )
+        schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS product_title_trgm_idx')
+    elif vendor == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('favoritehub', '0004_favorite_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('favoritehub', '0005_product_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceChangeCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_history_id', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PriceChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('history_id', models.BigIntegerField(unique=True)),
+                ('changed_at', models.DateTimeField()),
+                ('previous_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('change_percent', models.FloatField(null=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_changes', to='favoritehub.product')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('price__lt', models.F('previous_price'))), fields=['product', '-changed_at'], name='price_drop_product_date_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:55
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('favoritehub', '0006_price_changes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('previous_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_favorite_id', models.BigIntegerField(default=0)),
+                ('notified', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_jobs', to='favoritehub.product')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('previous_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='favoritehub.client')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='favoritehub.product')),
+                ('job', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notifications', to='favoritehub.notificationjob')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='notificationjob',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'running'])), fields=['run_after', 'id'], name='notification_job_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['client', '-created_at'], name='notification_client_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(fields=('job', 'client'), name='notification_job_client_uniq'),
+        ),
+        # Percorre as listas que têm um produto em ordem de favorite_id (keyset), sem ordenar todas a cada lote
+        migrations.RunSQL(
+            'CREATE INDEX favorite_products_product_favorite_idx '
+            'ON favoritehub_favorite_products (product_id, favorite_id)',
+            'DROP INDEX favorite_products_product_favorite_idx',
+        ),
+    ]
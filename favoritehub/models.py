@@ -1,14 +1,35 @@
-from django.db import models
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.db.models.signals import m2m_changed
 from django.core.exceptions import ValidationError
-from django.db.models import Avg
-from simple_history.models import HistoricalRecords
+from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+from .history import BufferedHistoricalRecords
+
+
+def _save_kwargs(instance, kwargs, signal_fields):
+    """
+    Leaves `signal_fields` out of the UPDATE of an existing row, unless `update_fields` says
+    otherwise: those columns are maintained with relative UPDATEs by the signals, and writing
+    back the values loaded with a stale instance would undo the changes made since.
+    """
+    if instance._state.adding or kwargs.get('force_insert') or kwargs.get('update_fields') is not None:
+        return kwargs
+    # Campos adiados (`only()`/`defer()`) também ficam de fora, como o Django já faz
+    skipped = set(signal_fields) | instance.get_deferred_fields()
+    kwargs['update_fields'] = [
+        field.name for field in instance._meta.concrete_fields
+        if not field.primary_key and field.attname not in skipped and field.name not in skipped
+    ]
+    return kwargs
 
 
 class Client(models.Model):
     email = models.EmailField(max_length=255, unique=True, db_index=True)
     name = models.CharField(max_length=255)
 
-    history = HistoricalRecords()
+    history = BufferedHistoricalRecords()
 
     def __str__(self):
         return self.name
@@ -19,13 +40,48 @@ class Product(models.Model):
     image = models.URLField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
 
-    history = HistoricalRecords()
+    # Rating summary kept up to date by the Review signals (see signals.py)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveBigIntegerField(default=0, editable=False)
+    rating_average = models.FloatField(null=True, blank=True, editable=False)
+
+    # Number of favorite lists holding the product, kept up to date by the m2m_changed signals
+    favorites_count = models.PositiveIntegerField(default=0, editable=False)
+
+    history = BufferedHistoricalRecords(
+        excluded_fields=['rating_count', 'rating_sum', 'rating_average', 'favorites_count'])
+
+    # Colunas que save() não regrava em linhas existentes (ver _save_kwargs)
+    SIGNAL_FIELDS = ('rating_count', 'rating_sum', 'rating_average', 'favorites_count')
+
+    class Meta:
+        indexes = [
+            # Serve o ranking de mais favoritados direto do índice, sem ordenar o catálogo inteiro
+            models.Index(fields=['-favorites_count', 'id'], name='product_favorites_rank_idx'),
+            # Faixa de preço com ordenação estável (ver favoritehub/filters.py)
+            models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **_save_kwargs(self, kwargs, self.SIGNAL_FIELDS))
+
     def average_rating(self):
-        return self.reviews.aggregate(average_rating=Avg('rating'))['average_rating'] or None
+        return self.rating_average
+
+
+class Review(models.Model):
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='reviews')
+    rating = models.PositiveSmallIntegerField(
+        validators=[MinValueValidator(1), MaxValueValidator(5)])
+
+    history = BufferedHistoricalRecords()
+
+    def __str__(self):
+        return f'{self.rating} for {self.product.title}'
 
 
 class Favorite(models.Model):
@@ -34,18 +90,226 @@ class Favorite(models.Model):
     products = models.ManyToManyField(
         Product, blank=True, related_name='favorite_clients')
 
-    history = HistoricalRecords()
+    # Number of products in the list, kept up to date by the m2m_changed signals
+    favorites_size = models.PositiveIntegerField(default=0, editable=False)
+
+    history = BufferedHistoricalRecords(excluded_fields=['favorites_size'])
+
+    SIGNAL_FIELDS = ('favorites_size',)
 
     def __str__(self):
         return f'Favorites list of {self.client.name}'
 
     def add_product(self, product):
-        self.products.add(product)
+        using = self._state.db or 'default'
+        with transaction.atomic(using=using):
+            self._lock(using)
+            self.products.add(product)
 
     def remove_product(self, product):
-        self.products.remove(product)
+        using = self._state.db or 'default'
+        with transaction.atomic(using=using):
+            self._lock(using)
+            self.products.remove(product)
+
+    async def aadd_product(self, product):
+        await sync_to_async(self.add_product)(product)
+
+    async def aremove_product(self, product):
+        await sync_to_async(self.remove_product)(product)
+
+    def _lock(self, using):
+        # Escritores concorrentes da mesma lista esperam aqui, então o que `add`/`remove` leem como
+        # ausente ou presente é o que de fato gravam, e os contadores recebem só essas ligações
+        list(Favorite.objects.using(using).select_for_update().filter(pk=self.pk).values_list('pk'))
+
+    @classmethod
+    def favorited_links(cls, product_ids, favorite_id=None, client_id=None):
+        """
+        Rows of the `products` through table linking `product_ids` to the favorite list
+        `favorite_id` (or to the list of client `client_id`), found with a single lookup on the
+        (favorite, product) unique index.
+        """
+        links = cls.products.through.objects.filter(product_id__in=set(product_ids))
+        if favorite_id is not None:
+            return links.filter(favorite_id=favorite_id)
+        return links.filter(favorite__client_id=client_id)
+
+    @classmethod
+    def favorited_product_ids(cls, product_ids, favorite_id=None, client_id=None):
+        """Returns the set of `product_ids` that are in the favorite list (see `favorited_links`)."""
+        return set(cls.favorited_links(product_ids, favorite_id, client_id).values_list('product_id', flat=True))
+
+    @classmethod
+    async def afavorited_product_ids(cls, product_ids, favorite_id=None, client_id=None):
+        links = cls.favorited_links(product_ids, favorite_id, client_id).values_list('product_id', flat=True)
+        return {product_id async for product_id in links}
+
+    def bulk_update_products(self, add_ids=(), remove_ids=()):
+        """
+        Adds and removes many products at once and returns a per-ID status.
+
+        The favorite list row is locked (`SELECT ... FOR UPDATE`), all IDs are validated
+        (existence and current membership) with a single query, then the through table is written
+        with one bulk INSERT and one DELETE, all in the same transaction, so concurrent writers of
+        the same list see each other's changes and each ID is reported `added` or `removed` once.
+        The `m2m_changed` signals are sent the same way `products.add`/`products.remove` would send
+        them, with only the rows actually written.
+
+        Returns a list of `(product_id, status)` tuples in request order, where status is one of
+        `added`, `already_in_list`, `removed`, `not_in_list` or `not_found`.
+        """
+        through = Favorite.products.through
+        add_ids = list(dict.fromkeys(add_ids))
+        remove_ids = list(dict.fromkeys(remove_ids))
+
+        using = self._state.db or 'default'
+        with transaction.atomic(using=using):
+            self._lock(using)
+            links = through.objects.using(using).filter(favorite_id=self.pk, product_id=OuterRef('pk'))
+            in_list = dict(
+                Product.objects.using(using).filter(id__in=set(add_ids) | set(remove_ids))
+                .annotate(in_list=Exists(links))
+                .values_list('id', 'in_list')
+            )
+
+            results, to_add, to_remove = [], [], []
+            for product_id in add_ids:
+                if product_id not in in_list:
+                    results.append((product_id, 'not_found'))
+                elif in_list[product_id]:
+                    results.append((product_id, 'already_in_list'))
+                else:
+                    to_add.append(product_id)
+                    results.append((product_id, 'added'))
+            for product_id in remove_ids:
+                if product_id not in in_list:
+                    results.append((product_id, 'not_found'))
+                elif not in_list[product_id]:
+                    results.append((product_id, 'not_in_list'))
+                else:
+                    to_remove.append(product_id)
+                    results.append((product_id, 'removed'))
+
+            if to_add:
+                self._send_products_changed('pre_add', to_add, using)
+                through.objects.using(using).bulk_create(
+                    [through(favorite_id=self.pk, product_id=product_id) for product_id in to_add],
+                    ignore_conflicts=True,
+                )
+                self._send_products_changed('post_add', to_add, using)
+            if to_remove:
+                self._send_products_changed('pre_remove', to_remove, using)
+                through.objects.using(using).filter(favorite_id=self.pk, product_id__in=to_remove).delete()
+                self._send_products_changed('post_remove', to_remove, using)
+
+        return results
+
+    def _send_products_changed(self, action, product_ids, using):
+        m2m_changed.send(
+            sender=Favorite.products.through, instance=self, action=action,
+            reverse=False, model=Product, pk_set=set(product_ids), using=using,
+        )
 
     def save(self, *args, **kwargs):
-        if not self.pk and Favorite.objects.filter(client=self.client).exists():
-            raise ValidationError("Client already has a favorite list.")
-        super().save(*args, **kwargs)
+        # O OneToOneField já garante uma lista por cliente; não há consulta prévia antes do INSERT.
+        # O savepoint mantém utilizável a transação de quem chamou quando o INSERT falha
+        using = kwargs.get('using') or router.db_for_write(Favorite, instance=self)
+        try:
+            with transaction.atomic(using=using):
+                super().save(*args, **_save_kwargs(self, kwargs, self.SIGNAL_FIELDS))
+        except IntegrityError as e:
+            if self._state.adding and self.client_id is not None:
+                raise ValidationError("Client already has a favorite list.") from e
+            raise
+
+
+class PriceChange(models.Model):
+    """
+    One `Product.price` change found in `HistoricalProduct`, filled by `refresh_price_changes`
+    (see `favoritehub/price_changes.py`).
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='price_changes')
+    # Versão do histórico que trouxe o novo preço; única para a atualização poder ser repetida
+    history_id = models.BigIntegerField(unique=True)
+    changed_at = models.DateTimeField()
+    previous_price = models.DecimalField(max_digits=10, decimal_places=2)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Nulo quando o preço anterior era zero
+    change_percent = models.FloatField(null=True)
+
+    class Meta:
+        indexes = [
+            # Só as quedas de preço, por produto e data: serve o join com a lista de favoritos
+            models.Index(
+                fields=['product', '-changed_at'], condition=Q(price__lt=F('previous_price')),
+                name='price_drop_product_date_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id}: {self.previous_price} -> {self.price}'
+
+
+class PriceChangeCheckpoint(models.Model):
+    """Last `HistoricalProduct.history_id` already scanned by `refresh_price_changes` (a single row)."""
+    last_history_id = models.BigIntegerField(default=0)
+
+
+class NotificationJob(models.Model):
+    """
+    A `Product.price` change waiting to be fanned out to the clients that favorited the product
+    (see `favoritehub/notifications.py`).
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='notification_jobs')
+    previous_price = models.DecimalField(max_digits=10, decimal_places=2)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    created_at = models.DateTimeField(default=timezone.now)
+    # Só é reivindicado a partir deste momento (novas tentativas esperam um pouco mais a cada falha)
+    run_after = models.DateTimeField(default=timezone.now)
+    # Renovado a cada lote; um job parado há mais de NOTIFICATION_JOB_TIMEOUT volta a ser reivindicável
+    locked_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Cursor (keyset) da última lista de favoritos já notificada
+    last_favorite_id = models.BigIntegerField(default=0)
+    notified = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # Fila: só os jobs pendentes ou em execução, na ordem de chegada
+            models.Index(
+                fields=['run_after', 'id'], condition=Q(status__in=['pending', 'running']),
+                name='notification_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id}: {self.previous_price} -> {self.price} ({self.status})'
+
+
+class Notification(models.Model):
+    """Tells a client that a product in their favorite list changed price."""
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='notifications')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='notifications')
+    job = models.ForeignKey(NotificationJob, on_delete=models.SET_NULL, null=True, related_name='notifications')
+    previous_price = models.DecimalField(max_digits=10, decimal_places=2)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            # Um lote repetido (job retomado por outro worker) não duplica notificações
+            models.UniqueConstraint(fields=['job', 'client'], name='notification_job_client_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['client', '-created_at'], name='notification_client_date_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id} for {self.client_id}: {self.previous_price} -> {self.price}'
@@ -0,0 +1,300 @@
+"""
+Fan-out of `Product.price` changes to the clients that have the product in their favorite list.
+
+A price change only inserts a `NotificationJob` row, in the same transaction as the change (see
+`favoritehub/signals.py` and `ProductImporter`), so the request never waits for the fan-out and a
+rolled-back change leaves no job behind. While a job is pending, further changes of the same
+product update it instead of queueing another one, and a price that goes back to where it was
+drops the job.
+
+`NotificationWorkerPool` runs the jobs in threads, with no broker besides the database:
+- a job is claimed with a conditional `UPDATE` (after `SELECT ... FOR UPDATE SKIP LOCKED` where
+  supported), so two workers never run the same job;
+- the favorite lists holding the product are read in `favorite_id` order, `NOTIFICATION_BATCH_SIZE`
+  at a time, and each batch is written with one bulk insert in the same transaction that moves the
+  job's cursor, so a job resumes where it stopped;
+- a job whose worker stopped renewing it for `NOTIFICATION_JOB_TIMEOUT` seconds is claimed again,
+  and failures are retried with a growing delay up to `MAX_ATTEMPTS` times.
+
+With `NOTIFICATION_WORKERS` > 0 the pool starts inside the process on the first enqueued job;
+otherwise jobs wait for `python manage.py run_notification_workers`.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from utils.metrics import register_collector
+from .models import Favorite, Notification, NotificationJob
+
+logger = logging.getLogger(__name__)
+
+CENTS = Decimal('0.01')
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 2
+
+
+class LeaseLost(Exception):
+    """The job was claimed again by another worker while this one was running it."""
+
+
+def _price(value):
+    return Decimal(str(value)).quantize(CENTS)
+
+
+def enqueue_price_changes(changes):
+    """
+    Queues the fan-out of `(product_id, previous_price, price)` changes and returns how many jobs
+    were created. Call it inside the transaction that changes the prices; the pending jobs of
+    those products stay locked until it commits.
+    """
+    changes = {product_id: (_price(previous), _price(price)) for product_id, previous, price in changes}
+    pending_jobs = NotificationJob.objects.filter(status=NotificationJob.PENDING)
+    # Sem savepoint: só garante a transação que o SELECT ... FOR UPDATE exige (ex.: save() em autocommit)
+    with transaction.atomic(savepoint=False):
+        # A trava impede que um worker pegue o job entre a leitura e a atualização abaixo, e que outra
+        # mudança do mesmo produto leia o mesmo job ao mesmo tempo
+        pending = {
+            job.product_id: job
+            for job in pending_jobs.select_for_update().filter(product_id__in=changes).order_by('id')
+        }
+        new_jobs, updated, dropped = [], [], []
+        for product_id, (previous_price, price) in changes.items():
+            job = pending.get(product_id)
+            if job is None:
+                if previous_price != price:
+                    new_jobs.append(NotificationJob(product_id=product_id, previous_price=previous_price, price=price))
+            elif job.previous_price == price:
+                # Voltou ao preço de antes da primeira mudança: não há o que avisar
+                dropped.append(job.pk)
+            else:
+                job.price = price
+                updated.append(job)
+
+        NotificationJob.objects.bulk_create(new_jobs)
+        # Só jobs ainda pendentes: um job já pego por um worker não muda de preço no meio da distribuição
+        pending_jobs.bulk_update(updated, ['price'])
+        pending_jobs.filter(pk__in=dropped).delete()
+
+    if new_jobs and settings.NOTIFICATION_WORKERS > 0:
+        transaction.on_commit(notification_pool.wake)
+    return len(new_jobs)
+
+
+def claim_job():
+    """Marks the oldest runnable job as running by this worker and returns it, or None."""
+    while True:
+        now = timezone.now()
+        stale = now - timedelta(seconds=settings.NOTIFICATION_JOB_TIMEOUT)
+        runnable = (
+            Q(status=NotificationJob.PENDING, run_after__lte=now)
+            | Q(status=NotificationJob.RUNNING, locked_at__lt=stale)
+        )
+        with transaction.atomic():
+            candidates = NotificationJob.objects.filter(runnable).order_by('run_after', 'id')
+            if connection.features.has_select_for_update_skip_locked:
+                candidates = candidates.select_for_update(skip_locked=True)
+            job = candidates.first()
+            if job is None:
+                return None
+            # Condicional: sem SKIP LOCKED (SQLite), só um dos workers que leram o job consegue o UPDATE
+            claimed = NotificationJob.objects.filter(pk=job.pk, status=job.status, locked_at=job.locked_at).update(
+                status=NotificationJob.RUNNING, locked_at=now, attempts=F('attempts') + 1)
+        if claimed:
+            job.status, job.locked_at, job.attempts = NotificationJob.RUNNING, now, job.attempts + 1
+            return job
+
+
+def _renew(job, **fields):
+    """Updates the job if this worker still holds it, renewing the lease."""
+    now = timezone.now()
+    if not NotificationJob.objects.filter(pk=job.pk, locked_at=job.locked_at).update(locked_at=now, **fields):
+        raise LeaseLost(job.pk)
+    job.locked_at = now
+
+
+def process_job(job, batch_size=None):
+    """
+    Writes one `Notification` per client holding the job's product, from the job's cursor on,
+    and returns how many were written. Each batch commits with the cursor it advanced.
+    """
+    batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+    links = Favorite.products.through.objects.filter(product_id=job.product_id).order_by('favorite_id')
+    written = 0
+    while True:
+        rows = list(
+            links.filter(favorite_id__gt=job.last_favorite_id)
+            .values_list('favorite_id', 'favorite__client_id')[:batch_size]
+        )
+        if not rows:
+            break
+        with transaction.atomic():
+            Notification.objects.bulk_create([
+                Notification(
+                    client_id=client_id, product_id=job.product_id, job_id=job.pk,
+                    previous_price=job.previous_price, price=job.price,
+                )
+                for _, client_id in rows
+            ], ignore_conflicts=True)
+            _renew(job, last_favorite_id=rows[-1][0], notified=F('notified') + len(rows))
+        job.last_favorite_id = rows[-1][0]
+        written += len(rows)
+    _renew(job, status=NotificationJob.DONE)
+    job.status = NotificationJob.DONE
+    return written
+
+
+def fail_job(job, error):
+    """Schedules another attempt of the job, with a growing delay, or gives up after `MAX_ATTEMPTS`."""
+    fields = {'error': error, 'locked_at': None}
+    if job.attempts >= MAX_ATTEMPTS:
+        fields['status'] = NotificationJob.FAILED
+    else:
+        fields['status'] = NotificationJob.PENDING
+        fields['run_after'] = timezone.now() + timedelta(seconds=RETRY_DELAY * 2 ** (job.attempts - 1))
+    NotificationJob.objects.filter(pk=job.pk, locked_at=job.locked_at).update(**fields)
+
+
+def has_unfinished_jobs():
+    return NotificationJob.objects.filter(
+        status__in=[NotificationJob.PENDING, NotificationJob.RUNNING]).exists()
+
+
+class NotificationWorkerPool:
+    """
+    Threads that claim and run notification jobs until stopped.
+
+    `workers`, `batch_size` and `poll_interval` default to the `NOTIFICATION_*` settings. Idle
+    workers poll every `poll_interval` seconds, and `wake()` makes them look for jobs right away.
+    """
+
+    def __init__(self, workers=None, batch_size=None, poll_interval=None):
+        self._workers = workers
+        self._batch_size = batch_size
+        self._poll_interval = poll_interval
+        self.threads = []
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.stopping = False
+        self.drain = False
+        self.reset_stats()
+
+    @property
+    def workers(self):
+        return self._workers if self._workers is not None else settings.NOTIFICATION_WORKERS
+
+    @property
+    def batch_size(self):
+        return self._batch_size or settings.NOTIFICATION_BATCH_SIZE
+
+    @property
+    def poll_interval(self):
+        return self._poll_interval if self._poll_interval is not None else settings.NOTIFICATION_POLL_INTERVAL
+
+    def reset_stats(self):
+        self.started = None
+        self.jobs = self.failures = self.notifications = 0
+
+    def start(self, drain=False):
+        """
+        Starts the missing worker threads. With `drain`, each worker exits once no job is pending
+        or running, instead of waiting for new ones.
+        """
+        with self.lock:
+            self.stopping = False
+            self.drain = drain
+            self.threads = [thread for thread in self.threads if thread.is_alive()]
+            if self.started is None:
+                self.started = time.monotonic()
+            for number in range(len(self.threads), self.workers):
+                thread = threading.Thread(target=self._run, name=f'notification-worker-{number}', daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def wake(self):
+        """Starts the pool if needed and wakes the idle workers."""
+        self.start()
+        with self.wakeup:
+            self.wakeup.notify_all()
+
+    def stop(self, timeout=None):
+        with self.wakeup:
+            self.stopping = True
+            self.wakeup.notify_all()
+        self.join(timeout)
+
+    def join(self, timeout=None):
+        for thread in list(self.threads):
+            thread.join(timeout)
+
+    def run(self):
+        """Runs every queued job with `workers` threads and returns the stats once the queue is empty."""
+        self.start(drain=True)
+        self.join()
+        return self.stats()
+
+    def _run(self):
+        try:
+            while not self.stopping:
+                try:
+                    job = claim_job()
+                    if job is not None:
+                        self._run_job(job)
+                        continue
+                    if self.drain and not has_unfinished_jobs():
+                        return
+                except DatabaseError:
+                    # Um job que ficou como `running` é retomado depois de NOTIFICATION_JOB_TIMEOUT
+                    logger.exception('Notification worker could not reach the database')
+                    close_old_connections()
+                with self.wakeup:
+                    if not self.stopping:
+                        self.wakeup.wait(self.poll_interval)
+        finally:
+            # Cada thread tem as próprias conexões
+            connections.close_all()
+
+    def _run_job(self, job):
+        try:
+            written = process_job(job, self.batch_size)
+        except LeaseLost:
+            logger.warning('Notification job %s was claimed by another worker', job.pk)
+            return
+        except Exception as e:
+            logger.exception('Notification job %s failed (attempt %s)', job.pk, job.attempts)
+            fail_job(job, repr(e))
+            with self.lock:
+                self.failures += 1
+            return
+        with self.lock:
+            self.jobs += 1
+            self.notifications += written
+
+    def stats(self):
+        with self.lock:
+            elapsed = time.monotonic() - self.started if self.started is not None else 0.0
+            return {
+                'workers': sum(thread.is_alive() for thread in self.threads),
+                'jobs': self.jobs,
+                'failures': self.failures,
+                'notifications': self.notifications,
+                'elapsed': elapsed,
+                'notifications_per_second': self.notifications / elapsed if elapsed else 0.0,
+            }
+
+
+notification_pool = NotificationWorkerPool()
+
+
+@register_collector
+def collect_notification_stats():
+    stats = notification_pool.stats()
+    yield 'notification_jobs_total', 'counter', 'Notification jobs run by this process.', stats['jobs']
+    yield 'notification_job_failures_total', 'counter', 'Notification job attempts that failed.', stats['failures']
+    yield 'notifications_written_total', 'counter', 'Notifications written by this process.', stats['notifications']
+    yield 'notification_workers', 'gauge', 'Notification worker threads alive.', stats['workers']
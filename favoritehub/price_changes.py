@@ -0,0 +1,161 @@
+"""
+Incremental `Product.price` change table, built from `HistoricalProduct`.
+
+`refresh_price_changes` scans only the historical rows written since the last run (by
+`history_id`, remembered in `PriceChangeCheckpoint`) and stores one `PriceChange` per row whose
+price differs from the product's previous version. The previous price comes from a `LAG()` window
+over the new rows of each product, falling back to the latest version already scanned, so no run
+reads the whole history again.
+
+History ids are allocated before commit, so a row can commit after a higher id was already
+scanned (concurrent transactions, the buffered history writer). Each run therefore scans the last
+`OVERLAP` history ids below the checkpoint again, and rewrites the changes found there; the unique
+`history_id` keeps the rescan from duplicating rows. `rebuild=True` scans the whole history again.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Window
+from django.db.models.functions import Coalesce, Lag
+from utils.response_cache import bump_generation
+from .history_diff import get_history_model
+from .models import Favorite, PriceChange, PriceChangeCheckpoint, Product
+
+CENTS = Decimal('0.01')
+# Ids do histórico abaixo do checkpoint relidos a cada execução, para pegar versões commitadas tarde
+OVERLAP = 1000
+# Janela usada pelo endpoint de quedas de preço quando `since` não é informado
+DEFAULT_WINDOW_DAYS = 30
+
+
+def _normalize(value):
+    # Alguns bancos (SQLite) não aplicam a escala do DecimalField ao resultado do LAG()
+    return value if value is None else Decimal(value).quantize(CENTS)
+
+
+def change_percent(previous_price, price):
+    if not previous_price:
+        return None
+    return round(float((price - previous_price) * 100 / previous_price), 2)
+
+
+def _changed_rows(history_model, after, upto):
+    scanned = history_model.objects.filter(id=OuterRef('id'), history_id__lte=after)
+    previous_price = Coalesce(
+        Window(Lag('price'), partition_by=[F('id')], order_by=[F('history_date').asc(), F('history_id').asc()]),
+        Subquery(scanned.order_by('-history_date', '-history_id').values('price')[:1]),
+    )
+    return (
+        history_model.objects.filter(history_id__gt=after, history_id__lte=upto)
+        .annotate(previous_price=previous_price)
+        .order_by()
+        .values_list('id', 'history_id', 'history_date', 'previous_price', 'price')
+    )
+
+
+def iter_refresh_price_changes(chunk_size=2000, rebuild=False):
+    """
+    Records the price changes of the `HistoricalProduct` rows not scanned yet, `chunk_size`
+    history ids per transaction, and yields `(last_history_id, created)` after each chunk. The
+    first chunk also rescans the `OVERLAP` ids below the checkpoint.
+
+    With `rebuild`, the table is emptied and the whole history is scanned again.
+    """
+    history_model = get_history_model(Product)
+    with transaction.atomic():
+        PriceChangeCheckpoint.objects.get_or_create(pk=1)
+        if rebuild:
+            PriceChange.objects.all().delete()
+            PriceChangeCheckpoint.objects.filter(pk=1).update(last_history_id=0)
+            bump_generation(PriceChange)
+
+    first = True
+    while True:
+        with transaction.atomic():
+            # A trava na linha do checkpoint serializa execuções concorrentes
+            after = PriceChangeCheckpoint.objects.select_for_update().get(pk=1).last_history_id
+            ids = list(
+                history_model.objects.filter(history_id__gt=after).order_by('history_id')
+                .values_list('history_id', flat=True)[:chunk_size]
+            )
+            if not ids and not first:
+                return
+            lower = max(after - OVERLAP, 0) if first else after
+            upto = ids[-1] if ids else after
+            created = _record_changes(history_model, lower, upto)
+            PriceChangeCheckpoint.objects.filter(pk=1).update(last_history_id=upto)
+        first = False
+        if ids or created:
+            yield upto, created
+        if not ids:
+            return
+
+
+def _record_changes(history_model, after, upto):
+    """
+    Writes the price changes of the history ids in `(after, upto]` and returns how many were new.
+    Changes already recorded in that range are corrected or dropped if a row committed late
+    changed their previous price.
+    """
+    changes = {
+        history_id: PriceChange(
+            product_id=product_id, history_id=history_id, changed_at=changed_at,
+            previous_price=previous_price, price=price,
+            change_percent=change_percent(previous_price, price),
+        )
+        for product_id, history_id, changed_at, previous_price, price in (
+            (row[0], row[1], row[2], _normalize(row[3]), _normalize(row[4]))
+            for row in _changed_rows(history_model, after, upto)
+        )
+        if previous_price is not None and previous_price != price
+    }
+    # Mudanças de produtos já apagados não têm para onde apontar
+    existing = set(Product.objects.filter(id__in={change.product_id for change in changes.values()})
+                   .values_list('id', flat=True))
+    changes = {history_id: change for history_id, change in changes.items() if change.product_id in existing}
+
+    recorded = {
+        history_id: (pk, previous_price)
+        for history_id, pk, previous_price in PriceChange.objects.filter(
+            history_id__gt=after, history_id__lte=upto).values_list('history_id', 'id', 'previous_price')
+    }
+    new = [change for history_id, change in changes.items() if history_id not in recorded]
+    corrected = []
+    for history_id, change in changes.items():
+        if history_id in recorded and recorded[history_id][1] != change.previous_price:
+            change.pk = recorded[history_id][0]
+            corrected.append(change)
+    dropped = [pk for history_id, (pk, _) in recorded.items() if history_id not in changes]
+
+    PriceChange.objects.bulk_create(new, ignore_conflicts=True)
+    PriceChange.objects.bulk_update(corrected, ['previous_price', 'change_percent'])
+    PriceChange.objects.filter(pk__in=dropped).delete()
+    if new or corrected or dropped:
+        bump_generation(PriceChange)
+    return len(new)
+
+
+def refresh_price_changes(chunk_size=2000, rebuild=False):
+    """Runs `iter_refresh_price_changes` to the end and returns how many changes were recorded."""
+    return sum(created for _, created in iter_refresh_price_changes(chunk_size, rebuild))
+
+
+def price_drops(favorite_id, since, until=None):
+    """
+    Price drops of the products in the favorite list `favorite_id` with `since <= changed_at < until`,
+    most recent first.
+
+    The list's rows of the through table (its unique index) are joined with the partial drop
+    index of `PriceChange`; the product columns come from the primary key of each match.
+    """
+    in_list = Favorite.products.through.objects.filter(favorite_id=favorite_id).values('product_id')
+    drops = PriceChange.objects.filter(
+        product_id__in=in_list, changed_at__gte=since, price__lt=F('previous_price'))
+    if until is not None:
+        drops = drops.filter(changed_at__lt=until)
+    return (
+        drops.select_related('product')
+        .only('product__id', 'product__title', 'product__image', 'product__price',
+              'changed_at', 'previous_price', 'price', 'change_percent')
+        .order_by('-changed_at', '-id')
+    )
@@ -0,0 +1,96 @@
+"""
+Product title search backed by the database's own text index.
+
+Every term of the query must appear in the title, case-insensitively:
+
+- PostgreSQL: anywhere in the title (`title__icontains` per term), served by the `pg_trgm` GIN
+  index on `UPPER(title)` created in migration 0005; relevance is the trigram `similarity()` of
+  the title and the query.
+- SQLite: at the start of a word of the title (FTS5 prefix queries), served by the
+  `favoritehub_product_fts` table, which triggers keep in sync with `favoritehub_product`.
+- Anything else (or a SQLite build without FTS5): anywhere in the title, with `LIKE`.
+
+Outside PostgreSQL, relevance is the share of the title covered by the search terms. Every result
+contains every term, so this ranks by the same signals as bm25 (term frequency and title length)
+without FTS5's per-row cost: `bm25()` can only be read through a correlated subquery here, which
+recomputes the term statistics for each row.
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Length, Lower, NullIf, Replace
+
+FTS_TABLE = 'favoritehub_product_fts'
+MAX_TERMS = 8
+
+_TERM_RE = re.compile(r'\w+')
+_fts_tables = {}
+
+
+def search_terms(query):
+    """Splits a search query into lower-case words, ignoring punctuation."""
+    return _TERM_RE.findall(query.lower())[:MAX_TERMS]
+
+
+def has_fts_table(connection):
+    # Consultado uma vez por banco; a tabela só existe se o SQLite tiver FTS5
+    name = connection.settings_dict['NAME']
+    if name not in _fts_tables:
+        with connection.cursor() as cursor:
+            _fts_tables[name] = FTS_TABLE in connection.introspection.table_names(cursor)
+    return _fts_tables[name]
+
+
+def search_backend(using):
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite' and has_fts_table(connection):
+        return 'sqlite'
+    return 'like'
+
+
+def _contains_all(terms):
+    condition = Q()
+    for term in terms:
+        condition &= Q(title__icontains=term)
+    return condition
+
+
+def _title_coverage(terms):
+    covered = sum(Length('title') - Length(Replace(Lower('title'), Value(term), Value(''))) for term in terms)
+    return Cast(covered, FloatField()) / NullIf(Length('title'), 0)
+
+
+def search_products(queryset, query, rank=False):
+    """
+    Filters `queryset` to the products whose title contains every term of `query`.
+
+    With `rank=True` the products are annotated with a `search_rank` float, higher meaning more
+    relevant. A query without any word leaves the queryset untouched.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset
+    backend = search_backend(queryset.db)
+    table = queryset.model._meta.db_table
+    rank_expression = _title_coverage(terms)
+
+    if backend == 'sqlite':
+        # A tabela FTS usa o id do produto como rowid
+        match = ' AND '.join(f'"{term}"*' for term in terms)
+        queryset = queryset.filter(RawSQL(
+            f'"{table}"."id" IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)',
+            (match,), output_field=BooleanField(),
+        ))
+    else:
+        queryset = queryset.filter(_contains_all(terms))
+        if backend == 'postgresql':
+            from django.contrib.postgres.search import TrigramSimilarity
+            rank_expression = TrigramSimilarity('title', ' '.join(terms))
+
+    if rank:
+        queryset = queryset.annotate(search_rank=rank_expression)
+    return queryset
@@ -1,7 +1,10 @@
 import pdb
 
 from rest_framework import serializers
-from .models import Client, Product, Favorite
+from .models import Client, Product, Favorite, PriceChange
+
+# Limite do bigint dos ids: valores maiores falhariam no banco em vez de virar erro de validação
+MAX_ID = 2**63 - 1
 
 
 class ClientSerializer(serializers.ModelSerializer):
@@ -16,6 +19,14 @@ class ClientSerializer(serializers.ModelSerializer):
         return instance
 
 
+class ClientImportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Client
+        fields = ['name', 'email']
+        # A unicidade do email é resolvida pelo upsert, sem uma query por linha
+        extra_kwargs = {'email': {'validators': []}}
+
+
 class ProductSerializer(serializers.ModelSerializer):
     average_rating = serializers.SerializerMethodField()
 
@@ -24,13 +35,70 @@ class ProductSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'image', 'price', 'average_rating']
 
     def get_average_rating(self, obj):
-        if obj.average_rating():
-            return round(obj.average_rating(), 2)
+        if obj.rating_average is not None:
+            return round(obj.rating_average, 2)
         return None
 
 
+class ProductLeaderboardSerializer(ProductSerializer):
+    class Meta(ProductSerializer.Meta):
+        fields = ProductSerializer.Meta.fields + ['favorites_count']
+
+
+class ProductImportSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False, min_value=1, max_value=MAX_ID)
+
+    class Meta:
+        model = Product
+        fields = ['id', 'title', 'image', 'price']
+
+
 class FavoriteSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Favorite
         fields = ['id', 'client']
+
+
+class FavoriteBulkProductsSerializer(serializers.Serializer):
+    MAX_BATCH_SIZE = 500
+
+    add = serializers.ListField(
+        child=serializers.IntegerField(min_value=1, max_value=MAX_ID), default=list, max_length=MAX_BATCH_SIZE)
+    remove = serializers.ListField(
+        child=serializers.IntegerField(min_value=1, max_value=MAX_ID), default=list, max_length=MAX_BATCH_SIZE)
+
+    def validate(self, attrs):
+        if not attrs['add'] and not attrs['remove']:
+            raise serializers.ValidationError('Provide at least one product id to add or remove.')
+        if set(attrs['add']) & set(attrs['remove']):
+            raise serializers.ValidationError('A product cannot be added and removed in the same request.')
+        return attrs
+
+
+class FavoriteMembershipSerializer(serializers.Serializer):
+    MAX_PRODUCTS = 500
+
+    favorite = serializers.IntegerField(min_value=1, max_value=MAX_ID, required=False)
+    client = serializers.IntegerField(min_value=1, max_value=MAX_ID, required=False)
+    product_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1, max_value=MAX_ID), allow_empty=False, max_length=MAX_PRODUCTS)
+
+    def validate(self, attrs):
+        if ('favorite' in attrs) == ('client' in attrs):
+            raise serializers.ValidationError('Provide either a favorite list or a client.')
+        return attrs
+
+
+class PriceDropProductSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Product
+        fields = ['id', 'title', 'image', 'price']
+
+
+class PriceDropSerializer(serializers.ModelSerializer):
+    product = PriceDropProductSerializer(read_only=True)
+
+    class Meta:
+        model = PriceChange
+        fields = ['product', 'previous_price', 'price', 'change_percent', 'changed_at']
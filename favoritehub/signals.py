@@ -0,0 +1,194 @@
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast, NullIf
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from simple_history.models import HistoricalRecords
+from utils.response_cache import bump_generation
+from .favorites_index import favorites_index
+from .notifications import enqueue_price_changes
+from .models import Client, Favorite, Product, Review
+
+
+def _apply_rating_delta(product_id, count_delta, sum_delta, using=None):
+    """
+    Updates the product's rating summary in a single UPDATE statement.
+
+    Every right-hand side is evaluated against the row's current values, so concurrent
+    review writes never overwrite each other and the average always matches count/sum.
+    """
+    new_count = F('rating_count') + count_delta
+    new_sum = F('rating_sum') + sum_delta
+    Product.objects.using(using).filter(pk=product_id).update(
+        rating_count=new_count,
+        rating_sum=new_sum,
+        rating_average=Cast(new_sum, FloatField()) / NullIf(new_count, 0),
+    )
+    # O UPDATE não dispara post_save, mas muda o average_rating servido pela API
+    bump_generation(Product, using=using)
+
+
+def _apply_favorite_delta(favorite_ids, product_ids, delta, using=None):
+    """
+    Moves the favorite counters by `delta` for every (favorite list, product) pair between
+    `favorite_ids` and `product_ids`, with one relative UPDATE per table.
+    """
+    Favorite.objects.using(using).filter(pk__in=favorite_ids).update(
+        favorites_size=F('favorites_size') + delta * len(product_ids))
+    Product.objects.using(using).filter(pk__in=product_ids).update(
+        favorites_count=F('favorites_count') + delta * len(favorite_ids))
+
+
+@receiver(m2m_changed, sender=Favorite.products.through)
+def update_favorite_counters(sender, instance, action, reverse, pk_set, using, **kwargs):
+    own_column, other_column = ('product_id', 'favorite_id') if reverse else ('favorite_id', 'product_id')
+    if action in ('pre_remove', 'pre_clear'):
+        # remove() recebe IDs que podem não estar na lista; só as ligações existentes contam
+        links = sender.objects.using(using).filter(**{own_column: instance.pk})
+        if action == 'pre_remove':
+            links = links.filter(**{f'{other_column}__in': pk_set})
+        instance._removed_favorite_links = set(links.values_list(other_column, flat=True))
+        return
+
+    if action == 'post_add':
+        changed, delta = pk_set, 1
+    elif action in ('post_remove', 'post_clear'):
+        changed, delta = instance.__dict__.pop('_removed_favorite_links', set()), -1
+    else:
+        return
+    if changed:
+        if reverse:
+            _apply_favorite_delta(changed, [instance.pk], delta, using)
+        else:
+            _apply_favorite_delta([instance.pk], changed, delta, using)
+
+
+@receiver(pre_delete, sender=Favorite)
+def release_favorite_products(sender, instance, using, **kwargs):
+    # A exclusão em cascata apaga as ligações sem disparar m2m_changed
+    Product.objects.using(using).filter(favorite_clients=instance).update(favorites_count=F('favorites_count') - 1)
+
+
+@receiver(pre_delete, sender=Product)
+def release_product_favorites(sender, instance, using, **kwargs):
+    Favorite.objects.using(using).filter(products=instance).update(favorites_size=F('favorites_size') - 1)
+    # As listas afetadas não são conhecidas sem outra query; apagar produtos é raro
+    favorites_index.invalidate(using=using)
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_rating(sender, instance, raw=False, **kwargs):
+    instance._previous_rating = None
+    if instance.pk and not raw:
+        instance._previous_rating = (
+            Review.objects.filter(pk=instance.pk).values_list('product_id', 'rating').first()
+        )
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_rating', None)
+    if created or previous is None:
+        _apply_rating_delta(instance.product_id, 1, instance.rating, using)
+        return
+
+    previous_product_id, previous_rating = previous
+    if previous_product_id != instance.product_id:
+        _apply_rating_delta(previous_product_id, -1, -previous_rating, using)
+        _apply_rating_delta(instance.product_id, 1, instance.rating, using)
+    elif previous_rating != instance.rating:
+        _apply_rating_delta(instance.product_id, 0, instance.rating - previous_rating, using)
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, using=None, **kwargs):
+    _apply_rating_delta(instance.product_id, -1, -instance.rating, using)
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_price(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._previous_price = None
+    if raw or instance._state.adding or not instance.pk:
+        return
+    # Um save(update_fields=[...]) sem o preço não muda o preço: dispensa a consulta
+    if update_fields is not None and 'price' not in update_fields:
+        return
+    instance._previous_price = Product.objects.filter(pk=instance.pk).values_list('price', flat=True).first()
+
+
+@receiver(post_save, sender=Product)
+def enqueue_price_notifications(sender, instance, created, raw=False, **kwargs):
+    # Só enfileira: a distribuição para os clientes roda nos workers (ver notifications.py)
+    if created or raw:
+        return
+    previous = getattr(instance, '_previous_price', None)
+    if previous is None or previous == instance.price:
+        return
+    enqueue_price_changes([(instance.pk, previous, instance.price)])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def invalidate_cached_responses(sender, using=None, **kwargs):
+    bump_generation(sender, using=using)
+
+
+@receiver(m2m_changed, sender=Favorite.products.through)
+def invalidate_cached_favorite_responses(sender, action, using=None, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_generation(Favorite, using=using)
+
+
+@receiver(m2m_changed, sender=Favorite.products.through)
+def invalidate_favorites_index(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        favorites_index.invalidate([instance.pk], using=using)
+    elif action != 'post_clear':
+        favorites_index.invalidate(pk_set, using=using)
+    else:
+        favorites_index.invalidate(using=using)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def invalidate_favorite_in_index(sender, instance, using, **kwargs):
+    favorites_index.invalidate([instance.pk], using=using)
+
+
+def _request_user():
+    user = getattr(getattr(HistoricalRecords.context, 'request', None), 'user', None)
+    return user if user is not None and user.is_authenticated else None
+
+
+@receiver(m2m_changed, sender=Favorite.products.through)
+def record_favorite_products_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Records a historical version of each favorite list whose products changed.
+
+    The history of `Favorite` does not track its products, so without this a product being added
+    or removed would leave no `history_date` behind for incremental exports to pick up.
+    """
+    if reverse and action == 'pre_clear':
+        instance._cleared_favorite_ids = list(
+            sender.objects.filter(product_id=instance.pk).values_list('favorite_id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear') or (action != 'post_clear' and not pk_set):
+        return
+
+    if not reverse:
+        favorites = [instance]
+    else:
+        favorite_ids = pk_set if action != 'post_clear' else getattr(instance, '_cleared_favorite_ids', [])
+        favorites = list(Favorite.objects.filter(pk__in=favorite_ids))
+    if favorites:
+        Favorite.history.bulk_history_create(
+            favorites, update=True, default_user=_request_user(), default_change_reason='products changed')
+
+
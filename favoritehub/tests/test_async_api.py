@@ -0,0 +1,145 @@
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import resolve
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from authentication.authentication import user_cache
+from authentication.models import User
+from core.asgi import AsyncAPIRequest
+from favoritehub.models import Favorite, Product, Client
+from favoritehub.price_changes import refresh_price_changes
+
+
+@override_settings(ROOT_URLCONF='core.asgi_urls')
+class AsyncAPITests(TransactionTestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        token = RefreshToken.for_user(self.user).access_token
+        self.headers = {'Authorization': f'Bearer {token}'}
+
+        self.client1 = Client.objects.create(email='client1@example.com', name='Client One')
+        self.client2 = Client.objects.create(email='client2@example.com', name='Client Two')
+        self.product1 = Product.objects.create(title='Product 1', image='https://example.com/1.png', price=100)
+        self.product2 = Product.objects.create(title='Product 2', image='https://example.com/2.png', price=50)
+        self.favorite_list = Favorite.objects.create(client=self.client1)
+        self.favorite_url = f'/api/favorites/{self.favorite_list.id}/'
+
+    async def _request(self, method, url, data=None):
+        # O AsyncClient não repassa os headers do construtor para o scope ASGI
+        kwargs = {'content_type': 'application/json'} if data is not None else {}
+        return await getattr(AsyncClient(), method)(url, data, headers=self.headers, **kwargs)
+
+    def test_api_routes_resolve_to_async_views(self):
+        self.assertEqual(AsyncAPIRequest.urlconf, 'core.asgi_urls')
+        for url in ['/api/clients/', '/api/products/', self.favorite_url, f'{self.favorite_url}products/']:
+            self.assertTrue(iscoroutinefunction(resolve(url).func), url)
+        # Rotas sem versão assíncrona continuam nas views síncronas
+        self.assertFalse(iscoroutinefunction(resolve('/api/products/import/').func))
+        self.assertFalse(iscoroutinefunction(resolve('/api/clients/import/').func))
+
+    async def test_requires_authentication(self):
+        response = await AsyncClient().get('/api/clients/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_client_crud(self):
+        response = await self._request('get', '/api/clients/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([c['email'] for c in response.json()['results']],
+                         ['client1@example.com', 'client2@example.com'])
+
+        response = await self._request('post', '/api/clients/', {'name': 'New', 'email': 'new@example.com'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        client_id = response.json()['id']
+
+        response = await self._request('post', '/api/clients/', {'name': 'Dup', 'email': 'new@example.com'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = await self._request('patch', f'/api/clients/{client_id}/', {'name': 'Renamed'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((await Client.objects.aget(id=client_id)).name, 'Renamed')
+
+        response = await self._request('delete', f'/api/clients/{client_id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = await self._request('get', f'/api/clients/{client_id}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_product_list_and_create(self):
+        response = await self._request(
+            'post', '/api/products/', {'title': 'Product 3', 'image': 'https://example.com/3.png', 'price': '9.90'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = await self._request('get', '/api/products/?page_size=2')
+        body = response.json()
+        self.assertEqual([p['title'] for p in body['results']], ['Product 1', 'Product 2'])
+        self.assertIsNotNone(body['next'])
+
+    async def test_favorite_create_and_delete(self):
+        response = await self._request('post', '/api/favorites/', {'client': self.client2.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(await Favorite.objects.acount(), 2)
+
+        response = await self._request('post', '/api/favorites/', {'client': self.client2.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = await self._request('delete', self.favorite_url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(await Favorite.objects.filter(id=self.favorite_list.id).aexists())
+
+    async def test_add_and_remove_product(self):
+        url = f'{self.favorite_url}add_product/'
+        response = await self._request('post', url, {'product_id': self.product1.id})
+        self.assertEqual(response.json(), {'status': 'product added'})
+        response = await self._request('post', url, {'product_id': self.product1.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = await self._request('post', url, {'product_id': 999})
+        self.assertEqual(response.json()['error'], 'Product does not exist')
+
+        response = await self._request('get', f'{self.favorite_url}products/')
+        self.assertEqual([p['id'] for p in response.json()['results']], [self.product1.id])
+
+        url = f'{self.favorite_url}remove_product/'
+        response = await self._request('post', url, {'product_id': self.product1.id})
+        self.assertEqual(response.json(), {'status': 'product removed'})
+        response = await self._request('post', url, {'product_id': self.product1.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_bulk_products(self):
+        response = await self._request(
+            'post', f'{self.favorite_url}bulk_products/', {'add': [self.product1.id, self.product2.id, 999]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['status'] for r in response.json()['results']], ['added', 'added', 'not_found'])
+        self.assertEqual(await self.favorite_list.products.acount(), 2)
+
+    async def test_products_of_missing_favorite_list(self):
+        response = await self._request('get', '/api/favorites/999/products/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_membership(self):
+        await self.favorite_list.aadd_product(self.product2)
+        ids = f'{self.product1.id},{self.product2.id}'
+        response = await self._request('get', f'/api/favorites/membership/?client={self.client1.id}&product_ids={ids}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'favorited': [self.product2.id], 'bitmap': '01'})
+
+    async def test_price_drops(self):
+        await self.favorite_list.aadd_product(self.product1)
+        self.product1.price = 80
+        await self.product1.asave()
+        await sync_to_async(refresh_price_changes)()
+        response = await self._request('get', f'{self.favorite_url}price_drops/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(d['product']['id'], d['previous_price'], d['price']) for d in response.json()['results']],
+                         [(self.product1.id, '100.00', '80.00')])
+
+        response = await self._request('get', '/api/favorites/999/price_drops/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_export_streams_ndjson(self):
+        await self.favorite_list.aadd_product(self.product1)
+        response = await self._request('get', '/api/favorites/export/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        lines = [line async for line in response.streaming_content]
+        self.assertEqual(len(lines), 1)
+        self.assertIn(b'"Product 1"', lines[0])
@@ -1,5 +1,7 @@
 import pdb
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase
 from rest_framework import status
 from favoritehub.models import Client
@@ -63,3 +65,48 @@ class ClientViewSetTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Client.objects.count(), 1)
         self.assertFalse(Client.objects.filter(id=self.client2.id).exists())
+
+
+class ClientPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+        for i in range(12):
+            Client.objects.create(email=f'client{i}@example.com', name=f'Client {i}')
+
+        self.url = '/api/clients/'
+
+    def test_cursor_pagination_walks_all_rows_in_id_order(self):
+        names = []
+        url = self.url
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            names += [c['name'] for c in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(names, [f'Client {i}' for i in range(12)])
+
+    def test_cursor_pagination_does_not_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertFalse(any('COUNT(' in q['sql'].upper() for q in queries))
+
+    def test_page_size_is_client_selectable_and_capped(self):
+        response = self.client.get(self.url, {'page_size': 10})
+        self.assertEqual(len(response.data['results']), 10)
+
+        for i in range(12, 120):
+            Client.objects.create(email=f'client{i}@example.com', name=f'Client {i}')
+        response = self.client.get(self.url, {'page_size': 1000})
+        self.assertEqual(len(response.data['results']), 100)
+
+    def test_legacy_page_number_pagination(self):
+        response = self.client.get(self.url, {'page': 2})
+        self.assertEqual(response.data['count'], 12)
+        self.assertEqual(response.data['results'][0]['name'], 'Client 5')
+
+        response = self.client.get(self.url, {'pagination': 'page'})
+        self.assertEqual(response.data['count'], 12)
+        self.assertEqual(len(response.data['results']), 5)
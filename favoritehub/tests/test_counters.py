@@ -0,0 +1,120 @@
+from io import StringIO
+
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APITestCase
+from authentication.models import User
+from favoritehub.models import Client, Favorite, Product
+from utils.response_cache import get_cache
+
+
+class FavoriteCountersTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+        self.products = [
+            Product.objects.create(title=f'Product {i}', image=f'https://example.com/{i}.png', price=10 * i)
+            for i in range(1, 4)
+        ]
+        self.favorites = [
+            Favorite.objects.create(client=Client.objects.create(email=f'client{i}@example.com', name=f'Client {i}'))
+            for i in range(1, 4)
+        ]
+
+    def assertCounters(self, product_counts, favorite_sizes):
+        self.assertEqual(
+            [p.favorites_count for p in Product.objects.order_by('id')], product_counts)
+        self.assertEqual(
+            [f.favorites_size for f in Favorite.objects.order_by('id')], favorite_sizes)
+
+    def test_add_remove_and_clear(self):
+        p1, p2, p3 = self.products
+        f1, f2, _ = self.favorites
+        f1.add_product(p1)
+        f1.products.add(p2, p3)
+        f2.add_product(p1)
+        self.assertCounters([2, 1, 1], [3, 1, 0])
+
+        # Remover um produto que não está na lista não altera os contadores
+        f2.products.remove(p1, p2)
+        f1.remove_product(p3)
+        self.assertCounters([1, 1, 0], [2, 0, 0])
+
+        f1.products.clear()
+        self.assertCounters([0, 0, 0], [0, 0, 0])
+
+    def test_reverse_side_and_bulk_update(self):
+        p1, p2, _ = self.products
+        f1, f2, f3 = self.favorites
+        p1.favorite_clients.add(f1, f2, f3)
+        f1.bulk_update_products(add_ids=[p2.id, p1.id])
+        self.assertCounters([3, 1, 0], [2, 1, 1])
+
+        p1.favorite_clients.remove(f3)
+        p2.favorite_clients.clear()
+        self.assertCounters([2, 0, 0], [1, 1, 0])
+
+    def test_deletes_release_counters(self):
+        p1, p2, _ = self.products
+        f1, f2, _ = self.favorites
+        f1.products.add(p1, p2)
+        f2.products.add(p1)
+
+        p2.delete()
+        self.assertEqual(Favorite.objects.get(pk=f1.pk).favorites_size, 1)
+        f2.client.delete()
+        self.assertEqual(Product.objects.get(pk=p1.pk).favorites_count, 1)
+
+    def test_saving_a_stale_product_keeps_its_count(self):
+        stale = Product.objects.get(pk=self.products[0].pk)
+        self.favorites[0].products.add(self.products[0])
+        stale.price = 5
+        stale.save()
+        self.assertCounters([1, 0, 0], [1, 0, 0])
+
+    def test_saving_a_stale_favorite_keeps_its_size(self):
+        stale = Favorite.objects.get(pk=self.favorites[0].pk)
+        self.favorites[0].products.add(*self.products[:2])
+        stale.save()
+        self.assertCounters([1, 1, 0], [2, 0, 0])
+
+    def test_reconcile_command_repairs_drift(self):
+        p1, p2, _ = self.products
+        f1, _, _ = self.favorites
+        f1.products.add(p1, p2)
+        Product.objects.filter(pk=p1.pk).update(favorites_count=7)
+        Favorite.objects.filter(pk=f1.pk).update(favorites_size=0)
+
+        out = StringIO()
+        call_command('reconcile_favorite_counters', '--dry-run', stdout=out)
+        self.assertIn('favoritehub.Product.favorites_count: 1 rows would be fixed', out.getvalue())
+        self.assertEqual(Product.objects.get(pk=p1.pk).favorites_count, 7)
+
+        out = StringIO()
+        call_command('reconcile_favorite_counters', '--chunk-size', '1', stdout=out)
+        self.assertIn('favoritehub.Favorite.favorites_size: 1 rows fixed', out.getvalue())
+        self.assertCounters([1, 1, 0], [2, 0, 0])
+
+    def test_leaderboard(self):
+        p1, p2, p3 = self.products
+        f1, f2, f3 = self.favorites
+        p2.favorite_clients.add(f1, f2, f3)
+        p3.favorite_clients.add(f1, f2)
+        p1.favorite_clients.add(f1)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/products/top/', {'limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(p['id'], p['favorites_count']) for p in response.data], [(p2.id, 3), (p3.id, 2)])
+
+        f3.products.remove(p2)
+        f3.products.add(p3)
+        response = self.client.get('/api/products/top/')
+        self.assertEqual([(p['id'], p['favorites_count']) for p in response.data], [(p3.id, 3), (p2.id, 2), (p1.id, 1)])
+
+    def test_leaderboard_limit_is_validated(self):
+        for limit in ('0', '101', 'ten'):
+            response = self.client.get('/api/products/top/', {'limit': limit})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,140 @@
+from unittest import mock
+
+from django.db import OperationalError, connections
+from django.test import SimpleTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from authentication.models import User
+from favoritehub.models import Client, Product
+from utils import db_routing
+from utils.db_routing import PIN_COOKIE, ReadReplicaRouter, RoutingState
+from utils.response_cache import get_cache
+
+
+@override_settings(READ_REPLICAS=['replica1', 'replica2'])
+class ReadReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReadReplicaRouter()
+        patcher = mock.patch.object(db_routing, 'is_healthy', side_effect=lambda alias: alias != 'replica2')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def route(self, state):
+        token = db_routing._routing.set(state)
+        try:
+            return self.router.db_for_read(Product)
+        finally:
+            db_routing._routing.reset(token)
+
+    def replica_state(self, **attributes):
+        state = RoutingState()
+        state.use_replicas = True
+        for name, value in attributes.items():
+            setattr(state, name, value)
+        return state
+
+    def test_reads_outside_requests_use_the_primary(self):
+        self.assertEqual(self.router.db_for_read(Product), 'default')
+        self.assertEqual(self.route(RoutingState()), 'default')
+
+    def test_safe_reads_use_a_healthy_replica(self):
+        state = self.replica_state()
+        self.assertEqual(self.route(state), 'replica1')
+        self.assertEqual(state.read_alias, 'replica1')
+
+    def test_writes_pin_the_rest_of_the_request(self):
+        state = self.replica_state()
+        token = db_routing._routing.set(state)
+        try:
+            self.assertEqual(self.router.db_for_write(Product), 'default')
+            self.assertEqual(self.router.db_for_read(Product), 'default')
+        finally:
+            db_routing._routing.reset(token)
+        self.assertTrue(state.wrote)
+        self.assertEqual(self.route(self.replica_state(pinned=True)), 'default')
+
+    def test_all_replicas_down_falls_back_to_the_primary(self):
+        with mock.patch.object(db_routing, 'is_healthy', return_value=False):
+            self.assertEqual(self.route(self.replica_state()), 'default')
+
+
+class ReplicaHealthTests(SimpleTestCase):
+    databases = {'default'}
+
+    def tearDown(self):
+        db_routing._unhealthy_until.clear()
+
+    def test_failed_connection_is_skipped_until_retry(self):
+        connection = connections['default']
+        with mock.patch.object(connection, 'ensure_connection', side_effect=OperationalError) as ensure:
+            self.assertFalse(db_routing.is_healthy('default'))
+            self.assertFalse(db_routing.is_healthy('default'))
+        self.assertEqual(ensure.call_count, 1)
+
+        db_routing._unhealthy_until.clear()
+        self.assertTrue(db_routing.is_healthy('default'))
+
+
+class ReadReplicaMiddlewareTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        Product.objects.create(title='Product 1', image='https://example.com/1.png', price=10)
+
+        patcher = mock.patch.object(db_routing, 'choose_replica', return_value='default')
+        self.choose_replica = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_safe_favoritehub_reads_go_to_a_replica(self):
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.choose_replica.assert_called_once()
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_other_apps_read_from_the_primary(self):
+        self.client.get('/auth/login/')
+        self.choose_replica.assert_not_called()
+
+    def test_write_pins_the_session_to_the_primary(self):
+        response = self.client.post('/api/clients/', {'email': 'c@example.com', 'name': 'C'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+
+        # O APIClient reenvia o cookie, então a leitura seguinte vê a escrita no primário
+        response = self.client.get('/api/clients/')
+        self.assertEqual(len(response.data['results']), 1)
+        self.choose_replica.assert_not_called()
+
+        self.client.cookies.pop(PIN_COOKIE)
+        get_cache().clear()
+        self.client.get('/api/clients/')
+        self.choose_replica.assert_called_once()
+        self.assertTrue(Client.objects.exists())
+
+    def test_replica_responses_are_not_cached_for_pinned_sessions(self):
+        client = Client.objects.create(email='c@example.com', name='Old')
+        url = f'/api/clients/{client.id}/'
+        # A "réplica" usa a mesma conexão do primário; o atraso é simulado abaixo
+        connections['replica1'] = connections['default']
+        self.addCleanup(delattr, connections._connections, 'replica1')
+
+        response = self.client.patch(url, {'name': 'New'}, format='json')
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        def lagging_replica():
+            # A réplica ainda não recebeu a escrita
+            Client.objects.using('default').filter(pk=client.pk).update(name='Old')
+            return 'replica1'
+
+        self.choose_replica.side_effect = lagging_replica
+        other = APIClient()
+        other.force_authenticate(user=self.user)
+        response = other.get(url)
+        self.assertEqual(response.json()['name'], 'Old')
+        self.assertNotIn('ETag', response)
+
+        Client.objects.using('default').filter(pk=client.pk).update(name='New')
+        response = self.client.get(url)
+        self.assertEqual(response.json()['name'], 'New')
+        self.choose_replica.assert_called_once()
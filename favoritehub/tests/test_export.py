@@ -0,0 +1,121 @@
+import csv
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from authentication.models import User
+from favoritehub.exporters import iter_favorite_rows, parse_since
+from favoritehub.models import Client, Favorite, Product
+
+
+class FavoriteExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+        self.product1 = Product.objects.create(title='Product 1', image='https://example.com/1.png', price=100)
+        self.product2 = Product.objects.create(title='Product 2', image='https://example.com/2.png', price=50)
+        self.client1 = Client.objects.create(email='client1@example.com', name='Client One')
+        self.client2 = Client.objects.create(email='client2@example.com', name='Client Two')
+        self.favorite1 = Favorite.objects.create(client=self.client1)
+        self.favorite1.products.add(self.product2, self.product1)
+        self.favorite2 = Favorite.objects.create(client=self.client2)
+        self.url = '/api/favorites/export/'
+
+    def _streamed(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def _backdate_history(self):
+        # Simula uma exportação anterior: todo o histórico atual fica antes de `since`
+        past = timezone.now() - timedelta(days=1)
+        for model in (Product, Client, Favorite):
+            model.history.update(history_date=past)
+        return past + timedelta(hours=1)
+
+    def test_ndjson_has_one_line_per_favorite_list(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertIn('favorites.ndjson', response['Content-Disposition'])
+
+        records = [json.loads(line) for line in self._streamed(response).splitlines()]
+        self.assertEqual([r['favorite']['id'] for r in records], [self.favorite1.id, self.favorite2.id])
+        self.assertEqual(records[0]['client'], {'id': self.client1.id, 'name': 'Client One', 'email': 'client1@example.com'})
+        self.assertEqual([p['id'] for p in records[0]['products']], [self.product1.id, self.product2.id])
+        self.assertEqual(records[0]['products'][0]['price'], '100.00')
+        self.assertEqual(records[1]['products'], [])
+
+    def test_csv_has_one_row_per_product(self):
+        response = self.client.get(self.url, {'output': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(StringIO(self._streamed(response))))
+        self.assertEqual(
+            [(int(r['favorite_id']), r['product_id']) for r in rows],
+            [(self.favorite1.id, str(self.product1.id)), (self.favorite1.id, str(self.product2.id)),
+             (self.favorite2.id, '')]
+        )
+        self.assertEqual(rows[2]['client_email'], 'client2@example.com')
+
+    def test_export_reads_with_a_single_query(self):
+        with self.assertNumQueries(1):
+            rows = list(iter_favorite_rows(chunk_size=1))
+        self.assertEqual(len(rows), 3)
+
+    def test_since_only_exports_changed_lists(self):
+        since = self._backdate_history()
+        response = self.client.get(self.url, {'since': since.isoformat()})
+        self.assertEqual(self._streamed(response), '')
+
+        self.client2.name = 'Renamed'
+        self.client2.save()
+        records = [json.loads(line) for line in self._streamed(self.client.get(self.url, {'since': since.isoformat()})).splitlines()]
+        self.assertEqual([r['favorite']['id'] for r in records], [self.favorite2.id])
+
+        self.product1.price = 90
+        self.product1.save()
+        records = [json.loads(line) for line in self._streamed(self.client.get(self.url, {'since': since.isoformat()})).splitlines()]
+        self.assertEqual([r['favorite']['id'] for r in records], [self.favorite1.id, self.favorite2.id])
+
+    def test_since_includes_product_membership_changes(self):
+        since = self._backdate_history()
+        self.favorite2.products.add(self.product1)
+        self.assertEqual([r['favorite_id'] for r in iter_favorite_rows(since=since)], [self.favorite2.id])
+
+        since = self._backdate_history()
+        self.favorite1.bulk_update_products(remove_ids=[self.product2.id])
+        self.assertEqual([r['favorite_id'] for r in iter_favorite_rows(since=since)], [self.favorite1.id])
+
+    def test_invalid_parameters(self):
+        response = self.client.get(self.url, {'output': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {'since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_parse_since(self):
+        self.assertTrue(timezone.is_aware(parse_since('2024-05-01')))
+        self.assertEqual(parse_since('2024-05-01T10:00:00+00:00').hour, 10)
+        with self.assertRaises(ValueError):
+            parse_since('2024-13-01')
+
+    def test_command_writes_ndjson_and_csv(self):
+        out, err = StringIO(), StringIO()
+        call_command('export_favorites', stdout=out, stderr=err)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+        self.assertIn('Exported', err.getvalue())
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'favorites.csv')
+            call_command('export_favorites', '--format', 'csv', '--chunk-size', '1', '--output', path, stderr=err)
+            with open(path, encoding='utf-8', newline='') as f:
+                self.assertEqual(len(list(csv.DictReader(f))), 3)
+
+        with self.assertRaises(CommandError):
+            call_command('export_favorites', '--since', 'not-a-date', stderr=err)
@@ -1,10 +1,13 @@
 import pdb
+import threading
 
+from django.db import connection, OperationalError
+from django.test import TransactionTestCase
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 from authentication.models import User
-from favoritehub.models import Favorite, Product, Client
+from favoritehub.models import Favorite, Product, Client, Review
 
 
 class FavoriteViewSetTests(APITestCase):
@@ -68,3 +71,235 @@ class FavoriteViewSetTests(APITestCase):
                                     {'product_id': 9999})  # ID de produto que não existe na lista
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(response.data['error'], 'Product does not exist')
+
+
+class FavoriteBulkProductsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+        self.client1 = Client.objects.create(email='client1@example.com', name='Client One')
+        self.products = [Product.objects.create(title=f'Product {i}', price=10.0) for i in range(4)]
+        self.favorite_list = Favorite.objects.create(client=self.client1)
+        self.url = reverse('favorite-bulk-products', kwargs={'pk': self.favorite_list.id})
+
+    def test_bulk_add_and_remove(self):
+        self.favorite_list.add_product(self.products[0])
+        self.favorite_list.add_product(self.products[1])
+
+        response = self.client.post(self.url, {
+            'add': [self.products[1].id, self.products[2].id, 9999],
+            'remove': [self.products[0].id, self.products[3].id],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [
+            {'product_id': self.products[1].id, 'status': 'already_in_list'},
+            {'product_id': self.products[2].id, 'status': 'added'},
+            {'product_id': 9999, 'status': 'not_found'},
+            {'product_id': self.products[0].id, 'status': 'removed'},
+            {'product_id': self.products[3].id, 'status': 'not_in_list'},
+        ])
+        self.assertEqual(
+            set(self.favorite_list.products.values_list('id', flat=True)),
+            {self.products[1].id, self.products[2].id}
+        )
+
+    def test_bulk_query_count_does_not_depend_on_batch_size(self):
+        # get_object + savepoint + trava da lista + validação + insert + delete + contadores e histórico de cada ação + release
+        self.favorite_list.add_product(self.products[3])
+        with self.assertNumQueries(14):
+            self.client.post(self.url, {
+                'add': [p.id for p in self.products[:3]],
+                'remove': [self.products[3].id],
+            }, format='json')
+        with self.assertNumQueries(14):
+            self.client.post(self.url, {
+                'add': [self.products[3].id],
+                'remove': [p.id for p in self.products[:3]],
+            }, format='json')
+
+    def test_bulk_requires_some_product(self):
+        response = self.client.post(self.url, {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_rejects_same_product_in_add_and_remove(self):
+        response = self.client.post(self.url, {
+            'add': [self.products[0].id],
+            'remove': [self.products[0].id],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+    def test_bulk_rejects_ids_beyond_bigint(self):
+        for field in ('add', 'remove'):
+            response = self.client.post(self.url, {field: [2**63]}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(field, response.data)
+
+class FavoriteBulkProductsConcurrencyTests(TransactionTestCase):
+    WRITERS = 8
+    ROUNDS = 5
+
+    def setUp(self):
+        self.products = [Product.objects.create(title=f'Product {i}', price=10.0) for i in range(20)]
+        self.favorite_list = Favorite.objects.create(
+            client=Client.objects.create(email='client1@example.com', name='Client One'))
+
+    def run_writers(self, write):
+        errors = []
+        barrier = threading.Barrier(self.WRITERS)
+
+        def writer():
+            try:
+                favorite_list = Favorite.objects.get(pk=self.favorite_list.pk)
+                barrier.wait()
+                for _ in range(self.ROUNDS):
+                    while True:
+                        try:
+                            write(favorite_list)
+                            break
+                        except OperationalError:
+                            # SQLite em memória serializa escritores com lock de tabela; outros bancos não devem cair aqui
+                            if connection.vendor != 'sqlite':
+                                raise
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=writer) for _ in range(self.WRITERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def assert_counters(self, product_ids):
+        # Os contadores só andam com as ligações de fato gravadas
+        self.favorite_list.refresh_from_db()
+        self.assertEqual(self.favorite_list.favorites_size, len(product_ids))
+        self.assertEqual(
+            list(Product.objects.filter(id__in=product_ids).values_list('favorites_count', flat=True)),
+            [1] * len(product_ids),
+        )
+
+    def test_parallel_writers_never_raise_duplicate_key_errors(self):
+        product_ids = [p.id for p in self.products]
+        results = []
+        self.run_writers(lambda favorite_list: results.extend(favorite_list.bulk_update_products(add_ids=product_ids)))
+
+        self.assertEqual(self.favorite_list.products.count(), len(product_ids))
+        # Cada produto é reportado como adicionado por um único escritor
+        added = [product_id for product_id, result in results if result == 'added']
+        self.assertEqual(sorted(added), sorted(product_ids))
+        self.assertEqual({result for _, result in results}, {'added', 'already_in_list'})
+        self.assertEqual(len(results), self.WRITERS * self.ROUNDS * len(product_ids))
+        self.assert_counters(product_ids)
+
+    def test_parallel_single_adds_count_each_link_once(self):
+        product = self.products[0]
+        self.run_writers(lambda favorite_list: favorite_list.add_product(product))
+        self.assert_counters([product.id])
+
+
+class FavoriteProductsListTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+        self.client1 = Client.objects.create(email='client1@example.com', name='Client One')
+        self.client2 = Client.objects.create(email='client2@example.com', name='Client Two')
+        self.products = [Product.objects.create(title=f'Product {i}', price=10.0) for i in range(8)]
+        self.favorite_list = Favorite.objects.create(client=self.client1)
+        self.other_list = Favorite.objects.create(client=self.client2)
+
+        self.favorite_list.products.add(*self.products[:7])
+        self.other_list.products.add(self.products[7])
+        Review.objects.create(product=self.products[0], rating=4)
+
+        self.url = reverse('favorite-products', kwargs={'pk': self.favorite_list.id})
+
+    def test_list_products_of_favorite_list(self):
+        ids = []
+        url = self.url
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids += [p['id'] for p in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(ids, [p.id for p in self.products[:7]])
+
+    def test_products_include_rating(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['results'][0]['average_rating'], 4.0)
+        self.assertIsNone(response.data['results'][1]['average_rating'])
+
+    def test_products_page_is_a_single_query(self):
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+    def test_empty_favorite_list(self):
+        empty = Favorite.objects.create(client=Client.objects.create(email='c3@example.com', name='Client Three'))
+        response = self.client.get(reverse('favorite-products', kwargs={'pk': empty.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+
+    def test_nonexistent_favorite_list(self):
+        response = self.client.get(reverse('favorite-products', kwargs={'pk': 9999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class FavoriteMembershipTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+        self.client1 = Client.objects.create(email='client1@example.com', name='Client One')
+        self.client2 = Client.objects.create(email='client2@example.com', name='Client Two')
+        self.products = [Product.objects.create(title=f'Product {i}', price=10.0) for i in range(6)]
+        self.favorite_list = Favorite.objects.create(client=self.client1)
+        self.other_list = Favorite.objects.create(client=self.client2)
+        self.favorite_list.products.add(self.products[1], self.products[3])
+        self.other_list.products.add(self.products[0])
+
+        self.url = reverse('favorite-membership')
+
+    def ids(self, *indexes):
+        return ','.join(str(self.products[i].id) for i in indexes)
+
+    def test_by_favorite_list_and_by_client(self):
+        expected = {'favorited': [self.products[3].id, self.products[1].id], 'bitmap': '10100'}
+        for lookup in ({'favorite': self.favorite_list.id}, {'client': self.client1.id}):
+            response = self.client.get(self.url, {**lookup, 'product_ids': self.ids(3, 0, 1, 2) + ',999'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data, expected)
+
+    def test_repeated_product_ids_and_parameters(self):
+        response = self.client.get(
+            f'{self.url}?favorite={self.favorite_list.id}&product_ids={self.ids(1, 1)}&product_ids={self.ids(4)}')
+        self.assertEqual(response.data, {'favorited': [self.products[1].id], 'bitmap': '110'})
+
+    def test_unknown_list_has_no_favorites(self):
+        response = self.client.get(self.url, {'client': 9999, 'product_ids': self.ids(0, 1)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'favorited': [], 'bitmap': '00'})
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            self.client.get(self.url, {'client': self.client1.id, 'product_ids': self.ids(*range(6))})
+
+    def test_validation(self):
+        too_many = ','.join(str(i) for i in range(1, 502))
+        for params in (
+            {'product_ids': self.ids(0)},
+            {'favorite': self.favorite_list.id, 'client': self.client1.id, 'product_ids': self.ids(0)},
+            {'favorite': self.favorite_list.id},
+            {'favorite': self.favorite_list.id, 'product_ids': 'a,b'},
+            {'favorite': self.favorite_list.id, 'product_ids': too_many},
+            {'favorite': self.favorite_list.id, 'product_ids': str(2**63)},
+            {'favorite': 2**63, 'product_ids': self.ids(0)},
+            {'client': 2**63, 'product_ids': self.ids(0)},
+        ):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
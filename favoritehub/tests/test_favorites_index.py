@@ -0,0 +1,155 @@
+from array import array
+
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITransactionTestCase
+from authentication.models import User
+from favoritehub.favorites_index import contains, favorited_product_ids, favorites_index
+from favoritehub.models import Client, Favorite, Product
+from utils.metrics import render_metrics
+
+
+@override_settings(FAVORITES_INDEX_MAX_PRODUCTS=100, FAVORITES_INDEX_TTL=60)
+class FavoritesIndexTests(TransactionTestCase):
+    def setUp(self):
+        favorites_index.clear()
+        self.addCleanup(favorites_index.clear)
+        self.products = [Product.objects.create(title=f'Product {i}', price=10) for i in range(6)]
+        self.clients = [Client.objects.create(email=f'c{i}@example.com', name=f'Client {i}') for i in range(3)]
+        self.lists = [Favorite.objects.create(client=client) for client in self.clients]
+        self.lists[0].products.add(self.products[4], self.products[1], self.products[2])
+
+    def ids(self, *indexes):
+        return [self.products[i].id for i in indexes]
+
+    def test_contains(self):
+        products = array('q', [2, 5, 9])
+        self.assertEqual([contains(products, i) for i in (1, 2, 5, 6, 9, 10)],
+                         [False, True, True, False, True, False])
+        self.assertFalse(contains(array('q'), 1))
+
+    def test_lists_are_loaded_once_and_sorted(self):
+        with self.assertNumQueries(1):
+            products = favorites_index.get(favorite_id=self.lists[0].id)
+        self.assertEqual(products, array('q', sorted(self.ids(1, 2, 4))))
+        with self.assertNumQueries(0):
+            favorites_index.get(favorite_id=self.lists[0].id)
+            favorites_index.get(client_id=self.clients[0].id)
+            self.assertEqual(favorited_product_ids(self.ids(0, 1, 4), client_id=self.clients[0].id),
+                             set(self.ids(1, 4)))
+
+        self.assertEqual(favorites_index.get(client_id=self.clients[1].id), array('q'))
+        self.assertIsNone(favorites_index.get(favorite_id=9999))
+        stats = favorites_index.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['lists'], stats['products']), (3, 3, 2, 3))
+        self.assertEqual(stats['hit_rate'], 0.5)
+        self.assertEqual(stats['bytes'], 24)
+
+    def test_m2m_changes_invalidate_the_list(self):
+        favorite = self.lists[0]
+        favorites_index.get(favorite_id=favorite.id)
+        favorite.products.add(self.products[0])
+        self.assertTrue(contains(favorites_index.get(favorite_id=favorite.id), self.products[0].id))
+
+        favorite.products.remove(self.products[1])
+        self.assertFalse(contains(favorites_index.get(favorite_id=favorite.id), self.products[1].id))
+
+        # Pelo lado do produto
+        self.products[5].favorite_clients.add(favorite)
+        self.assertTrue(contains(favorites_index.get(favorite_id=favorite.id), self.products[5].id))
+        self.products[5].favorite_clients.clear()
+        self.assertFalse(contains(favorites_index.get(favorite_id=favorite.id), self.products[5].id))
+
+        self.products[4].delete()
+        self.assertEqual(favorites_index.get(favorite_id=favorite.id), array('q', sorted(self.ids(0, 2))))
+
+        favorite.delete()
+        self.assertIsNone(favorites_index.get(favorite_id=favorite.id))
+        self.assertIsNone(favorites_index.get(client_id=self.clients[0].id))
+
+    def test_lists_changed_by_an_open_transaction_are_not_cached(self):
+        favorite = self.lists[0]
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            favorite.products.add(self.products[0])
+            self.assertTrue(contains(favorites_index.get(favorite_id=favorite.id), self.products[0].id))
+            favorites_index.get(favorite_id=self.lists[1].id)
+            self.assertEqual(favorites_index.stats()['lists'], 1)
+            raise RuntimeError
+        self.assertFalse(contains(favorites_index.get(favorite_id=favorite.id), self.products[0].id))
+
+        with transaction.atomic():
+            favorite.products.add(self.products[0])
+        self.assertTrue(contains(favorites_index.get(favorite_id=favorite.id), self.products[0].id))
+        self.assertEqual(favorites_index.stats()['lists'], 2)
+
+    def test_least_recently_used_lists_are_evicted(self):
+        for favorite in self.lists[1:]:
+            favorite.products.add(*self.products[:2])
+        with override_settings(FAVORITES_INDEX_MAX_PRODUCTS=7):
+            favorites_index.get(favorite_id=self.lists[0].id)
+            favorites_index.get(favorite_id=self.lists[1].id)
+            favorites_index.get(favorite_id=self.lists[2].id)
+            stats = favorites_index.stats()
+        self.assertEqual((stats['lists'], stats['evictions']), (2, 1))
+        with self.assertNumQueries(1):
+            favorites_index.get(favorite_id=self.lists[0].id)
+
+    @override_settings(FAVORITES_INDEX_TTL=0)
+    def test_entries_expire(self):
+        favorites_index.get(favorite_id=self.lists[0].id)
+        with self.assertNumQueries(1):
+            favorites_index.get(favorite_id=self.lists[0].id)
+
+    def test_read_started_before_an_invalidation_is_not_kept(self):
+        _, version = favorites_index._lookup(self.lists[0].id, None)
+        rows = list(favorites_index._query(self.lists[0].id, None))
+        favorites_index.invalidate([self.lists[1].id])
+        favorites_index._store(rows, version)
+        self.assertEqual(favorites_index.stats()['lists'], 0)
+
+    @override_settings(FAVORITES_INDEX_MAX_PRODUCTS=0)
+    def test_disabled(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(favorited_product_ids(self.ids(1, 3), favorite_id=self.lists[0].id),
+                             set(self.ids(1)))
+            favorited_product_ids(self.ids(1, 3), favorite_id=self.lists[0].id)
+        self.assertEqual(favorites_index.stats()['lists'], 0)
+
+    def test_stats_are_published_in_metrics(self):
+        favorites_index.get(favorite_id=self.lists[0].id)
+        favorites_index.get(favorite_id=self.lists[0].id)
+        metrics = render_metrics()
+        self.assertIn('favorites_index_hits_total 1\n', metrics)
+        self.assertIn('favorites_index_lists 1\n', metrics)
+
+
+@override_settings(FAVORITES_INDEX_MAX_PRODUCTS=100, FAVORITES_INDEX_TTL=60)
+class FavoritesIndexAPITests(APITransactionTestCase):
+    def setUp(self):
+        favorites_index.clear()
+        self.addCleanup(favorites_index.clear)
+        self.user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.client1 = Client.objects.create(email='client1@example.com', name='Client One')
+        self.product = Product.objects.create(title='Product 1', price=10)
+        self.favorite_list = Favorite.objects.create(client=self.client1)
+
+    def test_duplicate_checks_use_the_index(self):
+        add_url = reverse('favorite-add-product', kwargs={'pk': self.favorite_list.id})
+        remove_url = reverse('favorite-remove-product', kwargs={'pk': self.favorite_list.id})
+
+        self.assertEqual(self.client.post(add_url, {'product_id': self.product.id}).status_code, status.HTTP_200_OK)
+        response = self.client.post(add_url, {'product_id': self.product.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post(remove_url, {'product_id': self.product.id}).status_code, status.HTTP_200_OK)
+        response = self.client.post(remove_url, {'product_id': self.product.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(
+            reverse('favorite-membership'), {'client': self.client1.id, 'product_ids': self.product.id})
+        self.assertEqual(response.data, {'favorited': [], 'bitmap': '0'})
+        stats = favorites_index.stats()
+        # Cada escrita invalida a lista e a verificação seguinte a recarrega; as demais vêm da memória
+        self.assertEqual((stats['hits'], stats['misses']), (2, 3))
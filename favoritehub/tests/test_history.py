@@ -0,0 +1,85 @@
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from authentication.models import User
+from favoritehub.history import _TransactionBuffer, flush_history_queue
+from favoritehub.models import Client, Product
+
+
+@override_settings(SIMPLE_HISTORY_BUFFER='transaction')
+class TransactionBufferedHistoryTests(TestCase):
+    @staticmethod
+    def history_callbacks(callbacks):
+        # O cache de respostas também registra um callback de commit
+        return [callback for callback in callbacks if isinstance(getattr(callback, '__self__', None), _TransactionBuffer)]
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+
+    def test_history_is_written_once_on_commit_in_order(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                product = Product(title='Product 1', price=10, image='https://img.example.com/1.png')
+                product._history_user = self.user
+                product.save()
+                product.price = 12
+                product.save()
+                product.price = 15
+                product.save()
+                self.assertEqual(product.history.count(), 0)
+
+        self.assertEqual(len(self.history_callbacks(callbacks)), 1)
+        self.assertEqual(
+            [(h.history_type, h.price) for h in product.history.order_by('history_date', 'history_id')],
+            [('+', 10), ('~', 12), ('~', 15)]
+        )
+        self.assertTrue(all(h.history_user == self.user for h in product.history.all()))
+
+    def test_history_is_flushed_with_one_insert_per_model(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                for i in range(5):
+                    Client.objects.create(email=f'client{i}@example.com', name=f'Client {i}')
+                    Product.objects.create(title=f'Product {i}', price=10)
+
+        with self.assertNumQueries(2):
+            for callback in callbacks:
+                callback()
+        self.assertEqual(Client.history.count(), 5)
+        self.assertEqual(Product.history.count(), 5)
+
+    def test_rolled_back_savepoint_discards_its_history(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Product.objects.create(title='Kept', price=10)
+                try:
+                    with transaction.atomic():
+                        Product.objects.create(title='Rolled back', price=10)
+                        raise ValueError
+                except ValueError:
+                    pass
+
+        self.assertEqual(list(Product.history.values_list('title', flat=True)), ['Kept'])
+
+
+@override_settings(SIMPLE_HISTORY_BUFFER='queue')
+class QueueBufferedHistoryTests(TransactionTestCase):
+    def test_history_is_written_by_background_writer(self):
+        user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        with transaction.atomic():
+            for i in range(20):
+                product = Product(title=f'Product {i}', price=i)
+                product._history_user = user
+                product.save()
+        Product.objects.filter(title='Product 0').get().delete()
+
+        flush_history_queue()
+        self.assertEqual(Product.history.filter(history_type='+').count(), 20)
+        self.assertEqual(Product.history.filter(history_type='-').count(), 1)
+        self.assertEqual(Product.history.filter(history_user=user).count(), 20)
+
+
+@override_settings(SIMPLE_HISTORY_BUFFER='transaction')
+class AutocommitBufferedHistoryTests(TransactionTestCase):
+    def test_autocommit_writes_history_immediately(self):
+        product = Product.objects.create(title='Product 1', price=10)
+        self.assertEqual(product.history.count(), 1)
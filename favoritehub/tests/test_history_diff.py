@@ -0,0 +1,53 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from favoritehub.history_diff import iter_field_changes, split_id_ranges
+from favoritehub.models import Client, Product
+
+
+class HistoryDiffTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(title='Product 1', image='https://img.example.com/1.png', price=10)
+        self.product.price = 12
+        self.product.save()
+        self.product.title = 'Product One'
+        self.product.save()
+        self.product.save()
+
+        self.other = Product.objects.create(title='Product 2', image='https://img.example.com/2.png', price=5)
+        self.other.delete()
+
+    def test_consecutive_versions_are_diffed_per_object(self):
+        changes = list(iter_field_changes(Product))
+        self.assertEqual(len(changes), 2)
+        self.assertEqual({c['id'] for c in changes}, {self.product.id})
+
+        price_change, title_change = changes
+        self.assertEqual(list(price_change['changes']), ['price'])
+        self.assertEqual([str(v) for v in price_change['changes']['price']], ['10.00', '12.00'])
+        self.assertEqual(title_change['changes'], {'title': ['Product 1', 'Product One']})
+        self.assertEqual(title_change['previous_history_id'], price_change['history_id'])
+
+    def test_filter_by_ids(self):
+        self.assertEqual(list(iter_field_changes(Product, ids=[self.other.id])), [])
+
+    def test_split_id_ranges_covers_every_id(self):
+        for i in range(10):
+            Client.objects.create(email=f'client{i}@example.com', name=f'Client {i}')
+        ids = list(Client.objects.order_by('id').values_list('id', flat=True))
+        ranges = split_id_ranges(Client, 3)
+        self.assertEqual(len(ranges), 3)
+        self.assertEqual(ranges[0][0], ids[0])
+        self.assertEqual(ranges[-1][1], ids[-1])
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(start, end + 1)
+
+    def test_command_outputs_jsonl(self):
+        out, err = StringIO(), StringIO()
+        call_command('history_diff', 'favoritehub.Product', stdout=out, stderr=err)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([line['history_type'] for line in lines], ['~', '~'])
+        self.assertEqual(lines[1]['changes'], {'title': ['Product 1', 'Product One']})
+        self.assertIn('favoritehub.Product: 2 changes', err.getvalue())
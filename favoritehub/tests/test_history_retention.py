@@ -0,0 +1,88 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import skipIf, skipUnless
+
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from favoritehub.history_partitions import convert_to_partitioned, drop_partitions_before, is_partitioned
+from favoritehub.history_retention import get_retention_policy, iter_prune_history
+from favoritehub.models import Client, Product
+
+
+class HistoryRetentionTests(TestCase):
+    def setUp(self):
+        self.products = []
+        for i in range(3):
+            product = Product.objects.create(title=f'Product {i}', price=1)
+            for price in range(2, 6):
+                product.price = price
+                product.save()
+            self.products.append(product)
+
+    def _age_history(self, product, days):
+        product.history.update(history_date=timezone.now() - timedelta(days=days))
+
+    def test_keep_versions(self):
+        steps = list(iter_prune_history(Product, keep_versions=2, chunk_size=2))
+        self.assertEqual(len(steps), 2)
+        self.assertEqual(sum(deleted for _, deleted in steps), 9)
+        for product in self.products:
+            self.assertEqual(
+                [h.price for h in product.history.all()], [5, 4])
+
+    def test_max_age_keeps_latest_version(self):
+        self._age_history(self.products[0], 400)
+        deleted = sum(deleted for _, deleted in iter_prune_history(Product, max_age_days=365))
+        self.assertEqual(deleted, 4)
+        self.assertEqual(self.products[0].history.count(), 1)
+        self.assertEqual(self.products[1].history.count(), 5)
+
+    def test_resume_after_checkpoint(self):
+        first_id, _ = next(iter_prune_history(Product, keep_versions=1, chunk_size=1))
+        self.assertEqual(first_id, self.products[0].id)
+        list(iter_prune_history(Product, keep_versions=1, start_after=first_id))
+        self.assertEqual(Product.history.count(), 3)
+
+    def test_dry_run_deletes_nothing(self):
+        deleted = sum(d for _, d in iter_prune_history(Product, keep_versions=1, dry_run=True))
+        self.assertEqual(deleted, 12)
+        self.assertEqual(Product.history.count(), 15)
+
+    @override_settings(SIMPLE_HISTORY_RETENTION={'favoritehub.Product': {'keep_versions': 3}, 'default': {'max_age_days': 30}})
+    def test_policy_from_settings(self):
+        self.assertEqual(get_retention_policy(Product), {'keep_versions': 3, 'max_age_days': None})
+        self.assertEqual(get_retention_policy(Client), {'keep_versions': None, 'max_age_days': 30})
+
+    @override_settings(SIMPLE_HISTORY_RETENTION={'favoritehub.Product': {'keep_versions': 3}})
+    def test_prune_command(self):
+        out, err = StringIO(), StringIO()
+        call_command('prune_history', 'favoritehub.Product', 'favoritehub.Client', stdout=out, stderr=err)
+        self.assertIn('favoritehub.Product: 6 versions pruned', out.getvalue())
+        self.assertIn('favoritehub.Client: no retention policy, skipped', err.getvalue())
+        self.assertEqual(Product.history.count(), 9)
+
+
+class HistoryPartitionTests(TestCase):
+    @skipIf(connection.vendor == 'postgresql', 'Only checks the non-PostgreSQL error')
+    def test_partitioning_requires_postgresql(self):
+        with self.assertRaises(CommandError):
+            call_command('history_partitions', 'extend', 'favoritehub.Product', stdout=StringIO())
+
+    @skipUnless(connection.vendor == 'postgresql', 'Partitioning requires PostgreSQL')
+    def test_convert_keeps_rows_and_drops_old_months(self):
+        product = Product.objects.create(title='Product 1', price=1)
+        product.price = 2
+        product.save()
+        product.history.filter(price=1).update(history_date=timezone.now() - timedelta(days=400))
+
+        self.assertTrue(convert_to_partitioned(Product))
+        self.assertTrue(is_partitioned(Product))
+        self.assertEqual(product.history.count(), 2)
+
+        product.price = 3
+        product.save()
+        dropped = drop_partitions_before(Product, timezone.localdate() - timedelta(days=200))
+        self.assertTrue(dropped)
+        self.assertEqual([h.price for h in product.history.all()], [3, 2])
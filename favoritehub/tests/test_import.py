@@ -0,0 +1,255 @@
+import json
+import os
+import tempfile
+from io import BytesIO, StringIO, TextIOWrapper
+from unittest import mock, skipUnless
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+from authentication.models import User
+from favoritehub.importers import ClientImporter
+from favoritehub.models import Client, Favorite, Product
+
+
+class ProductImportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+        self.existing = Product.objects.create(title='Old title', image='https://img.example.com/1.png', price=10)
+        self.url = '/api/products/import/'
+
+    def _jsonl(self, rows):
+        return '\n'.join(r if isinstance(r, str) else json.dumps(r) for r in rows)
+
+    def test_import_jsonl_upserts_and_writes_history(self):
+        body = self._jsonl([
+            {'id': self.existing.id, 'title': 'New title', 'image': 'https://img.example.com/1.png', 'price': '12.50'},
+            {'title': 'Product A', 'image': 'https://img.example.com/a.png', 'price': '5.00'},
+            {'title': 'Product B', 'image': 'https://img.example.com/b.png', 'price': '7.00'},
+        ])
+        response = self.client.generic('POST', self.url, body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(response.data['rejected'], 0)
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.title, 'New title')
+        self.assertEqual(Product.objects.count(), 3)
+
+        latest = self.existing.history.first()
+        self.assertEqual(latest.history_type, '~')
+        self.assertEqual(latest.history_user, self.user)
+        created = Product.objects.get(title='Product A')
+        self.assertEqual(created.history.get().history_type, '+')
+
+    def test_import_reports_rejected_lines(self):
+        body = self._jsonl([
+            {'title': 'Product A', 'image': 'https://img.example.com/a.png', 'price': '5.00'},
+            'not json',
+            {'title': 'No price', 'image': 'https://img.example.com/b.png'},
+        ])
+        response = self.client.generic('POST', self.url, body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['rejected'], 2)
+        self.assertEqual([r['line'] for r in response.data['rejections']], [2, 3])
+        self.assertIn('price', response.data['rejections'][1]['errors'])
+
+    def test_import_csv(self):
+        body = 'title,image,price\nProduct A,https://img.example.com/a.png,5.00\nProduct B,https://img.example.com/b.png,abc\n'
+        response = self.client.generic('POST', self.url, body, content_type='text/csv')
+
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['rejected'], 1)
+        self.assertEqual(response.data['rejections'][0]['line'], 3)
+
+    def test_invalid_utf8_lines_are_rejected(self):
+        row = '{"title": "Product A", "image": "https://img.example.com/a.png", "price": "5.00"}\n'.encode()
+        response = self.client.generic(
+            'POST', self.url, row + b'{"title": "\xff"}\n' + row, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['created'], response.data['rejected']), (2, 1))
+        self.assertEqual(response.data['rejections'][0]['line'], 2)
+        self.assertIn('Invalid UTF-8', response.data['rejections'][0]['errors']['detail'][0])
+
+        body = b''.join([
+            b'title,image,price\n',
+            'Product Ç,https://img.example.com/c.png,5.00\n'.encode(),
+            b'Latin-1 \xe9,https://img.example.com/b.png,1.00\n',
+            b'Product D,https://img.example.com/d.png,1.00\n',
+        ])
+        response = self.client.generic('POST', self.url, body, content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['created'], response.data['rejected']), (2, 1))
+        self.assertEqual(response.data['rejections'][0]['line'], 3)
+        self.assertTrue(Product.objects.filter(title='Product Ç').exists())
+
+    def test_id_out_of_bigint_range_is_rejected(self):
+        body = self._jsonl([
+            {'id': 2**63, 'title': 'Too big', 'image': 'https://img.example.com/x.png', 'price': '1.00'},
+            {'title': 'Product A', 'image': 'https://img.example.com/a.png', 'price': '5.00'},
+        ])
+        response = self.client.generic('POST', self.url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['created'], response.data['rejected']), (1, 1))
+        self.assertIn('id', response.data['rejections'][0]['errors'])
+
+    def test_import_command_in_batches(self):
+        rows = [{'title': f'Product {i}', 'image': f'https://img.example.com/{i}.png', 'price': '1.00'} for i in range(25)]
+        rows.append({'id': 500, 'title': 'Explicit id', 'image': 'https://img.example.com/x.png', 'price': '1.00'})
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as f:
+            f.write(self._jsonl(rows))
+        self.addCleanup(os.remove, f.name)
+
+        out = StringIO()
+        call_command('import_products', f.name, batch_size=10, user=self.user.email, stdout=out)
+
+        self.assertIn('26 created, 0 updated, 0 rejected', out.getvalue())
+        self.assertEqual(Product.objects.count(), 27)
+        self.assertEqual(Product.history.filter(history_user=self.user).count(), 26)
+        # Depois de um id explícito, novos produtos continuam recebendo ids válidos
+        self.assertGreater(Product.objects.create(title='After', price=1).id, 500)
+
+
+    @skipUnless(connection.vendor == 'postgresql', 'SQLite has no id sequence to fall behind')
+    def test_import_command_rejects_invalid_utf8_lines(self):
+        row = '{"title": "Product A", "image": "https://img.example.com/a.png", "price": "5.00"}\n'.encode()
+        with tempfile.NamedTemporaryFile('wb', suffix='.jsonl', delete=False) as f:
+            f.write(row + b'{"title": "\xff"}\n' + row)
+        self.addCleanup(os.remove, f.name)
+
+        out, err = StringIO(), StringIO()
+        call_command('import_products', f.name, stdout=out, stderr=err)
+        self.assertIn('2 created, 0 updated, 1 rejected', out.getvalue())
+        self.assertIn('Line 2 rejected', err.getvalue())
+
+        # O mesmo pela entrada padrão
+        stdin = TextIOWrapper(BytesIO(row + b'{"title": "\xff"}\n'), encoding='utf-8')
+        with mock.patch('sys.stdin', stdin):
+            call_command('import_products', '-', stdout=out, stderr=err)
+        self.assertIn('1 created, 0 updated, 1 rejected', out.getvalue())
+
+    def test_explicit_and_generated_ids_in_the_same_batch(self):
+        # Os próximos valores da sequence, usados como ids explícitos
+        next_id = Product.objects.create(title='Probe', price=1).id + 1
+        rows = [
+            {'id': next_id + i, 'title': f'Explicit {i}', 'image': 'https://img.example.com/x.png', 'price': '1.00'}
+            for i in range(2)
+        ] + [
+            {'title': f'Generated {i}', 'image': 'https://img.example.com/g.png', 'price': '1.00'}
+            for i in range(2)
+        ]
+        response = self.client.generic('POST', self.url, self._jsonl(rows), content_type='application/x-ndjson')
+
+        self.assertEqual(response.data['created'], 4)
+        generated = Product.objects.filter(title__startswith='Generated').values_list('id', flat=True)
+        self.assertTrue(all(product_id > next_id + 1 for product_id in generated))
+
+class ClientImportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+        self.existing = Client.objects.create(email='client1@example.com', name='Client One')
+        self.url = '/api/clients/import/'
+
+    def _post(self, rows, **params):
+        body = '\n'.join(r if isinstance(r, str) else json.dumps(r) for r in rows)
+        query = '&'.join(f'{key}={value}' for key, value in params.items())
+        return self.client.generic('POST', f'{self.url}?{query}', body, content_type='application/x-ndjson')
+
+    def test_upsert_on_email_writes_history(self):
+        response = self._post([
+            {'email': 'client1@example.com', 'name': 'Renamed'},
+            {'email': 'client2@example.com', 'name': 'Client Two'},
+            {'email': 'client3@example.com', 'name': 'Client Three'},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            (response.data['created'], response.data['updated'], response.data['unchanged']), (2, 1, 0))
+        self.assertNotIn('favorites_created', response.data)
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, 'Renamed')
+        self.assertEqual(self.existing.history.first().history_type, '~')
+        created = Client.objects.get(email='client2@example.com')
+        self.assertEqual(created.history.get().history_user, self.user)
+        self.assertFalse(Favorite.objects.exists())
+
+    def test_reimport_is_idempotent(self):
+        rows = [{'email': f'client{i}@example.com', 'name': f'Client {i}'} for i in range(2, 6)]
+        response = self._post(rows, create_favorites='true')
+        self.assertEqual((response.data['created'], response.data['favorites_created']), (4, 4))
+
+        Favorite.objects.create(client=self.existing)
+        response = self._post(rows + [{'email': 'client1@example.com', 'name': 'Client One'}], create_favorites='true')
+        self.assertEqual(
+            (response.data['created'], response.data['updated'], response.data['unchanged'],
+             response.data['favorites_created']), (0, 0, 5, 0))
+        self.assertEqual(Favorite.objects.count(), 5)
+        self.assertEqual(Client.history.count(), 5)
+        self.assertEqual(Favorite.history.count(), 5)
+
+    def test_existing_clients_without_list_get_one(self):
+        response = self._post([{'email': 'client1@example.com', 'name': 'Client One'}], create_favorites='1')
+        self.assertEqual((response.data['unchanged'], response.data['favorites_created']), (1, 1))
+        self.assertEqual(self.existing.favorite_list.history.get().history_type, '+')
+
+    def test_errors_are_reported_per_row(self):
+        response = self._post([
+            {'email': 'client2@example.com', 'name': 'Client Two'},
+            {'email': 'not-an-email', 'name': 'Bad'},
+            'not json',
+            {'email': 'client3@example.com'},
+        ])
+        self.assertEqual((response.data['created'], response.data['rejected']), (1, 3))
+        self.assertEqual([r['line'] for r in response.data['rejections']], [2, 3, 4])
+        self.assertIn('email', response.data['rejections'][0]['errors'])
+        self.assertIn('name', response.data['rejections'][2]['errors'])
+
+    def test_invalid_create_favorites(self):
+        response = self._post([], create_favorites='maybe')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_query_count_does_not_depend_on_batch_size(self):
+        rows = [{'email': f'new{i}@example.com', 'name': f'New {i}'} for i in range(50)]
+        # savepoint + lookup + upsert + histórico + insert das listas + ids das listas + histórico das listas + release
+        with self.assertNumQueries(8):
+            ClientImporter(batch_size=100, create_favorites=True).run(enumerate(rows, start=1))
+        self.assertEqual(Favorite.objects.count(), 50)
+
+    def test_import_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('email,name\n' + ''.join(f'client{i}@example.com,Client {i}\n' for i in range(1, 26)))
+        self.addCleanup(os.remove, f.name)
+
+        out = StringIO()
+        call_command('import_clients', f.name, batch_size=10, create_favorites=True, user=self.user.email, stdout=out)
+        self.assertIn('24 created, 1 updated, 0 unchanged, 0 rejected, 25 favorite lists created', out.getvalue())
+        self.assertEqual(Client.history.filter(history_user=self.user).count(), 25)
+
+    def test_import_command_rejects_invalid_utf8_csv_lines(self):
+        with tempfile.NamedTemporaryFile('wb', suffix='.csv', delete=False) as f:
+            f.write(b'email,name\nnew1@example.com,Jos\xe9\nnew2@example.com,Ana\n')
+        self.addCleanup(os.remove, f.name)
+
+        out, err = StringIO(), StringIO()
+        call_command('import_clients', f.name, stdout=out, stderr=err)
+        self.assertIn('1 created, 0 updated, 0 unchanged, 1 rejected', out.getvalue())
+        self.assertIn('Line 2 rejected', err.getvalue())
+        self.assertTrue(Client.objects.filter(email='new2@example.com').exists())
+
+    def test_favorite_save_relies_on_the_unique_constraint(self):
+        Favorite.objects.create(client=self.existing)
+        with CaptureQueriesContext(connection) as queries, self.assertRaises(ValidationError):
+            Favorite.objects.create(client=self.existing)
+        self.assertFalse([q['sql'] for q in queries if q['sql'].startswith('SELECT')])
+        # A transação do teste continua utilizável depois do erro
+        self.assertEqual(Favorite.objects.filter(client=self.existing).count(), 1)
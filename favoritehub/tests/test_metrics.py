@@ -0,0 +1,117 @@
+from django.db import connection
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from authentication.authentication import user_cache
+from authentication.models import User
+from favoritehub.models import Product
+from utils.metrics import install_query_recorder, normalize_sql, recording, render_metrics, reset_metrics
+from utils.response_cache import get_cache
+
+
+class QueryRecorderTests(TestCase):
+    def setUp(self):
+        install_query_recorder(connection)
+        self.products = [
+            Product.objects.create(title=f'Product {i}', image=f'https://example.com/{i}.png', price=i)
+            for i in range(1, 7)
+        ]
+
+    def test_counts_queries_and_time(self):
+        with recording() as queries:
+            list(Product.objects.all())
+            Product.objects.filter(price__gte=3).exists()
+        self.assertEqual(queries.count, 2)
+        self.assertGreater(queries.duration, 0)
+        # Fora do bloco nada é registrado
+        list(Product.objects.all())
+        self.assertEqual(queries.count, 2)
+
+    def test_repeated_selects_are_reported(self):
+        with recording() as queries:
+            for product in self.products:
+                Product.objects.get(pk=product.pk)
+            Product.objects.filter(pk__in=[1, 2]).exists()
+            Product.objects.filter(pk__in=[1, 2, 3]).exists()
+        ((sql, count),) = queries.repeated(5)
+        self.assertEqual(count, 6)
+        self.assertIn('"favoritehub_product"."id" = %s', sql)
+        self.assertEqual(len(queries.repeated(2)), 2)
+
+    def test_normalize_sql(self):
+        self.assertEqual(normalize_sql("SELECT a FROM t WHERE b IN (%s, %s, %s) AND c = 'x' LIMIT 21"),
+                         'SELECT a FROM t WHERE b IN (%s, ...) AND c = %s LIMIT %s')
+        self.assertEqual(normalize_sql('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)'),
+                         'INSERT INTO t (a, b) VALUES (%s, ...), ...')
+
+
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=1.0, METRICS_TOKEN='secret')
+class RequestMetricsMiddlewareTests(APITestCase):
+    def setUp(self):
+        reset_metrics()
+        get_cache().clear()
+        self.user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        Product.objects.create(title='Product 1', image='https://example.com/1.png', price=10)
+
+    def test_server_timing_and_histograms(self):
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertRegex(response['Server-Timing'],
+                         r'^db;dur=[\d.]+;desc="[1-9]\d* queries", view;dur=[\d.]+, total;dur=[\d.]+$')
+
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertNotIn('Server-Timing', response)
+        body = response.content.decode()
+        labels = 'method="GET",route="product-list-create"'
+        self.assertIn(f'http_requests_total{{{labels},status="200"}} 1', body)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1', body)
+        self.assertIn(f'http_request_queries_count{{{labels}}} 1', body)
+        self.assertIn('# TYPE http_request_db_seconds histogram', body)
+        # O próprio /metrics não entra nas métricas
+        self.assertNotIn('route="metrics"', body)
+
+    def test_n_plus_one_is_logged(self):
+        with override_settings(REQUEST_METRICS_N_PLUS_ONE_THRESHOLD=1), \
+                self.assertLogs('utils.metrics', 'WARNING') as logs:
+            self.client.get('/api/products/')
+        self.assertIn('N+1 queries in GET /api/products/', logs.output[0])
+        self.assertIn('http_request_n_plus_one_total{method="GET",route="product-list-create"} 1', render_metrics())
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0.0)
+    def test_sampling_off(self):
+        response = self.client.get('/api/products/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertNotIn('product-list-create', render_metrics())
+
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_metrics_are_not_served_without_a_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer ')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(ROOT_URLCONF='core.asgi_urls', REQUEST_METRICS_SAMPLE_RATE=1.0)
+class AsyncRequestMetricsTests(TransactionTestCase):
+    def setUp(self):
+        reset_metrics()
+        get_cache().clear()
+        user_cache.clear()
+        user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        self.headers = {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+        Product.objects.create(title='Product 1', image='https://example.com/1.png', price=10)
+
+    async def test_queries_from_async_views_are_recorded(self):
+        response = await AsyncClient().get('/api/products/', headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries"')
@@ -0,0 +1,191 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from favoritehub.importers import ProductImporter
+from favoritehub.models import Client, Favorite, Notification, NotificationJob, Product
+from favoritehub.notifications import (
+    MAX_ATTEMPTS, LeaseLost, NotificationWorkerPool, claim_job, enqueue_price_changes, fail_job,
+    notification_pool, process_job)
+
+
+class NotificationQueueTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(title='Product', image='https://example.com/p.png', price=100)
+        self.other = Product.objects.create(title='Other', image='https://example.com/o.png', price=10)
+        self.lists = [
+            Favorite.objects.create(client=Client.objects.create(email=f'c{i}@example.com', name=f'Client {i}'))
+            for i in range(5)
+        ]
+        for favorite in self.lists:
+            favorite.products.add(self.product)
+        self.lists[0].products.add(self.other)
+
+    def jobs(self):
+        return list(NotificationJob.objects.order_by('id').values_list('product_id', 'previous_price', 'price', 'status'))
+
+    def test_price_change_enqueues_a_job(self):
+        self.product.title = 'Renamed'
+        self.product.save()
+        self.assertEqual(self.jobs(), [])
+
+        self.product.price = Decimal('80')
+        self.product.save()
+        self.assertEqual(self.jobs(), [(self.product.id, Decimal('100.00'), Decimal('80.00'), 'pending')])
+        # Só o job: nenhuma notificação é gravada na requisição
+        self.assertFalse(Notification.objects.exists())
+
+    def test_saves_that_keep_the_price_skip_the_queue(self):
+        self.product.title = 'Renamed'
+        with CaptureQueriesContext(connection) as queries:
+            self.product.save(update_fields=['title'])
+        self.assertFalse([q['sql'] for q in queries if q['sql'].startswith('SELECT')])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.product.save()
+        self.assertFalse([q['sql'] for q in queries if 'notificationjob' in q['sql']])
+
+    def test_repeated_changes_are_merged_while_pending(self):
+        for price in ['80', '70']:
+            self.product.price = Decimal(price)
+            self.product.save()
+        self.assertEqual(self.jobs(), [(self.product.id, Decimal('100.00'), Decimal('70.00'), 'pending')])
+
+        # De volta ao preço original: o job deixa de existir
+        self.product.price = Decimal('100')
+        self.product.save()
+        self.assertEqual(self.jobs(), [])
+
+    def test_claimed_job_keeps_its_price(self):
+        enqueue_price_changes([(self.product.id, 100, 80)])
+        job = claim_job()
+        enqueue_price_changes([(self.product.id, 80, 70)])
+        self.assertEqual(self.jobs(), [
+            (self.product.id, Decimal('100.00'), Decimal('80.00'), 'running'),
+            (self.product.id, Decimal('80.00'), Decimal('70.00'), 'pending'),
+        ])
+        self.assertEqual(process_job(job), 5)
+        self.assertEqual(Notification.objects.filter(price=Decimal('80')).count(), 5)
+
+    def test_rolled_back_change_leaves_no_job(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.product.price = Decimal('80')
+            self.product.save()
+            raise RuntimeError
+        self.assertEqual(self.jobs(), [])
+
+    def test_importer_enqueues_changed_prices(self):
+        ProductImporter().run(enumerate([
+            {'id': self.product.id, 'title': 'Product', 'image': 'https://example.com/p.png', 'price': '90.00'},
+            {'id': self.other.id, 'title': 'Renamed', 'image': 'https://example.com/o.png', 'price': '10.00'},
+        ], start=1))
+        self.assertEqual(self.jobs(), [(self.product.id, Decimal('100.00'), Decimal('90.00'), 'pending')])
+
+    def test_process_job_in_batches(self):
+        enqueue_price_changes([(self.product.id, 100, 80)])
+        job = claim_job()
+        self.assertEqual((job.status, job.attempts), ('running', 1))
+        self.assertIsNone(claim_job())
+
+        # Duas listas por lote: 3 lotes (leitura, e INSERT + cursor no savepoint), a leitura vazia e a conclusão
+        with self.assertNumQueries(3 * 5 + 2):
+            self.assertEqual(process_job(job, batch_size=2), 5)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.notified, job.last_favorite_id), ('done', 5, self.lists[-1].id))
+        self.assertEqual(
+            sorted(Notification.objects.values_list('client_id', 'product_id', 'previous_price', 'price')),
+            [(favorite.client_id, self.product.id, Decimal('100.00'), Decimal('80.00')) for favorite in self.lists],
+        )
+
+    def test_resumes_from_the_cursor_without_duplicates(self):
+        enqueue_price_changes([(self.product.id, 100, 80)])
+        job = claim_job()
+        # Como se o worker tivesse parado depois do segundo lote gravado
+        job.last_favorite_id = self.lists[1].id
+        self.assertEqual(process_job(job, batch_size=2), 3)
+        self.assertEqual(Notification.objects.count(), 3)
+
+        job.last_favorite_id = 0
+        process_job(job, batch_size=2)
+        self.assertEqual(Notification.objects.count(), 5)
+
+    def test_stale_job_is_claimed_again(self):
+        enqueue_price_changes([(self.product.id, 100, 80)])
+        job = claim_job()
+        NotificationJob.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        job.locked_at = timezone.now() - timedelta(hours=1)
+
+        taken = claim_job()
+        self.assertEqual((taken.pk, taken.attempts), (job.pk, 2))
+        # O primeiro worker perdeu o job e não grava mais nada
+        with self.assertRaises(LeaseLost):
+            process_job(job)
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(process_job(taken), 5)
+
+    def test_failed_job_is_retried_then_given_up(self):
+        enqueue_price_changes([(self.product.id, 100, 80)])
+        job = claim_job()
+        fail_job(job, 'boom')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('pending', 'boom'))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIsNone(claim_job())
+
+        NotificationJob.objects.filter(pk=job.pk).update(attempts=MAX_ATTEMPTS - 1, run_after=timezone.now())
+        job = claim_job()
+        fail_job(job, 'boom')
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIsNone(claim_job())
+
+
+# Um worker só: o SQLite em memória dos testes trava tabelas inteiras com escritas concorrentes
+class NotificationWorkerPoolTests(TransactionTestCase):
+    def setUp(self):
+        self.products = [
+            Product.objects.create(title=f'Product {i}', image='https://example.com/p.png', price=100)
+            for i in range(4)
+        ]
+        self.lists = [
+            Favorite.objects.create(client=Client.objects.create(email=f'c{i}@example.com', name=f'Client {i}'))
+            for i in range(6)
+        ]
+        for favorite in self.lists:
+            favorite.products.add(*self.products)
+
+    def change_prices(self):
+        for product in self.products:
+            product.price = Decimal('90')
+            product.save()
+
+    def test_drain_runs_every_job(self):
+        self.change_prices()
+        stats = NotificationWorkerPool(workers=1, batch_size=4, poll_interval=0.01).run()
+        self.assertEqual((stats['jobs'], stats['notifications'], stats['failures']), (4, 24, 0))
+        self.assertEqual(Notification.objects.count(), 24)
+        self.assertFalse(NotificationJob.objects.exclude(status='done').exists())
+
+    def test_command(self):
+        self.change_prices()
+        out = StringIO()
+        call_command('run_notification_workers', '--drain', '--workers', '1', stdout=out)
+        self.assertIn('4 jobs, 24 notifications, 0 failures', out.getvalue())
+
+    @override_settings(NOTIFICATION_WORKERS=1, NOTIFICATION_POLL_INTERVAL=0.01)
+    def test_in_process_pool_starts_on_commit(self):
+        self.addCleanup(notification_pool.stop)
+        with transaction.atomic():
+            enqueue_price_changes([(self.products[0].id, 100, 50)])
+            self.assertEqual(notification_pool.stats()['workers'], 0)
+        for _ in range(500):
+            if NotificationJob.objects.filter(status='done').exists():
+                break
+            notification_pool.join(timeout=0.01)
+        self.assertEqual(notification_pool.stats()['workers'], 1)
+        self.assertEqual(Notification.objects.filter(price=50).count(), 6)
@@ -0,0 +1,178 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from authentication.models import User
+from favoritehub.models import Client, Favorite, PriceChange, Product
+from favoritehub.price_changes import iter_refresh_price_changes, price_drops, refresh_price_changes
+from utils.response_cache import get_cache
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class PriceChangesTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.products = [
+            self.create_product(f'Product {i}', Decimal(100 * i), day=0) for i in range(1, 4)
+        ]
+        self.favorite_list = Favorite.objects.create(
+            client=Client.objects.create(email='client@example.com', name='Client'))
+        self.favorite_list.products.add(self.products[0], self.products[1])
+        self.url = reverse('favorite-price-drops', kwargs={'pk': self.favorite_list.id})
+
+    @staticmethod
+    def create_product(title, price, day):
+        product = Product(title=title, image='https://example.com/p.png', price=price)
+        product._history_date = START + timedelta(days=day)
+        product.save()
+        return product
+
+    @staticmethod
+    def change(product, day, **fields):
+        for name, value in fields.items():
+            setattr(product, name, value)
+        product._history_date = START + timedelta(days=day)
+        product.save()
+
+    def recorded(self):
+        return list(PriceChange.objects.order_by('history_id').values_list(
+            'product_id', 'previous_price', 'price', 'change_percent'))
+
+    def test_records_only_price_changes(self):
+        p1, p2, _ = self.products
+        self.change(p1, 1, price=Decimal('80'))
+        self.change(p1, 2, title='Renamed')
+        self.change(p2, 3, price=Decimal('250'))
+        self.change(p1, 4, price=Decimal('60'))
+
+        self.assertEqual(refresh_price_changes(), 3)
+        self.assertEqual(self.recorded(), [
+            (p1.id, Decimal('100.00'), Decimal('80.00'), -20.0),
+            (p2.id, Decimal('200.00'), Decimal('250.00'), 25.0),
+            (p1.id, Decimal('80.00'), Decimal('60.00'), -25.0),
+        ])
+        self.assertEqual(PriceChange.objects.get(price=Decimal('60')).changed_at, START + timedelta(days=4))
+
+    def test_incremental_refresh_uses_the_last_scanned_price(self):
+        p1, _, p3 = self.products
+        self.change(p1, 1, price=Decimal('90'))
+        self.assertEqual(refresh_price_changes(), 1)
+        # Nada novo: a execução seguinte não repete as mudanças já gravadas
+        self.assertEqual(refresh_price_changes(), 0)
+
+        # O preço anterior vem da última versão já lida, fora do lote novo
+        self.change(p1, 2, title='Renamed')
+        self.change(p1, 3, price=Decimal('45'))
+        self.change(p3, 4, price=Decimal('300'))
+        self.assertEqual(refresh_price_changes(), 1)
+        self.assertEqual(self.recorded()[-1], (p1.id, Decimal('90.00'), Decimal('45.00'), -50.0))
+
+    def test_rows_committed_below_the_checkpoint_are_picked_up(self):
+        p1, p2, _ = self.products
+        self.change(p1, 1, price=Decimal('80'))
+        self.change(p2, 2, price=Decimal('250'))
+        self.change(p1, 3, price=Decimal('60'))
+        # As duas versões de p1 só são commitadas depois que a de p2 já foi lida
+        late = list(p1.history.filter(history_date__gt=START).order_by('history_id'))
+        p1.history.filter(history_date__gt=START).delete()
+        self.assertEqual(refresh_price_changes(), 1)
+
+        p1.history.bulk_create(late)
+        self.assertEqual(refresh_price_changes(), 2)
+        self.assertEqual(self.recorded(), [
+            (p1.id, Decimal('100.00'), Decimal('80.00'), -20.0),
+            (p2.id, Decimal('200.00'), Decimal('250.00'), 25.0),
+            (p1.id, Decimal('80.00'), Decimal('60.00'), -25.0),
+        ])
+        self.assertEqual(refresh_price_changes(), 0)
+
+    def test_late_row_corrects_the_previous_price(self):
+        p1 = self.products[0]
+        self.change(p1, 1, price=Decimal('80'))
+        self.change(p1, 2, price=Decimal('60'))
+        middle = p1.history.get(price=Decimal('80'))
+        p1.history.filter(pk=middle.pk).delete()
+        refresh_price_changes()
+        self.assertEqual(self.recorded(), [(p1.id, Decimal('100.00'), Decimal('60.00'), -40.0)])
+
+        p1.history.bulk_create([middle])
+        refresh_price_changes()
+        self.assertEqual(self.recorded(), [
+            (p1.id, Decimal('100.00'), Decimal('80.00'), -20.0),
+            (p1.id, Decimal('80.00'), Decimal('60.00'), -25.0),
+        ])
+
+    def test_chunks_and_rebuild(self):
+        p1, p2, p3 = self.products
+        for day, price in enumerate([90, 80, 70], start=1):
+            self.change(p1, day, price=Decimal(price))
+            self.change(p2, day, price=Decimal(price * 3))
+        p3.delete()
+
+        chunks = list(iter_refresh_price_changes(chunk_size=2))
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(sum(created for _, created in chunks), 6)
+        before = self.recorded()
+
+        out = StringIO()
+        call_command('refresh_price_changes', '--rebuild', '--chunk-size', '4', stdout=out)
+        self.assertIn('6 price changes recorded', out.getvalue())
+        self.assertEqual(self.recorded(), before)
+
+    def test_price_drops_query(self):
+        p1, p2, p3 = self.products
+        self.change(p1, 1, price=Decimal('80'))
+        self.change(p2, 2, price=Decimal('250'))
+        self.change(p3, 3, price=Decimal('10'))
+        self.change(p2, 5, price=Decimal('150'))
+        refresh_price_changes()
+
+        drops = price_drops(self.favorite_list.id, since=START)
+        with self.assertNumQueries(1):
+            self.assertEqual([(d.product.title, d.price) for d in drops],
+                             [('Product 2', Decimal('150.00')), ('Product 1', Decimal('80.00'))])
+        drops = price_drops(self.favorite_list.id, since=START + timedelta(days=1), until=START + timedelta(days=5))
+        self.assertEqual([d.product_id for d in drops], [p1.id])
+
+    def test_price_drops_endpoint(self):
+        p1, p2, _ = self.products
+        self.change(p1, 1, price=Decimal('75'))
+        self.change(p2, 2, price=Decimal('150'))
+        refresh_price_changes()
+
+        response = self.client.get(self.url, {'since': '2024-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['results'][1], {
+            'product': {'id': p1.id, 'title': 'Product 1', 'image': 'https://example.com/p.png', 'price': '75.00'},
+            'previous_price': '100.00',
+            'price': '75.00',
+            'change_percent': -25.0,
+            'changed_at': '2024-01-01T21:00:00-03:00',
+        })
+
+        response = self.client.get(self.url, {'since': '2024-01-01', 'until': '2024-01-03T00:00:00Z'})
+        self.assertEqual([d['product']['id'] for d in response.json()['results']], [p1.id])
+        # Sem `since`, só os últimos dias
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()['results'], [])
+
+        # Uma nova atualização invalida as respostas guardadas
+        self.change(p1, 9000, price=Decimal('50'))
+        refresh_price_changes()
+        response = self.client.get(self.url)
+        self.assertEqual([d['price'] for d in response.json()['results']], ['50.00'])
+
+    def test_price_drops_validation_and_missing_list(self):
+        response = self.client.get(self.url, {'since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('since', response.json())
+
+        response = self.client.get(reverse('favorite-price-drops', kwargs={'pk': 999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
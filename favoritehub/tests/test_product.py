@@ -0,0 +1,92 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+from authentication.models import User
+from favoritehub.models import Product, Review
+
+
+class ProductRatingSummaryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+        self.product = Product.objects.create(title='Product 1', price=100.0)
+        self.url = '/api/products/'
+
+    def test_summary_starts_empty(self):
+        self.assertEqual(self.product.rating_count, 0)
+        self.assertEqual(self.product.rating_sum, 0)
+        self.assertIsNone(self.product.average_rating())
+
+    def test_summary_is_updated_on_review_create(self):
+        Review.objects.create(product=self.product, rating=4)
+        Review.objects.create(product=self.product, rating=5)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_count, 2)
+        self.assertEqual(self.product.rating_sum, 9)
+        self.assertAlmostEqual(self.product.average_rating(), 4.5)
+
+    def test_summary_is_updated_on_review_change(self):
+        review = Review.objects.create(product=self.product, rating=2)
+        review.rating = 5
+        review.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_count, 1)
+        self.assertAlmostEqual(self.product.average_rating(), 5.0)
+
+    def test_summary_follows_review_moved_to_other_product(self):
+        other = Product.objects.create(title='Product 2', price=50.0)
+        review = Review.objects.create(product=self.product, rating=3)
+        review.product = other
+        review.save()
+        self.product.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.product.rating_count, 0)
+        self.assertIsNone(self.product.average_rating())
+        self.assertEqual(other.rating_count, 1)
+        self.assertAlmostEqual(other.average_rating(), 3.0)
+
+    def test_summary_is_updated_on_review_delete(self):
+        Review.objects.create(product=self.product, rating=1)
+        review = Review.objects.create(product=self.product, rating=3)
+        review.delete()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_count, 1)
+        self.assertAlmostEqual(self.product.average_rating(), 1.0)
+
+        Review.objects.filter(product=self.product).delete()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_count, 0)
+        self.assertIsNone(self.product.average_rating())
+
+    def test_saving_a_stale_instance_keeps_the_summary(self):
+        stale = Product.objects.get(pk=self.product.pk)
+        Review.objects.create(product=self.product, rating=4)
+        stale.title = 'Renamed'
+        stale.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.title, 'Renamed')
+        self.assertEqual((self.product.rating_count, self.product.rating_sum), (1, 4))
+        self.assertAlmostEqual(self.product.average_rating(), 4.0)
+
+    def test_list_products_returns_rounded_average(self):
+        Review.objects.create(product=self.product, rating=4)
+        Review.objects.create(product=self.product, rating=4)
+        Review.objects.create(product=self.product, rating=5)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['average_rating'], 4.33)
+
+    def test_list_products_query_count_does_not_grow_with_page(self):
+        # O número de queries não pode depender da quantidade de produtos/avaliações
+        with CaptureQueriesContext(connection) as single:
+            self.client.get(self.url)
+
+        for i in range(4):
+            product = Product.objects.create(title=f'Extra {i}', price=10.0)
+            Review.objects.create(product=product, rating=3)
+
+        with CaptureQueriesContext(connection) as full:
+            self.client.get(self.url)
+        self.assertEqual(len(single), len(full))
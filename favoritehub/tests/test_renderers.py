@@ -0,0 +1,39 @@
+import json
+from decimal import Decimal
+
+from django.test import SimpleTestCase, override_settings
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+from utils.renderers import FastJSONRenderer, UserRender, contains_error_detail
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    data = [
+        {'id': 1, 'title': 'Produto ç', 'price': '10.50', 'average_rating': 4.5, 'tags': None},
+        {'id': 2, 'title': 'Product 2', 'price': Decimal('3.20'), 'average_rating': None, 'tags': ['a']},
+    ]
+
+    def test_output_matches_the_stdlib_renderer(self):
+        expected = json.loads(JSONRenderer().render(self.data))
+        self.assertEqual(json.loads(FastJSONRenderer().render(self.data)), expected)
+        with override_settings(JSON_RENDERER_BACKEND='json'):
+            self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_indent_uses_the_stdlib_encoder(self):
+        rendered = FastJSONRenderer().render(self.data, 'application/json; indent=2')
+        self.assertEqual(rendered, JSONRenderer().render(self.data, 'application/json; indent=2'))
+
+    def test_none_renders_empty_body(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+
+class UserRenderTests(SimpleTestCase):
+    def test_envelopes(self):
+        errors = {'email': [ErrorDetail('A user with this email already exists.', code='invalid')], 'status_code': 400}
+        self.assertEqual(json.loads(UserRender().render({'tokens': {'access': 'x'}})), {'data': {'tokens': {'access': 'x'}}})
+        self.assertEqual(json.loads(UserRender().render(errors)), {'errors': {
+            'email': ['A user with this email already exists.'], 'status_code': 400}})
+
+    def test_contains_error_detail(self):
+        self.assertTrue(contains_error_detail({'a': [{'b': (ErrorDetail('x'),)}]}))
+        self.assertFalse(contains_error_detail({'a': ['ErrorDetail', {'b': 1}]}))
@@ -0,0 +1,101 @@
+from django.db import connection, connections, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+from authentication.models import User
+from favoritehub.models import Client, Favorite, Product, Review
+from utils.response_cache import _generations, bump_generation, get_cache
+
+
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+        self.product = Product.objects.create(title='Product 1', image='https://example.com/1.png', price=100)
+        self.client1 = Client.objects.create(email='client1@example.com', name='Client One')
+        self.favorite_list = Favorite.objects.create(client=self.client1)
+
+    def _get(self, url, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, headers=headers)
+        return response, len(queries)
+
+    def test_second_request_is_served_from_cache(self):
+        first, first_queries = self._get('/api/products/')
+        second, second_queries = self._get('/api/products/')
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertGreater(first_queries, 0)
+        self.assertEqual(second_queries, 0)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertFalse(first['ETag'].startswith('W/'))
+
+    def test_if_none_match_returns_304(self):
+        first, _ = self._get('/api/clients/')
+        response, queries = self._get('/api/clients/', **{'If-None-Match': first['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response.content, b'')
+        self.assertEqual(queries, 0)
+
+        response, _ = self._get('/api/clients/', **{'If-None-Match': '"other"'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_query_string_is_part_of_the_key(self):
+        Product.objects.create(title='Product 2', image='https://example.com/2.png', price=50)
+        first, _ = self._get('/api/products/?page_size=1')
+        second, _ = self._get('/api/products/?page_size=2')
+        self.assertNotEqual(first['ETag'], second['ETag'])
+        self.assertEqual(len(second.data['results']), 2)
+
+    def test_saves_invalidate_the_cache(self):
+        first, _ = self._get(f'/api/clients/{self.client1.id}/')
+        self.client1.name = 'Renamed'
+        self.client1.save()
+
+        response, queries = self._get(f'/api/clients/{self.client1.id}/', **{'If-None-Match': first['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(queries, 0)
+        self.assertEqual(response.data['name'], 'Renamed')
+
+    def test_bump_follows_the_commit_of_the_write_database(self):
+        # Uma segunda conexão, como a de um alias que não é o default
+        other = connections.create_connection('default')
+        connections['other'] = other
+        self.addCleanup(delattr, connections._connections, 'other')
+        self.addCleanup(other.close)
+
+        with transaction.atomic(using='other'):
+            bump_generation(Product, using='other')
+            during = _generations([Product])
+        self.assertNotEqual(_generations([Product]), during)
+
+    def test_reviews_invalidate_the_product_list(self):
+        self._get('/api/products/')
+        Review.objects.create(product=self.product, rating=4)
+        response, _ = self._get('/api/products/')
+        self.assertEqual(response.data['results'][0]['average_rating'], 4.0)
+
+    def test_favorite_products_change_invalidates_the_cache(self):
+        url = f'/api/favorites/{self.favorite_list.id}/products/'
+        response, _ = self._get(url)
+        self.assertEqual(response.data['results'], [])
+
+        self.favorite_list.products.add(self.product)
+        response, _ = self._get(url)
+        self.assertEqual([p['id'] for p in response.data['results']], [self.product.id])
+
+        self.favorite_list.bulk_update_products(remove_ids=[self.product.id])
+        response, _ = self._get(url)
+        self.assertEqual(response.data['results'], [])
+
+    def test_errors_are_not_cached(self):
+        response, _ = self._get('/api/clients/999/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        # bulk_create não dispara post_save: se o 404 estivesse em cache, continuaria sendo servido
+        Client.objects.bulk_create([Client(id=999, email='client999@example.com', name='Client 999')])
+        response, _ = self._get('/api/clients/999/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,86 @@
+from rest_framework import status
+from rest_framework.test import APITestCase
+from authentication.models import User
+from favoritehub.models import Product
+from favoritehub.search import search_products, search_terms
+from utils.response_cache import get_cache
+
+
+class ProductSearchTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user(email='testuser@testuser.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+        titles_and_prices = [
+            ('Red running shoes', 120), ('Blue running shirt', 60), ('Red shirt', 40),
+            ('Smartphone case', 15), ('Phone charger', 25), ('Running shoes for trail', 150),
+        ]
+        self.products = {
+            title: Product.objects.create(title=title, image='https://example.com/p.png', price=price)
+            for title, price in titles_and_prices
+        }
+        self.url = '/api/products/'
+
+    def _titles(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [p['title'] for p in response.data['results']]
+
+    def test_search_terms(self):
+        self.assertEqual(search_terms('  Red, "Running"  shoes! '), ['red', 'running', 'shoes'])
+        self.assertEqual(search_terms('!!!'), [])
+
+    def test_every_term_must_match_as_substring(self):
+        self.assertEqual(
+            self._titles({'search': 'running shoes', 'page_size': 10}),
+            ['Red running shoes', 'Running shoes for trail'])
+        # Início de palavra, sem diferenciar maiúsculas
+        self.assertEqual(self._titles({'search': 'CHARG', 'page_size': 10}), ['Phone charger'])
+        self.assertEqual(self._titles({'search': 'red sh', 'page_size': 10}), ['Red running shoes', 'Red shirt'])
+        self.assertEqual(self._titles({'search': 'nothing here'}), [])
+
+    def test_index_follows_title_changes_and_deletes(self):
+        product = self.products['Red shirt']
+        product.title = 'Green shirt'
+        product.save()
+        self.products['Phone charger'].delete()
+        self.assertEqual(self._titles({'search': 'green'}), ['Green shirt'])
+        self.assertEqual(self._titles({'search': 'red shirt'}), [])
+        self.assertEqual(self._titles({'search': 'charger'}), [])
+
+    def test_price_range_and_ordering(self):
+        self.assertEqual(
+            self._titles({'min_price': 30, 'max_price': 120, 'ordering': '-price', 'page_size': 10}),
+            ['Red running shoes', 'Blue running shirt', 'Red shirt'])
+
+        response = self.client.get(self.url, {'ordering': 'price', 'page_size': 2})
+        self.assertEqual([p['title'] for p in response.data['results']], ['Smartphone case', 'Phone charger'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([p['title'] for p in response.data['results']], ['Red shirt', 'Blue running shirt'])
+
+    def test_invalid_price(self):
+        for value in ('cheap', 'NaN'):
+            response = self.client.get(self.url, {'min_price': value})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_relevance_ranking(self):
+        # O título mais curto com os mesmos termos é o mais relevante
+        self.assertEqual(
+            self._titles({'search': 'running shoes', 'ordering': 'relevance', 'page_size': 10}),
+            ['Red running shoes', 'Running shoes for trail'])
+
+        queryset = search_products(Product.objects.all(), 'running', rank=True)
+        ranks = dict(queryset.values_list('title', 'search_rank'))
+        self.assertEqual(set(ranks), {'Red running shoes', 'Blue running shirt', 'Running shoes for trail'})
+        self.assertTrue(all(rank > 0 for rank in ranks.values()))
+
+    def test_relevance_pages_with_the_cursor(self):
+        first = self.client.get(self.url, {'search': 'running', 'ordering': 'relevance', 'page_size': 2})
+        second = self.client.get(first.data['next'])
+        titles = [p['title'] for p in first.data['results'] + second.data['results']]
+        self.assertCountEqual(titles, ['Red running shoes', 'Blue running shirt', 'Running shoes for trail'])
+        self.assertIsNone(second.data['next'])
+
+    def test_relevance_without_search_falls_back_to_id(self):
+        self.assertEqual(self._titles({'ordering': 'relevance', 'page_size': 2}), ['Red running shoes', 'Blue running shirt'])
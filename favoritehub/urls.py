@@ -1,6 +1,11 @@
 from rest_framework.routers import DefaultRouter
 from django.urls import path, include
-from .views import ClientViewSet, ProductListCreateAPIView, FavoriteViewSet
+from .views import (
+    ClientViewSet,
+    ProductListCreateAPIView,
+    ProductLeaderboardAPIView,
+    ProductImportAPIView,
+    FavoriteViewSet)
 
 router = DefaultRouter()
 
@@ -10,4 +15,6 @@ router.register(r'favorites', FavoriteViewSet, basename='favorite')
 urlpatterns = [
     path('', include(router.urls)),
     path('products/', ProductListCreateAPIView.as_view(), name='product-list-create'),
+    path('products/top/', ProductLeaderboardAPIView.as_view(), name='product-leaderboard'),
+    path('products/import/', ProductImportAPIView.as_view(), name='product-import'),
 ]
@@ -1,25 +1,224 @@
-from rest_framework import viewsets, status
+from datetime import timedelta
+
+from rest_framework import serializers, viewsets, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.generics import ListCreateAPIView
+from rest_framework.generics import ListAPIView, ListCreateAPIView
+from rest_framework.views import APIView
 from rest_framework.decorators import action
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
-from .models import Client, Product, Favorite
-from .serializers import ClientSerializer, ProductSerializer, FavoriteSerializer
+from utils.pagination import KeysetPagination
+from utils.response_cache import cache_response
+from .exporters import EXPORTERS, iter_favorite_rows, parse_since
+from .favorites_index import favorited_product_ids, has_product
+from .filters import ProductOrderingFilter, ProductSearchFilter
+from .importers import PARSERS, ClientImporter, ProductImporter
+from .models import Client, Product, Favorite, PriceChange
+from .price_changes import DEFAULT_WINDOW_DAYS, price_drops
+from .serializers import (
+    ClientSerializer,
+    ProductSerializer,
+    ProductLeaderboardSerializer,
+    FavoriteSerializer,
+    FavoriteBulkProductsSerializer,
+    FavoriteMembershipSerializer,
+    PriceDropSerializer)
+
+
+def request_lines(request):
+    """
+    Reads the body of `request` as byte lines straight from the stream, without loading it. The
+    parsers decode each line, so invalid UTF-8 rejects only the lines it is on.
+    """
+    return iter(request._request)
 
 
 class ClientViewSet(viewsets.ModelViewSet):
     permission_classes = (IsAuthenticated,)
     queryset = Client.objects.all().order_by('id')
     serializer_class = ClientSerializer
+    lookup_value_regex = r'\d+'
+
+    @cache_response(Client)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response(Client)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_description='Streams a JSONL (default) or CSV (`Content-Type: text/csv`) body of clients and '
+                              'upserts them in batches keyed on `email`. With `?create_favorites=true` every '
+                              'imported client also gets a favorite list if it has none.',
+        manual_parameters=[
+            openapi.Parameter('create_favorites', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN, default=False),
+        ],
+        responses={200: openapi.Response('Import summary with created, updated, unchanged and rejected rows')}
+    )
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_clients(self, request):
+        try:
+            create_favorites = serializers.BooleanField().to_internal_value(
+                request.query_params.get('create_favorites', 'false'))
+        except serializers.ValidationError as e:
+            raise ValidationError({'create_favorites': e.detail})
+        input_format = 'csv' if request.content_type.startswith('text/csv') else 'jsonl'
+        importer = ClientImporter(history_user=request.user, create_favorites=create_favorites)
+        return Response(importer.run(PARSERS[input_format](request_lines(request))))
 
 
 class ProductListCreateAPIView(ListCreateAPIView):
     permission_classes = (IsAuthenticated,)
     queryset = Product.objects.all().order_by('id')
     serializer_class = ProductSerializer
+    filter_backends = (ProductSearchFilter, ProductOrderingFilter)
+    ordering_fields = ('id', 'price')
+    ordering = ('id',)
+
+    @cache_response(Product)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+
+class ProductLeaderboardAPIView(ListAPIView):
+    permission_classes = (IsAuthenticated,)
+    serializer_class = ProductLeaderboardSerializer
+    pagination_class = None
+    default_limit = 10
+    max_limit = 100
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            raise ValidationError({'limit': 'A valid integer is required.'})
+        if not 1 <= limit <= self.max_limit:
+            raise ValidationError({'limit': f'Must be between 1 and {self.max_limit}.'})
+        return limit
+
+    def get_queryset(self):
+        # Percorre o índice product_favorites_rank_idx e para após `limit` linhas
+        return (
+            Product.objects.filter(favorites_count__gt=0)
+            .only('id', 'title', 'image', 'price', 'rating_average', 'favorites_count')
+            .order_by('-favorites_count', 'id')[:self.get_limit()]
+        )
+
+    @swagger_auto_schema(
+        manual_parameters=[openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=10)],
+        responses={200: ProductLeaderboardSerializer(many=True)}
+    )
+    @cache_response(Product, Favorite)
+    def get(self, request, *args, **kwargs):
+        return self.list(request, *args, **kwargs)
+
+
+class ProductImportAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    @swagger_auto_schema(
+        operation_description='Streams a JSONL (default) or CSV (`Content-Type: text/csv`) body of products '
+                              'and upserts them in batches. Rows with an `id` update that product.',
+        responses={200: openapi.Response('Import summary with created, updated and rejected rows')}
+    )
+    def post(self, request):
+        input_format = 'csv' if request.content_type.startswith('text/csv') else 'jsonl'
+        # Lê o corpo direto do stream, sem carregar o payload inteiro em request.data
+        summary = ProductImporter(history_user=request.user).run(PARSERS[input_format](request_lines(request)))
+        return Response(summary)
+
+
+def get_export_options(query_params):
+    """Validates the `output` and `since` query parameters of the favorites export."""
+    output = query_params.get('output', 'ndjson')
+    if output not in EXPORTERS:
+        raise ValidationError({'output': f'Expected one of: {", ".join(EXPORTERS)}.'})
+    since = query_params.get('since')
+    if since:
+        try:
+            since = parse_since(since)
+        except ValueError as e:
+            raise ValidationError({'since': str(e)})
+    return output, since or None
+
+
+def export_response(streaming_content, output):
+    content_type = EXPORTERS[output][1]
+    return StreamingHttpResponse(
+        streaming_content,
+        content_type=content_type,
+        headers={'Content-Disposition': f'attachment; filename="favorites.{output}"'},
+    )
+
+
+EXPORT_PARAMETERS = [
+    openapi.Parameter('output', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(EXPORTERS), default='ndjson'),
+    openapi.Parameter(
+        'since', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+        description='ISO 8601 date or date-time; only lists changed at or after it are exported'),
+]
+
+
+def get_membership_query(query_params):
+    """Validates the `favorite` or `client` and the comma-separated `product_ids` of a membership lookup."""
+    data = {key: query_params[key] for key in ('favorite', 'client') if key in query_params}
+    data['product_ids'] = [
+        item.strip() for value in query_params.getlist('product_ids') for item in value.split(',') if item.strip()]
+    serializer = FavoriteMembershipSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+
+def membership_response(product_ids, favorited):
+    # bitmap[i] == '1' se product_ids[i] está na lista, na ordem pedida
+    return Response({
+        'favorited': [product_id for product_id in dict.fromkeys(product_ids) if product_id in favorited],
+        'bitmap': ''.join('1' if product_id in favorited else '0' for product_id in product_ids),
+    })
+
+
+MEMBERSHIP_PARAMETERS = [
+    openapi.Parameter('favorite', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Favorite list ID'),
+    openapi.Parameter('client', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                      description='Client ID, instead of the favorite list ID'),
+    openapi.Parameter(
+        'product_ids', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True,
+        description=f'Comma-separated product IDs, at most {FavoriteMembershipSerializer.MAX_PRODUCTS}'),
+]
+
+
+def get_price_drop_window(query_params):
+    """Validates the `since` and `until` query parameters of the price drops of a favorite list."""
+    window = {}
+    for name in ('since', 'until'):
+        value = query_params.get(name)
+        if value:
+            try:
+                window[name] = parse_since(value)
+            except ValueError as e:
+                raise ValidationError({name: str(e)})
+    since = window.get('since') or timezone.now() - timedelta(days=DEFAULT_WINDOW_DAYS)
+    return since, window.get('until')
+
+
+class PriceDropPagination(KeysetPagination):
+    # Mais recentes primeiro; `id` desempata mudanças com a mesma data
+    ordering = ('-changed_at', '-id')
+
+
+PRICE_DROP_PARAMETERS = [
+    openapi.Parameter(
+        'since', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+        description=f'ISO 8601 date or date-time; drops at or after it (default: the last {DEFAULT_WINDOW_DAYS} days)'),
+    openapi.Parameter(
+        'until', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+        description='ISO 8601 date or date-time; drops before it'),
+]
 
 
 class FavoriteViewSet(viewsets.ModelViewSet):
@@ -27,6 +226,15 @@ class FavoriteViewSet(viewsets.ModelViewSet):
     queryset = Favorite.objects.all().order_by('id')
     serializer_class = FavoriteSerializer
     http_method_names = ['head', 'get', 'post', 'delete']
+    lookup_value_regex = r'\d+'
+
+    @cache_response(Favorite)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response(Favorite)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     @swagger_auto_schema(
         request_body=openapi.Schema(
@@ -84,7 +292,7 @@ class FavoriteViewSet(viewsets.ModelViewSet):
         try:
             product = Product.objects.get(id=product_id)
 
-            if favorite_list.products.filter(id=product_id).exists():
+            if has_product(favorite_list, product.id):
                 return Response({'error': 'Product already in the favorite list'}, status=status.HTTP_400_BAD_REQUEST)
 
             favorite_list.add_product(product)
@@ -120,7 +328,7 @@ class FavoriteViewSet(viewsets.ModelViewSet):
         try:
             product = Product.objects.get(id=product_id)
 
-            if not favorite_list.products.filter(id=product_id).exists():
+            if not has_product(favorite_list, product.id):
                 return Response({'error': 'Product not in the favorite list.'}, status=status.HTTP_400_BAD_REQUEST)
 
             favorite_list.remove_product(product)
@@ -131,3 +339,105 @@ class FavoriteViewSet(viewsets.ModelViewSet):
 
         except ValidationError as e:
             return Response({'error': str(e)}, status=400)
+
+    @swagger_auto_schema(
+        request_body=FavoriteBulkProductsSerializer,
+        responses={
+            200: openapi.Response(
+                description='Status of each requested product',
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'results': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'product_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                    'status': openapi.Schema(
+                                        type=openapi.TYPE_STRING,
+                                        enum=['added', 'already_in_list', 'removed', 'not_in_list', 'not_found']
+                                    )
+                                }
+                            )
+                        )
+                    }
+                )
+            ),
+            400: openapi.Response('Validation error')
+        }
+    )
+    @action(detail=True, methods=['post'])
+    def bulk_products(self, request, pk=None):
+        favorite_list = self.get_object()
+        serializer = FavoriteBulkProductsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = favorite_list.bulk_update_products(
+            add_ids=serializer.validated_data['add'],
+            remove_ids=serializer.validated_data['remove'],
+        )
+        return Response({'results': [{'product_id': product_id, 'status': result} for product_id, result in results]})
+
+    @swagger_auto_schema(
+        manual_parameters=EXPORT_PARAMETERS,
+        responses={200: openapi.Response('NDJSON (one favorite list per line) or CSV (one product per row)')}
+    )
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        output, since = get_export_options(request.query_params)
+        exporter = EXPORTERS[output][0]
+        return export_response(exporter(iter_favorite_rows(since=since)), output)
+
+    @swagger_auto_schema(
+        manual_parameters=MEMBERSHIP_PARAMETERS,
+        responses={200: openapi.Response(
+            description='Which of the products are in the favorite list',
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'favorited': openapi.Schema(
+                        type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+                    'bitmap': openapi.Schema(
+                        type=openapi.TYPE_STRING, description="'1' or '0' for each requested product, in order"),
+                }
+            )
+        )}
+    )
+    @action(detail=False, methods=['get'])
+    def membership(self, request):
+        query = get_membership_query(request.query_params)
+        favorited = favorited_product_ids(
+            query['product_ids'], favorite_id=query.get('favorite'), client_id=query.get('client'))
+        return membership_response(query['product_ids'], favorited)
+
+    @swagger_auto_schema(responses={200: ProductSerializer(many=True), 404: openapi.Response('Favorite list not found')})
+    @action(detail=True, methods=['get'], serializer_class=ProductSerializer)
+    @cache_response(Product, Favorite)
+    def products(self, request, pk=None):
+        # Um único join pela tabela intermediária; a lista só é buscada se a página vier vazia
+        queryset = (
+            Product.objects.filter(favorite_clients__id=pk)
+            .only('id', 'title', 'image', 'price', 'rating_average')
+            .order_by('id')
+        )
+        page = self.paginate_queryset(queryset)
+        if not page and not Favorite.objects.filter(pk=pk).exists():
+            raise Http404
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @swagger_auto_schema(
+        manual_parameters=PRICE_DROP_PARAMETERS,
+        responses={200: PriceDropSerializer(many=True), 404: openapi.Response('Favorite list not found')}
+    )
+    @action(detail=True, methods=['get'], serializer_class=PriceDropSerializer,
+            pagination_class=PriceDropPagination)
+    @cache_response(PriceChange, Product, Favorite)
+    def price_drops(self, request, pk=None):
+        since, until = get_price_drop_window(request.query_params)
+        page = self.paginate_queryset(price_drops(pk, since, until))
+        if not page and not Favorite.objects.filter(pk=pk).exists():
+            raise Http404
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class UtilsConfig(AppConfig):
+    name = 'utils'
+
+    def ready(self):
+        from .metrics import instrument_connection
+
+        # Mede as queries das requisições amostradas pelo RequestMetricsMiddleware
+        connection_created.connect(instrument_connection, dispatch_uid='utils.metrics.instrument_connection')
@@ -0,0 +1,132 @@
+"""
+Read/write splitting between the primary database (`default`) and the `READ_REPLICAS`.
+
+`ReadReplicaMiddleware` lets a request read from a replica only when it is safe (`GET`, `HEAD`,
+`OPTIONS`) and served by one of the `READ_REPLICA_APPS`. Everything else reads from the primary,
+and all writes go to the primary.
+
+Read-your-writes: as soon as a request writes, its remaining reads go to the primary and the
+response sets a short-lived cookie that keeps the same session on the primary for
+`READ_REPLICA_PIN_SECONDS`, longer than the replication lag is expected to be.
+
+Responses rendered from a replica may be behind the primary, so `utils/response_cache.py` does
+not store them (see `read_from_replica`); cached entries always come from the primary.
+
+A replica that cannot be connected to is skipped for `READ_REPLICA_RETRY_SECONDS`; with every
+replica down, reads fall back to the primary.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+PRIMARY = 'default'
+PIN_COOKIE = 'db_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_routing = ContextVar('db_routing', default=None)
+_unhealthy_until = {}
+
+
+class RoutingState:
+    def __init__(self, pinned=False):
+        self.use_replicas = False
+        self.pinned = pinned
+        self.wrote = False
+        self.read_alias = None
+
+
+def current_state():
+    return _routing.get()
+
+
+def read_from_replica():
+    """Whether the current request has read from a replica instead of the primary."""
+    state = _routing.get()
+    return state is not None and state.read_alias not in (None, PRIMARY)
+
+
+def is_healthy(alias):
+    """Connects to `alias` if needed; a failure takes it out of rotation for a while."""
+    if _unhealthy_until.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        _unhealthy_until[alias] = time.monotonic() + settings.READ_REPLICA_RETRY_SECONDS
+        return False
+    _unhealthy_until.pop(alias, None)
+    return True
+
+
+def choose_replica():
+    replicas = list(getattr(settings, 'READ_REPLICAS', []))
+    random.shuffle(replicas)
+    return next((alias for alias in replicas if is_healthy(alias)), PRIMARY)
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if state is None or not state.use_replicas or state.pinned or state.wrote:
+            return PRIMARY
+        if state.read_alias is None:
+            # Uma réplica por requisição, para que todas as leituras vejam o mesmo estado
+            state.read_alias = choose_replica()
+        return state.read_alias
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primário e réplicas têm os mesmos dados
+        return True
+
+
+class ReadReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin_session(state, response)
+
+    async def __acall__(self, request):
+        state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _routing.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin_session(state, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _routing.get()
+        view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        app = (view_class or view_func).__module__.split('.')[0]
+        state.use_replicas = request.method in SAFE_METHODS and app in settings.READ_REPLICA_APPS
+
+    @staticmethod
+    def pin_session(state, response):
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.READ_REPLICA_PIN_SECONDS, httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,307 @@
+"""
+Per-request SQL and latency instrumentation, published in the Prometheus text format.
+
+A sampled request (`REQUEST_METRICS_SAMPLE_RATE`) gets a `QueryRecorder` in its context, and
+`record_query`, installed as an execute wrapper on every database connection (see `utils/apps.py`),
+adds each query's duration to it, from sync code or from the threads `sync_to_async` runs the ORM
+in. Outside a sampled request the wrapper only reads a context variable, so sampling off costs next
+to nothing.
+
+Each sampled response gets a `Server-Timing` header and feeds the per-route histograms served by
+`metrics_view`. SELECTs that only differ by their parameters and run at least
+`REQUEST_METRICS_N_PLUS_ONE_THRESHOLD` times in one request are logged as N+1 queries.
+
+The metrics live in the process: with several workers, scrape each one.
+"""
+import logging
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as TallyCounter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_recorder = ContextVar('query_recorder', default=None)
+_lock = threading.Lock()
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST_RE = re.compile(r'%s(?:\s*,\s*%s)+')
+_ROW_LIST_RE = re.compile(r'(\([^()]*\))(?:\s*,\s*\1)+')
+
+
+def normalize_sql(sql):
+    """Reduces a statement to its shape: literals, `IN` lists and multi-row `VALUES` collapse."""
+    sql = _NUMBER_RE.sub('%s', _STRING_RE.sub('%s', sql))
+    return _ROW_LIST_RE.sub(r'\1, ...', _PLACEHOLDER_LIST_RE.sub('%s, ...', sql))
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.selects = TallyCounter()
+
+    def add(self, sql, duration):
+        self.count += 1
+        self.duration += duration
+        if sql.lstrip()[:6].upper() == 'SELECT':
+            self.selects[sql] += 1
+
+    def repeated(self, threshold):
+        """`(normalized SQL, count)` of the SELECTs run at least `threshold` times, most frequent first."""
+        shapes = TallyCounter()
+        for sql, count in self.selects.items():
+            shapes[normalize_sql(sql)] += count
+        return [(sql, count) for sql, count in shapes.most_common() if count >= threshold]
+
+
+def record_query(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.add(sql, time.perf_counter() - started)
+
+
+def install_query_recorder(connection):
+    # No início da lista: o execute_wrapper() do Django remove sempre o último wrapper
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def instrument_connection(sender, connection, **kwargs):
+    """`connection_created` receiver, connected by `UtilsConfig.ready()`."""
+    install_query_recorder(connection)
+
+
+@contextmanager
+def recording():
+    """Records the queries run inside the block, in this context, into the yielded `QueryRecorder`."""
+    recorder = QueryRecorder()
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+def _format_labels(labels):
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.clear()
+
+    def clear(self):
+        self._values = {}
+
+    def inc(self, labels, amount=1):
+        with _lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self._values.items()):
+            yield self.name, labels, value
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.clear()
+
+    def clear(self):
+        self._series = {}
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Contagem por bucket (não acumulada), soma, total
+                series = self._series[labels] = [[0] * len(self.buckets), 0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket', labels + (('le', _format_value(bound)),), cumulative
+            yield f'{self.name}_bucket', labels + (('le', '+Inf'),), count
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, count
+
+
+REQUESTS = Counter('http_requests_total', 'Sampled requests by route and status.')
+REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'Time spent in Django per sampled request.', LATENCY_BUCKETS)
+VIEW_SECONDS = Histogram(
+    'http_request_view_seconds', 'Time spent in the view per sampled request.', LATENCY_BUCKETS)
+DB_SECONDS = Histogram(
+    'http_request_db_seconds', 'Time spent running SQL per sampled request.', LATENCY_BUCKETS)
+QUERIES = Histogram('http_request_queries', 'SQL queries per sampled request.', QUERY_BUCKETS)
+N_PLUS_ONE = Counter('http_request_n_plus_one_total', 'Sampled requests with repeated SELECTs (N+1).')
+
+METRICS = (REQUESTS, REQUEST_SECONDS, VIEW_SECONDS, DB_SECONDS, QUERIES, N_PLUS_ONE)
+_collectors = []
+
+
+def register_collector(collector):
+    """
+    Adds values computed at scrape time to `/metrics`: `collector()` yields
+    `(name, kind, documentation, value)` tuples, `kind` being `counter` or `gauge`.
+    """
+    _collectors.append(collector)
+    return collector
+
+
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        with _lock:
+            samples = list(metric.samples())
+        lines.extend(f'{name}{_format_labels(labels)} {_format_value(value)}' for name, labels, value in samples)
+    for collector in _collectors:
+        for name, kind, documentation, value in collector():
+            lines += [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}', f'{name} {_format_value(value)}']
+    return '\n'.join(lines) + '\n'
+
+
+def reset_metrics():
+    for metric in METRICS:
+        metric.clear()
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint, behind `Authorization: Bearer <METRICS_TOKEN>`. Without a token
+    configured the endpoint does not exist (404), so the metrics are never public by default.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        return HttpResponse(status=404)
+    if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE)
+
+
+class _RequestTiming:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.queries = QueryRecorder()
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def sampled():
+        rate = settings.REQUEST_METRICS_SAMPLE_RATE
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        request.metrics_timing = timing = _RequestTiming()
+        token = _recorder.set(timing.queries)
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self.finish(request, response, timing)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        request.metrics_timing = timing = _RequestTiming()
+        token = _recorder.set(timing.queries)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self.finish(request, response, timing)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = getattr(request, 'metrics_timing', None)
+        if timing is not None:
+            timing.view_started = time.perf_counter()
+
+    @staticmethod
+    def route(request):
+        match = request.resolver_match
+        if match is None:
+            return 'unmatched'
+        return match.view_name or match.route
+
+    def finish(self, request, response, timing):
+        ended = time.perf_counter()
+        match = request.resolver_match
+        if match is not None and match.func is metrics_view:
+            return response
+        total = ended - timing.started
+        view = ended - timing.view_started if timing.view_started is not None else 0.0
+        queries = timing.queries
+        labels = (('method', request.method), ('route', self.route(request)))
+
+        REQUESTS.inc(labels + (('status', str(response.status_code)),))
+        REQUEST_SECONDS.observe(labels, total)
+        VIEW_SECONDS.observe(labels, view)
+        DB_SECONDS.observe(labels, queries.duration)
+        QUERIES.observe(labels, queries.count)
+
+        repeated = queries.repeated(settings.REQUEST_METRICS_N_PLUS_ONE_THRESHOLD)
+        if repeated:
+            N_PLUS_ONE.inc(labels)
+            for sql, count in repeated:
+                logger.warning('N+1 queries in %s %s: %d x %s', request.method, request.path, count, sql)
+
+        response['Server-Timing'] = (
+            f'db;dur={queries.duration * 1000:.1f};desc="{queries.count} queries", '
+            f'view;dur={view * 1000:.1f}, total;dur={total * 1000:.1f}'
+        )
+        return response
@@ -0,0 +1,50 @@
+from rest_framework import pagination
+
+
+class LegacyPageNumberPagination(pagination.PageNumberPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class KeysetPagination(pagination.CursorPagination):
+    """
+    Cursor (keyset) pagination over `id`, with no `COUNT(*)` and no `OFFSET` scans.
+
+    Clients may choose the page size with `?page_size=`, capped at `max_page_size`.
+    Old consumers keep the page-number format by sending `?page=<n>` or `?pagination=page`.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    mode_query_param = 'pagination'
+    legacy_paginator_class = LegacyPageNumberPagination
+
+    legacy_paginator = None
+
+    def use_legacy(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'page'
+            or self.legacy_paginator_class.page_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_legacy(request):
+            self.legacy_paginator = self.legacy_paginator_class()
+            return self.legacy_paginator.paginate_queryset(queryset, request, view=view)
+        return super().paginate_queryset(queryset, request, view=view)
+
+    def get_paginated_response(self, data):
+        if self.legacy_paginator is not None:
+            return self.legacy_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Use "page" to switch to legacy page-number pagination.',
+                'schema': {'type': 'string', 'enum': ['cursor', 'page']},
+            },
+        ]
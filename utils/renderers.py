@@ -1,15 +1,45 @@
+from django.conf import settings
 from rest_framework import renderers
-import json
+from rest_framework.exceptions import ErrorDetail
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-class UserRender(renderers.JSONRenderer):
-    charset = 'utf-8'
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    `JSONRenderer` that encodes with `orjson` when it is installed and `JSON_RENDERER_BACKEND` is
+    `orjson` (the default). Types orjson does not know (Decimal, lazy strings, ...) go through DRF's
+    `JSONEncoder.default`. Indented output, used by the browsable API, keeps the stdlib encoder.
+    """
 
     def render(self, data, accepted_media_type=None, renderer_context=None):
-        response = ''
-        if 'ErrorDetail' in str(data):
-            response = json.dumps({'errors': data})
-        else:
-            response = json.dumps({'data': data})
+        if data is None:
+            return b''
+        if (orjson is None or getattr(settings, 'JSON_RENDERER_BACKEND', 'orjson') != 'orjson'
+                or self.get_indent(accepted_media_type, renderer_context or {})):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=self.encoder_class().default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def contains_error_detail(data):
+    """Returns True as soon as an `ErrorDetail` is found anywhere in `data`."""
+    if isinstance(data, ErrorDetail):
+        return True
+    if isinstance(data, dict):
+        return any(contains_error_detail(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(contains_error_detail(value) for value in data)
+    return False
 
-        return response
+
+class UserRender(FastJSONRenderer):
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Respostas de sucesso nunca carregam ErrorDetail, então só os erros são percorridos
+        response = (renderer_context or {}).get('response')
+        is_error = (response is None or response.status_code >= 400) and contains_error_detail(data)
+        return super().render({'errors' if is_error else 'data': data}, accepted_media_type, renderer_context)
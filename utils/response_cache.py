@@ -0,0 +1,165 @@
+"""
+Read-through cache for rendered GET responses, invalidated by per-model generation counters.
+
+A cached response is keyed on the models it depends on and their current generation, the
+negotiated media type and the absolute URL (path, query string and page cursor). Saving or
+deleting one of those models bumps its generation (see `favoritehub/signals.py`), so every key
+built from the old generation simply stops being used and expires on its own.
+
+Responses rendered from a read replica are not stored and carry no ETag: the replica may not
+have the write that bumped the generation yet, and a stale body kept under the new generation
+would then be served to the sessions pinned to the primary (see `utils/db_routing.py`).
+
+The ETag of a response is a digest of that key, so a matching `If-None-Match` is answered with a
+304 before the cache entry, the database or the serializers are touched.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+from utils.db_routing import read_from_replica
+
+CACHE_ALIAS = 'responses'
+GENERATION_PREFIX = 'response-generation:'
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def _generation_key(model):
+    return f'{GENERATION_PREFIX}{model._meta.label}'
+
+
+def bump_generation(*models, using=None):
+    """
+    Invalidates every cached response that depends on one of `models`.
+
+    The generation is bumped right away and again when the current transaction on the `using`
+    database (the default one if None) commits, so a response rendered from the pre-commit data by
+    another request is not kept either.
+    """
+    _bump(models)
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        return
+    pending = getattr(connection, 'pending_response_generations', None)
+    if pending is None or not any(func == pending.flush for _, func, _ in connection.run_on_commit):
+        # Um único callback por transação, mesmo com muitos saves
+        pending = connection.pending_response_generations = _PendingBumps()
+        transaction.on_commit(pending.flush, using=using)
+    pending.models.update(models)
+
+
+class _PendingBumps:
+    def __init__(self):
+        self.models = set()
+
+    def flush(self):
+        _bump(self.models)
+
+
+def _bump(models):
+    cache = get_cache()
+    for model in models:
+        key = _generation_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Começa de um valor único para não reaproveitar gerações de uma entrada despejada
+            cache.add(key, time.time_ns(), timeout=None)
+
+
+def _generations(models):
+    cache = get_cache()
+    keys = [_generation_key(model) for model in models]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns(), timeout=None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+class _CachedCall:
+    def __init__(self, view, request, models):
+        self.view = view
+        self.request = request
+        self.cacheable = request.method == 'GET' and getattr(request.accepted_renderer, 'format', None) == 'json'
+        if not self.cacheable:
+            return
+        parts = [
+            *(f'{model._meta.label}={generation}' for model, generation in zip(models, _generations(models))),
+            request.accepted_media_type,
+            request.build_absolute_uri(),
+        ]
+        digest = hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+        self.key = f'response:{digest}'
+        self.etag = f'"{digest[:32]}"'
+
+    def not_modified(self):
+        # If-None-Match usa comparação fraca: W/"x" casa com "x"
+        tags = {tag.strip().removeprefix('W/') for tag in self.request.META.get('HTTP_IF_NONE_MATCH', '').split(',')}
+        if self.etag in tags or '*' in tags:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': self.etag})
+        return None
+
+    def cached(self):
+        entry = get_cache().get(self.key)
+        if entry is None:
+            return None
+        content, content_type = entry
+        return HttpResponse(content, content_type=content_type, headers={'ETag': self.etag})
+
+    def store(self, response):
+        if response.status_code != status.HTTP_200_OK or not isinstance(response, Response):
+            return response
+        if read_from_replica():
+            return response
+        response = self.view.finalize_response(self.request, response)
+        response.render()
+        response['ETag'] = self.etag
+        timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+        get_cache().set(self.key, (response.content, response['Content-Type']), timeout)
+        return response
+
+
+def cache_response(*models):
+    """
+    Caches the JSON responses of a DRF view handler until one of `models` changes.
+
+    Works on sync and `async def` handlers. Only GET requests rendered as JSON are cached; the
+    handler still runs after authentication and permission checks, so a cached response is only
+    served to users allowed to see it.
+    """
+    def decorator(handler):
+        if iscoroutinefunction(handler):
+            @wraps(handler)
+            async def async_wrapper(view, request, *args, **kwargs):
+                call = _CachedCall(view, request, models)
+                if not call.cacheable:
+                    return await handler(view, request, *args, **kwargs)
+                response = call.not_modified() or call.cached()
+                if response is None:
+                    response = call.store(await handler(view, request, *args, **kwargs))
+                return response
+            return async_wrapper
+
+        @wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            call = _CachedCall(view, request, models)
+            if not call.cacheable:
+                return handler(view, request, *args, **kwargs)
+            response = call.not_modified() or call.cached()
+            if response is None:
+                response = call.store(handler(view, request, *args, **kwargs))
+            return response
+        return wrapper
+    return decorator